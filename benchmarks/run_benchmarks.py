@@ -0,0 +1,386 @@
+# benchmarks/run_benchmarks.py
+"""
+Suite de benchmarks de los caminos críticos (cartelera, backtest, construcción del dataset,
+carga de activos e importación en frío de la app y los scripts), ejecutada contra fixtures
+de la API de la MLB servidos sin red.
+
+Uso:
+    python benchmarks/run_benchmarks.py --record            # graba los fixtures (necesita red)
+    python benchmarks/run_benchmarks.py --update-baseline   # mide y guarda la línea base
+    python benchmarks/run_benchmarks.py                     # mide y compara contra la línea base
+
+Los fixtures (benchmarks/fixtures/) y la línea base (benchmarks/baseline.json) están en el
+repositorio, así que la comparación funciona sin red con un solo comando. Sin línea base el
+script termina con código 1, salvo con --update-baseline.
+
+Los fixtures del repositorio son SINTÉTICOS: respuestas con la forma de la API (equipos
+"Team 111", lanzadores "P1557", boxscores mínimos y líneas que pueden ser imposibles) generadas
+por un servidor falso en modo --record. Sirven para medir tiempos, memoria y número de llamadas,
+no para evaluar la calidad de las predicciones. La línea base y CALL_BUDGETS salen de estos
+datos: si se vuelven a grabar contra la API real hay que medir de nuevo ambos.
+
+Cada caso corre en un subproceso propio (almacenes, caché y base de datos temporales), así que
+los tiempos en frío son realmente en frío y el pico de RSS es el del caso. El resultado se
+imprime en JSON; si algún valor empeora más allá del umbral, el script termina con código 1.
+Los casos cuyos datos de entrada no están en el checkout (el CSV histórico de load_all_assets
+viaja en git LFS) se informan como omitidos y el resto de la suite sigue.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+# --- Configuración del Path de Python ---
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+DEFAULT_BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+# Datos fijos de los casos: deben coincidir con los fixtures (sintéticos, ver arriba).
+SLATE_DATE = '2024-06-01'
+BACKTEST_MONTH = (2024, 6)
+BUILD_RANGE = (date(2023, 4, 1), date(2023, 4, 30))
+BACKTEST_MODEL_PATH = os.path.join(project_root, 'src', 'ml_model', 'mlb_predictor_model.pkl')
+# Procesos fijos para el backtest walk-forward, para que el caso no dependa de la máquina.
+BACKTEST_WORKERS = 2
+
+# Presupuesto de llamadas a la API de cada caso (total y por endpoint), comprobado con
+# assert_call_budget: si un cambio dispara las llamadas, el caso falla aunque no haya línea base.
+# Medido con los fixtures sintéticos (margen de ~5 %): cartelera en frío 316 (boxscore 225,
+# people_stats 30, schedule 31, team_stats 30), cartelera caliente 1, backtest del mes 1756
+# (boxscore 675, people_stats 150, schedule 31, team_stats 900: el OPS de la API de cada
+# ventana de equipo, que después queda guardado) y dataset de abril 1.
+CALL_BUDGETS = {
+    'predictions_cold': (332, {'boxscore': 240, 'people_stats': 32, 'schedule': 33, 'team_stats': 32}),
+    'predictions_warm': (2, {}),
+    'backtest_month': (1845, {'boxscore': 710, 'people_stats': 158, 'schedule': 33, 'team_stats': 945}),
+    'build_dataset': (2, {}),
+}
+
+# Umbrales de regresión (fracción sobre la línea base) y margen absoluto mínimo, para que el
+# ruido en tiempos muy cortos no haga fallar la suite.
+DEFAULT_LATENCY_THRESHOLD = 0.25
+DEFAULT_MEMORY_THRESHOLD = 0.15
+MIN_SECONDS_DELTA = 0.05
+MIN_RSS_DELTA_MB = 10.0
+
+# Módulos cuyo tiempo de importación en frío se mide (python -X importtime), y dependencias
+# pesadas que ninguno de ellos debe importar al cargarse: se importan al usarse por primera vez.
+IMPORT_TARGETS = {
+    'app': 'src.app',
+    'db_viewer': 'src.db_viewer',
+    'run_daily_predictions': 'src.run_daily_predictions',
+}
+HEAVY_MODULES = {'xgboost', 'sklearn', 'scipy', 'joblib', 'pandas'}
+IMPORT_TIME_RUNS = 5
+
+# Datos de entrada del caso load_all_assets, que viaja en git LFS.
+HISTORICAL_DATA_PATH = os.path.join(project_root, 'data', 'historical_games_rich.csv')
+LFS_POINTER_PREFIX = b'version https://git-lfs'
+
+# Métricas donde un valor mayor es mejor; en el resto, menor es mejor.
+HIGHER_IS_BETTER = {'games_per_second'}
+# Conteos deterministas (llamadas a la API, dependencias pesadas importadas): cualquier aumento
+# es una regresión.
+CALL_COUNT_METRICS = {'cold_api_calls', 'api_calls'} | {f'{name}_heavy_modules' for name in IMPORT_TARGETS}
+
+
+class CaseSkipped(Exception):
+    """El caso no puede medirse en este checkout (p. ej. faltan sus datos de entrada)."""
+
+
+def _is_lfs_pointer(path):
+    # Sin 'git lfs pull', los archivos grandes del repositorio son punteros de texto de git LFS.
+    with open(path, 'rb') as f:
+        return f.read(len(LFS_POINTER_PREFIX)) == LFS_POINTER_PREFIX
+
+
+def _peak_rss_mb():
+    # En Linux ru_maxrss viene en KB; en macOS, en bytes.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+# ===================================================================
+# CASOS (cada uno se ejecuta dentro de su propio subproceso)
+# ===================================================================
+def case_load_all_assets():
+    if not os.path.exists(HISTORICAL_DATA_PATH) or _is_lfs_pointer(HISTORICAL_DATA_PATH):
+        raise CaseSkipped(f"{os.path.relpath(HISTORICAL_DATA_PATH, project_root)} no está descargado (ejecuta 'git lfs pull')")
+    start = time.perf_counter()
+    from src.asset_loader import load_all_assets
+    assets = load_all_assets()
+    elapsed = time.perf_counter() - start
+    if assets is None:
+        raise RuntimeError("load_all_assets() no pudo cargar los activos")
+    return {'seconds': elapsed}
+
+
+def _call_budget(name):
+    from src.call_budget import assert_call_budget
+    max_calls, max_by_endpoint = CALL_BUDGETS[name]
+    return assert_call_budget(max_calls, **max_by_endpoint)
+
+
+def case_predictions():
+    from src import app as web_app
+    from src.call_budget import attribute
+    with web_app.app.app_context():
+        start = time.perf_counter()
+        with attribute('benchmark', 'predictions_cold') as calls, _call_budget('predictions_cold'):
+            games = web_app.get_predictions_for_date(SLATE_DATE)
+        cold = time.perf_counter() - start
+
+        # Caliente: almacenes locales llenos pero caché de la cartelera vacía (recalcula todo).
+        web_app.cache.clear()
+        start = time.perf_counter()
+        with _call_budget('predictions_warm'):
+            web_app.get_predictions_for_date(SLATE_DATE)
+        warm = time.perf_counter() - start
+
+        # Acierto de caché: la cartelera sale directamente de Flask-Caching.
+        start = time.perf_counter()
+        web_app.get_predictions_for_date(SLATE_DATE)
+        cached = time.perf_counter() - start
+    if not games:
+        raise RuntimeError(f"La cartelera de {SLATE_DATE} salió vacía; ¿faltan fixtures?")
+    return {'cold_seconds': cold, 'warm_seconds': warm, 'cached_seconds': cached, 'games': len(games),
+            'cold_api_calls': calls.total}
+
+
+def case_backtest_month():
+    import calendar
+    from src.backtest import run_walk_forward
+    from src.app import FEATURE_ORDER
+    from src.call_budget import attribute
+
+    year, month = BACKTEST_MONTH
+    start_date = date(year, month, 1)
+    end_date = date(year, month, calendar.monthrange(year, month)[1])
+    start = time.perf_counter()
+    with attribute('benchmark', 'backtest_month') as calls, _call_budget('backtest_month'):
+        # Los almacenes del subproceso empiezan vacíos: sync=True los llena desde los fixtures.
+        _, _, results = run_walk_forward([BACKTEST_MODEL_PATH], FEATURE_ORDER, start_date, end_date,
+                                         workers=BACKTEST_WORKERS, sync=True)
+    elapsed = time.perf_counter() - start
+    if results.empty:
+        raise RuntimeError("El backtest no produjo resultados; ¿faltan fixtures?")
+    return {'seconds': elapsed, 'games': len(results), 'api_calls': calls.total}
+
+
+def case_build_dataset():
+    from build_dataset_v2 import build_rich_historical_dataset
+    output_path = os.path.join(os.environ['MLB_BENCH_WORK_DIR'], 'historical_games_rich.csv')
+    start = time.perf_counter()
+    with _call_budget('build_dataset'):
+        games = build_rich_historical_dataset(BUILD_RANGE[0], BUILD_RANGE[1], output_path=output_path)
+    elapsed = time.perf_counter() - start
+    if not games:
+        raise RuntimeError("El constructor no guardó partidos; ¿faltan fixtures?")
+    return {'seconds': elapsed, 'games': games, 'games_per_second': games / elapsed}
+
+
+def _import_profile(module):
+    """Importa 'module' en un intérprete nuevo con -X importtime: (segundos, paquetes de primer nivel)."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=project_root, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"No se pudo importar '{module}':\n{completed.stderr[-2000:]}")
+    seconds, packages = None, set()
+    for line in completed.stderr.splitlines():
+        # Formato: "import time: <propio us> | <acumulado us> | <módulo indentado>"
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        name = name.strip()
+        packages.add(name.split('.')[0])
+        if name == module:
+            seconds = int(cumulative) / 1e6
+    return seconds, packages
+
+
+def case_import_time():
+    results = {}
+    for name, module in IMPORT_TARGETS.items():
+        # El mejor de varios intentos: el primero además compila los .pyc.
+        runs = [_import_profile(module) for _ in range(IMPORT_TIME_RUNS)]
+        results[f'{name}_import_seconds'] = min(seconds for seconds, _ in runs)
+        heavy = sorted(HEAVY_MODULES & runs[-1][1])
+        results[f'{name}_heavy_modules'] = len(heavy)
+        if heavy:
+            print(f"--- [Bench] '{module}' importa al cargarse: {', '.join(heavy)} ---", file=sys.stderr)
+    return results
+
+
+CASES = {
+    'load_all_assets': case_load_all_assets,
+    'predictions': case_predictions,
+    'backtest_month': case_backtest_month,
+    'build_dataset': case_build_dataset,
+    'import_time': case_import_time,
+}
+
+
+def _run_case_in_process(name):
+    """
+    Punto de entrada del subproceso: ejecuta el caso y escribe sus métricas como JSON, o
+    {'skipped': motivo} si el caso no puede medirse aquí.
+    """
+    try:
+        metrics = CASES[name]()
+    except CaseSkipped as e:
+        metrics = {'skipped': str(e)}
+    else:
+        metrics['peak_rss_mb'] = _peak_rss_mb()
+        metrics = {key: round(value, 4) if isinstance(value, float) else value for key, value in metrics.items()}
+    with open(os.environ['MLB_BENCH_RESULT_PATH'], 'w') as f:
+        json.dump(metrics, f)
+
+
+# ===================================================================
+# EJECUCIÓN Y COMPARACIÓN
+# ===================================================================
+def run_case(name, api_mode, fixtures_dir, latency_ms):
+    """Ejecuta un caso en un subproceso aislado y devuelve sus métricas (o {'skipped': motivo})."""
+    work_dir = tempfile.mkdtemp(prefix=f'mlb_bench_{name}_')
+    result_path = os.path.join(work_dir, 'result.json')
+    env = dict(os.environ)
+    env.update({
+        'MLB_API_MODE': api_mode,
+        'MLB_API_FIXTURES_DIR': fixtures_dir,
+        'MLB_API_REPLAY_LATENCY_MS': str(latency_ms),
+        'MLB_API_REPLAY_JITTER_MS': '0',
+        'MLB_LOCAL_STORE_DIR': os.path.join(work_dir, 'store'),
+        'MLB_CACHE_DIR': os.path.join(work_dir, 'cache'),
+        'MLB_DATABASE_PATH': os.path.join(work_dir, 'predictions.db'),
+        'MLB_COLUMNAR_DIR': os.path.join(work_dir, 'columnar'),
+        'MLB_BENCH_WORK_DIR': work_dir,
+        'MLB_BENCH_RESULT_PATH': result_path,
+    })
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--case', name],
+            cwd=project_root, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        )
+        if completed.returncode != 0 or not os.path.exists(result_path):
+            print(completed.stdout[-4000:], file=sys.stderr)
+            raise RuntimeError(f"El caso '{name}' falló (código {completed.returncode})")
+        with open(result_path) as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def compare(results, baseline, latency_threshold, memory_threshold):
+    """Devuelve la lista de regresiones (textos) de 'results' frente a 'baseline'."""
+    regressions = []
+    for case, metrics in results['cases'].items():
+        if case not in baseline.get('cases', {}):
+            print(f"--- [Bench] AVISO: '{case}' no está en la línea base; no se compara. ---", file=sys.stderr)
+        base_metrics = baseline.get('cases', {}).get(case, {})
+        for metric, value in metrics.items():
+            base = base_metrics.get(metric)
+            if base is None or metric == 'games':
+                continue
+            if metric in CALL_COUNT_METRICS:
+                worse = value - base
+                limit = 0
+            elif metric == 'peak_rss_mb':
+                worse = value - base
+                limit = max(base * memory_threshold, MIN_RSS_DELTA_MB)
+            elif metric in HIGHER_IS_BETTER:
+                worse = base - value
+                # Mismo margen absoluto que los tiempos: la caída que causarían MIN_SECONDS_DELTA
+                # segundos más sobre los mismos partidos (en casos muy cortos, el ruido domina).
+                games = metrics.get('games') or 0
+                noise = base - games / (games / base + MIN_SECONDS_DELTA) if games and base else 0
+                limit = max(base * latency_threshold, noise)
+            else:
+                worse = value - base
+                limit = max(base * latency_threshold, MIN_SECONDS_DELTA)
+            if worse > limit:
+                regressions.append(f"{case}.{metric}: {value} (línea base {base})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de los caminos críticos del predictor.")
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES_DIR, help="Carpeta de fixtures de la API.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help="Archivo JSON de la línea base.")
+    parser.add_argument('--output', help="Guarda también los resultados en este archivo JSON.")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES), help="Casos a ejecutar.")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Latencia simulada por llamada a la API.")
+    parser.add_argument('--latency-threshold', type=float, default=DEFAULT_LATENCY_THRESHOLD)
+    parser.add_argument('--memory-threshold', type=float, default=DEFAULT_MEMORY_THRESHOLD)
+    parser.add_argument('--record', action='store_true', help="Graba los fixtures contra la API real.")
+    parser.add_argument('--update-baseline', action='store_true', help="Guarda los resultados como nueva línea base.")
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        _run_case_in_process(args.case)
+        return 0
+
+    api_mode = 'record' if args.record else 'replay'
+    results = {
+        'settings': {'latency_ms': args.latency_ms, 'slate_date': SLATE_DATE,
+                     'backtest_month': '%d-%02d' % BACKTEST_MONTH,
+                     'build_range': [d.isoformat() for d in BUILD_RANGE]},
+        'cases': {},
+        'skipped': {},
+    }
+    for name in args.cases:
+        print(f"--- [Bench] Ejecutando '{name}' ({api_mode}) ---", file=sys.stderr)
+        metrics = run_case(name, api_mode, args.fixtures, args.latency_ms)
+        if 'skipped' in metrics:
+            print(f"--- [Bench] AVISO: '{name}' omitido: {metrics['skipped']} ---", file=sys.stderr)
+            results['skipped'][name] = metrics['skipped']
+        else:
+            results['cases'][name] = metrics
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.record:
+        return 0
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"--- [Bench] Línea base guardada en {args.baseline} ---", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        # Sin línea base no se puede detectar una regresión: no se da la ejecución por buena.
+        print(f"--- [Bench] ERROR: no hay línea base en {args.baseline}; usa --update-baseline para crearla. ---", file=sys.stderr)
+        return 1
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('settings') != results['settings']:
+        print("--- [Bench] AVISO: la línea base se midió con otra configuración; la comparación puede no ser válida. ---", file=sys.stderr)
+
+    regressions = compare(results, baseline, args.latency_threshold, args.memory_threshold)
+    if regressions:
+        print("--- [Bench] REGRESIONES DETECTADAS ---", file=sys.stderr)
+        for line in regressions:
+            print(f"  - {line}", file=sys.stderr)
+        return 1
+    print("--- [Bench] Sin regresiones frente a la línea base. ---", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
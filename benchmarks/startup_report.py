@@ -0,0 +1,147 @@
+# benchmarks/startup_report.py
+"""
+Informe de arranque del servicio web bajo gunicorn: tiempo hasta que /ready responde 200 y
+memoria del maestro y de cada worker (RSS, PSS y privada), con y sin preload_app.
+
+Uso:
+    python benchmarks/startup_report.py                          # 2 workers, con y sin preload
+    python benchmarks/startup_report.py --workers 4 --modes preload
+    python benchmarks/startup_report.py --warmup-date 2024-06-01 --fixtures benchmarks/fixtures
+
+La suma de PSS es la memoria real que ocupa el servicio completo; la memoria privada de un
+worker es lo que cuesta añadir uno más. Con --warmup-date se piden unas páginas antes de medir
+(contra fixtures grabados si se indica --fixtures), para ver cuánto se "ensucian" las páginas
+compartidas al atender tráfico. Solo funciona en Linux (lee /proc).
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# --- Configuración del Path de Python ---
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.metrics import process_memory
+
+MODES = {'preload': '1', 'no-preload': '0'}
+
+
+def _worker_pids(master_pid):
+    try:
+        with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+            return [int(pid) for pid in f.read().split()]
+    except OSError:
+        return []
+
+
+def _wait_until_ready(url, process, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn terminó antes de estar listo (código {process.returncode})")
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} no respondió 200 en {timeout} s")
+
+
+def _snapshot(master_pid):
+    workers = [dict(pid=pid, **(process_memory(pid) or {})) for pid in sorted(_worker_pids(master_pid))]
+    master = dict(pid=master_pid, **(process_memory(master_pid) or {}))
+    return {
+        'master': master,
+        'workers': workers,
+        'total_pss_mb': round(master.get('pss', 0) + sum(w.get('pss', 0) for w in workers), 1),
+        'total_rss_mb': round(master.get('rss', 0) + sum(w.get('rss', 0) for w in workers), 1),
+    }
+
+
+def measure(mode, workers, port, warmup_date, warmup_requests, fixtures_dir, timeout):
+    work_dir = tempfile.mkdtemp(prefix=f'mlb_startup_{mode}_')
+    env = dict(os.environ)
+    env.update({
+        'WEB_CONCURRENCY': str(workers),
+        'GUNICORN_PRELOAD': MODES[mode],
+        'MLB_LOCAL_STORE_DIR': os.path.join(work_dir, 'store'),
+        'MLB_CACHE_DIR': os.path.join(work_dir, 'cache'),
+        'MLB_DATABASE_PATH': os.path.join(work_dir, 'predictions.db'),
+    })
+    env.pop('PORT', None)
+    if fixtures_dir:
+        env.update({'MLB_API_MODE': 'replay', 'MLB_API_FIXTURES_DIR': fixtures_dir})
+    log_path = os.path.join(work_dir, 'gunicorn.log')
+    base_url = f"http://127.0.0.1:{port}"
+    with open(log_path, 'w') as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f"127.0.0.1:{port}", 'src.app:app'],
+            cwd=project_root, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        try:
+            _wait_until_ready(f"{base_url}/ready", process, timeout)
+            result = {'mode': mode, 'workers': workers, 'startup_seconds': round(time.perf_counter() - start, 2)}
+            # Los workers terminan de arrancar por su cuenta; se espera a que estén todos.
+            while len(_worker_pids(process.pid)) < workers and time.perf_counter() - start < timeout:
+                time.sleep(0.1)
+            result['idle'] = _snapshot(process.pid)
+
+            if warmup_date:
+                body = urllib.parse.urlencode({'game_date': warmup_date, 'user_role': 'Master'}).encode()
+                for _ in range(warmup_requests):
+                    with urllib.request.urlopen(f"{base_url}/", data=body, timeout=timeout) as response:
+                        response.read()
+                result['after_warmup'] = _snapshot(process.pid)
+            return result
+        except Exception:
+            log.flush()
+            with open(log_path) as f:
+                print(f.read()[-4000:], file=sys.stderr)
+            raise
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque y memoria por worker bajo gunicorn.")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['preload', 'no-preload'])
+    parser.add_argument('--port', type=int, default=18800)
+    parser.add_argument('--warmup-date', help="Fecha (YYYY-MM-DD) de las páginas a pedir antes de medir otra vez.")
+    parser.add_argument('--warmup-requests', type=int, default=4)
+    parser.add_argument('--fixtures', help="Sirve la API desde estos fixtures grabados (modo replay).")
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--output', help="Guarda también el informe en este archivo JSON.")
+    args = parser.parse_args()
+
+    report = []
+    for mode in args.modes:
+        print(f"--- [Startup] Midiendo '{mode}' con {args.workers} workers ---", file=sys.stderr)
+        report.append(measure(mode, args.workers, args.port, args.warmup_date, args.warmup_requests,
+                              args.fixtures and os.path.abspath(args.fixtures), args.timeout))
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
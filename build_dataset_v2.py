@@ -1,81 +1,34 @@
 # build_dataset_v2.py
-import pandas as pd
-from datetime import date, timedelta
-import time
+import argparse
+from datetime import date
 
 # Asegúrate de que los módulos de src se puedan importar
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-from src.api_client import get_games_for_date
+from src.dataset_builder import build
+from src.profiling import add_profile_argument, profile_block
 
-def daterange(start_date, end_date):
-    for n in range(int((end_date - start_date).days) + 1):
-        yield start_date + timedelta(n)
-
-def build_rich_historical_dataset():
+def build_rich_historical_dataset(start_date=date(2023, 3, 30), end_date=date(2023, 10, 1),
+                                  output_path='data/historical_games_rich.csv'):
     """
     Construye un dataset histórico enriquecido, incluyendo fechas y nombres de equipos.
+    Solo pide a la API los días que aún no tienen checkpoint (ver src/dataset_builder.py).
+    Devuelve el número de partidos guardados.
     """
-    start_date = date(2023, 3, 30)
-    end_date = date(2023, 10, 1)
-    
-    all_game_data = []
-
     print(f"Iniciando la recolección de datos ENRIQUECIDOS desde {start_date} hasta {end_date}...")
-
-    for single_date in daterange(start_date, end_date):
-        date_str = single_date.strftime("%Y-%m-%d")
-        print(f"Procesando fecha: {date_str}")
-        
-        games_on_date = get_games_for_date(date_str)
-        
-        if not games_on_date:
-            continue
-
-        for game in games_on_date:
-            game_status = game.get('status', {}).get('abstractGameState', '')
-            if game_status!= 'Final':
-                continue
-
-            home_team_data = game.get('teams', {}).get('home', {})
-            away_team_data = game.get('teams', {}).get('away', {})
-            
-            features = {
-                # --- NUEVAS CARACTERÍSTICAS CLAVE ---
-                'game_date': game.get('gameDate'),
-                'h_team_name': home_team_data.get('team', {}).get('name', 'N/A'),
-                'v_team_name': away_team_data.get('team', {}).get('name', 'N/A'),
-                
-                # Características originales
-                'h_team_wins_season': home_team_data.get('leagueRecord', {}).get('wins', 0),
-                'h_team_losses_season': home_team_data.get('leagueRecord', {}).get('losses', 0),
-                'v_team_wins_season': away_team_data.get('leagueRecord', {}).get('wins', 0),
-                'v_team_losses_season': away_team_data.get('leagueRecord', {}).get('losses', 0),
-            }
-
-            is_home_winner = home_team_data.get('isWinner', False)
-            features['target'] = 1 if is_home_winner else 0
-            
-            all_game_data.append(features)
-        
-        time.sleep(1) 
-
-    print("Recolección de datos completada.")
-    
-    if all_game_data:
-        historical_df = pd.DataFrame(all_game_data)
-        
-        # Convertir la fecha a un formato de fecha real
-        historical_df['game_date'] = pd.to_datetime(historical_df['game_date'])
-        
-        output_path = 'data/historical_games_rich.csv' # Nuevo nombre de archivo
-        historical_df.to_csv(output_path, index=False)
-        
+    total = build('rich', start_date, end_date, output_path=output_path)
+    if total:
         print(f"¡Éxito! El dataset enriquecido ha sido guardado en: {output_path}")
     else:
         print("No se encontraron datos de partidos finalizados.")
+    return total
 
 if __name__ == '__main__':
-    build_rich_historical_dataset()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Construye el dataset histórico.")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    with profile_block('build_dataset_v2', enabled=bool(args.profile), directory=args.profile):
+        build_rich_historical_dataset()
\ No newline at end of file
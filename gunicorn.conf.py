@@ -0,0 +1,78 @@
+# gunicorn.conf.py
+"""
+Configuración de gunicorn para el servicio web (la usan el Procfile y el Dockerfile).
+
+La aplicación (modelo, BD y plantillas) se carga UNA sola vez en el proceso maestro
+(preload_app; el modelo, que la app carga de forma diferida, se fuerza en when_ready) y los
+workers la heredan al hacer fork, compartiendo esas páginas de memoria copy-on-write. Antes
+del primer fork se congela el recolector de basura (gc.freeze) para que sus pasadas no toquen
+los objetos heredados y las páginas sigan compartidas.
+
+Variables de entorno:
+    WEB_CONCURRENCY   número de workers (por defecto 2)
+    GUNICORN_TIMEOUT  timeout de los workers en segundos (por defecto 300)
+    GUNICORN_PRELOAD  '0' para cargar la aplicación en cada worker (solo para comparar memoria)
+    PORT              puerto de escucha (si no, el de gunicorn por defecto)
+    MLB_METRICS_DIR   carpeta donde los workers vuelcan sus métricas para que /metrics las sume
+                      (por defecto, una carpeta temporal por arranque, que se borra al salir)
+"""
+import gc
+import os
+import shutil
+import tempfile
+import time
+
+_master_started_at = time.time()
+
+# Se define antes de cargar la aplicación, para que src.metrics la vea en el maestro y en los workers.
+_own_metrics_dir = 'MLB_METRICS_DIR' not in os.environ
+os.environ.setdefault('MLB_METRICS_DIR', os.path.join(tempfile.gettempdir(), f"mlb_metrics_{os.getpid()}"))
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 300))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+if 'PORT' in os.environ:
+    bind = [f"0.0.0.0:{os.environ['PORT']}"]
+
+
+def _memory_summary(pid=None):
+    from src.metrics import process_memory
+    memory = process_memory(pid)
+    if memory is None:
+        return "memoria no disponible"
+    return f"RSS {memory['rss']} MB, PSS {memory['pss']} MB, privada {memory['uss']} MB"
+
+
+def when_ready(server):
+    """En el maestro, con la aplicación ya cargada y antes de crear los workers."""
+    if preload_app:
+        from src import database_manager
+        from src.app import get_model
+        # El modelo se carga de forma diferida; aquí se fuerza para que los workers lo compartan.
+        get_model()
+        # Las conexiones a SQLite abiertas al inicializar la BD no deben heredarse.
+        with server.app.wsgi().app_context():
+            database_manager.db.engine.dispose()
+        gc.collect()
+        gc.freeze()
+    print(f"--- [Gunicorn] Maestro listo en {time.time() - _master_started_at:.2f} s "
+          f"(preload={'sí' if preload_app else 'no'}, {workers} workers; {_memory_summary()}) ---")
+
+
+def post_fork(server, worker):
+    """En cada worker recién creado: recursos por proceso que no pueden heredarse."""
+    if preload_app:
+        from src import database_manager, http_client
+        with server.app.wsgi().app_context():
+            database_manager.release_connections()
+        http_client.configure_api()
+
+
+def post_worker_init(worker):
+    print(f"--- [Gunicorn] Worker {worker.pid} listo {time.time() - _master_started_at:.2f} s después "
+          f"de arrancar el maestro ({_memory_summary(worker.pid)}) ---")
+
+
+def on_exit(server):
+    if _own_metrics_dir:
+        shutil.rmtree(os.environ['MLB_METRICS_DIR'], ignore_errors=True)
@@ -1,28 +1,86 @@
 # src/api_client.py
+import calendar
 import requests
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
-BASE_URL = "https://statsapi.mlb.com/api/v1"
+from .http_client import BASE_URL, get_json
+from .metrics import timed
 
-def get_games_for_date(date_str):
-    hydrate = "linescore,team,leagueRecord,probablePitcher,game(content(summary)),gameData"
-    url = f"{BASE_URL}/schedule?sportId=1&date={date_str}&hydrate={hydrate}"
+SCHEDULE_HYDRATE = "linescore,team,leagueRecord,probablePitcher,game(content(summary)),gameData"
+# Para el estado en vivo (marcador, estado, entrada) basta con el linescore: respuesta mucho más ligera.
+LIVE_HYDRATE = "linescore"
+
+def _add_game_time(games_list):
+    for game in games_list:
+        game_date_str = game.get('gameDate', '1970-01-01T00:00:00Z')
+        game['game_time'] = datetime.strptime(game_date_str, '%Y-%m-%dT%H:%M:%SZ').strftime('%I:%M %p')
+    return games_list
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+def _month_chunks(start_date, end_date):
+    """Divide el rango [start_date, end_date] en bloques que no cruzan de un mes a otro."""
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        last_day = calendar.monthrange(chunk_start.year, chunk_start.month)[1]
+        chunk_end = min(end_date, chunk_start.replace(day=last_day))
+        yield chunk_start, chunk_end
+        chunk_start = chunk_end + timedelta(days=1)
+
+@timed('schedule')
+def get_games_for_date(date_str, hydrate=SCHEDULE_HYDRATE):
+    params = {'sportId': 1, 'date': date_str, 'hydrate': hydrate}
     
-    print(f"--- [API Client] Llamando a la URL: {url} ---")
+    print(f"--- [API Client] Llamando a la URL: {BASE_URL}/schedule?sportId=1&date={date_str}&hydrate={hydrate} ---")
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = get_json("/schedule", params=params)
         
         if 'dates' in data and data['dates']:
-            games_list = data['dates'][0].get('games', [])
-            for game in games_list:
-                game_date_str = game.get('gameDate', '1970-01-01T00:00:00Z')
-                game['game_time'] = datetime.strptime(game_date_str, '%Y-%m-%dT%H:%M:%SZ').strftime('%I:%M %p')
+            games_list = _add_game_time(data['dates'][0].get('games', []))
             print(f"--- [API Client] ¡Éxito! Se encontraron {len(games_list)} partidos.")
             return games_list
         else:
             return []
     except requests.exceptions.RequestException as e:
         print(f"--- [API Client] ERROR al obtener datos de la MLB: {e} ---")
-        return []
\ No newline at end of file
+        return []
+
+def get_live_games_for_date(date_str):
+    """
+    Estado en vivo de los partidos de una fecha con una sola llamada ligera al calendario.
+    Devuelve {gamePk: partido}; si la API falla, un diccionario vacío.
+    """
+    return {game['gamePk']: game for game in get_games_for_date(date_str, hydrate=LIVE_HYDRATE)}
+
+def iter_games_by_date(start_date, end_date, hydrate=SCHEDULE_HYDRATE):
+    """
+    Generador que recorre el calendario entre start_date y end_date (inclusive) pidiendo
+    un mes por llamada. Produce tuplas (fecha 'YYYY-MM-DD', lista de partidos) en orden,
+    solo para los días que tienen partidos.
+    """
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    for chunk_start, chunk_end in _month_chunks(start_date, end_date):
+        params = {'sportId': 1, 'startDate': chunk_start.isoformat(), 'endDate': chunk_end.isoformat()}
+        if hydrate:
+            params['hydrate'] = hydrate
+        print(f"--- [API Client] Calendario del {chunk_start} al {chunk_end} ---")
+        try:
+            data = get_json("/schedule", params=params)
+        except requests.exceptions.RequestException as e:
+            # A diferencia de la consulta por día, aquí se propaga el error: omitir un mes
+            # completo en silencio dejaría un hueco en los datasets.
+            print(f"--- [API Client] ERROR al obtener el calendario del {chunk_start} al {chunk_end}: {e} ---")
+            raise
+        for date_info in data.get('dates', []):
+            games_list = date_info.get('games', [])
+            if games_list:
+                yield date_info['date'], _add_game_time(games_list)
+
+def get_games_for_date_range(start_date, end_date, hydrate=SCHEDULE_HYDRATE):
+    """Devuelve {fecha 'YYYY-MM-DD': [partidos]} para el rango, usando una llamada por mes."""
+    return dict(iter_games_by_date(start_date, end_date, hydrate=hydrate))
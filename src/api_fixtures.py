@@ -0,0 +1,164 @@
+# src/api_fixtures.py
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from requests import Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .http_client import endpoint_name
+
+# Archivo de fixtures de la API de la MLB para trabajar sin red:
+#   - RecordingAdapter: hace la llamada real y guarda cada respuesta 200 en el archivo.
+#   - ReplayAdapter:    sirve las respuestas guardadas, con una latencia simulada configurable.
+# Estructura en disco:
+#   <fixtures_dir>/<endpoint>/<sha256>.json.gz  -> cuerpo de la respuesta, comprimido
+#   <fixtures_dir>/manifest.jsonl               -> una línea por clave grabada, la más reciente (para inspección)
+API_PREFIX = "/api/v1"
+
+_write_lock = threading.Lock()
+# Manifiesto en memoria por carpeta de fixtures: clave -> entrada.
+_manifests = {}
+
+
+def request_key(url):
+    """
+    Normaliza una URL de la API en una clave estable: ruta sin el prefijo /api/v1 y
+    parámetros ordenados, p. ej. '/schedule?date=2024-06-01&sportId=1'.
+    """
+    parts = urlsplit(url)
+    path = parts.path
+    if path.startswith(API_PREFIX):
+        path = path[len(API_PREFIX):]
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{path}?{query}" if query else path
+
+
+def fixture_path(fixtures_dir, key):
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return os.path.join(fixtures_dir, endpoint_name(key), f"{digest}.json.gz")
+
+
+def save_fixture(fixtures_dir, key, body):
+    """Guarda el cuerpo (bytes) de una respuesta bajo su clave normalizada."""
+    path = fixture_path(fixtures_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(gzip.compress(body))
+    os.replace(tmp_path, path)
+    entry = {
+        'key': key,
+        'file': os.path.relpath(path, fixtures_dir),
+        'size': len(body),
+        'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+    with _write_lock:
+        manifest = _manifests.get(fixtures_dir)
+        if manifest is None:
+            manifest = _manifests[fixtures_dir] = _read_manifest(fixtures_dir)
+        manifest[key] = entry
+        _write_manifest(fixtures_dir, manifest)
+    return path
+
+
+def _read_manifest(fixtures_dir):
+    """Lee manifest.jsonl como {clave: entrada}; si una clave se repite, gana la última línea."""
+    manifest = {}
+    try:
+        with open(os.path.join(fixtures_dir, 'manifest.jsonl'), encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    manifest[entry['key']] = entry
+    except FileNotFoundError:
+        pass
+    return manifest
+
+
+def _write_manifest(fixtures_dir, manifest):
+    """Reescribe manifest.jsonl (escritura atómica) con una línea por clave, ordenado por clave."""
+    path = os.path.join(fixtures_dir, 'manifest.jsonl')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for key in sorted(manifest):
+            f.write(json.dumps(manifest[key]) + "\n")
+    os.replace(tmp_path, path)
+
+
+def load_fixture(fixtures_dir, key):
+    """Devuelve el cuerpo guardado para la clave, o None si no se grabó."""
+    try:
+        with gzip.open(fixture_path(fixtures_dir, key), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _build_response(request, status_code, body, reason):
+    response = Response()
+    response.status_code = status_code
+    response.reason = reason
+    response._content = body
+    response.headers = CaseInsensitiveDict({'Content-Type': 'application/json;charset=UTF-8'})
+    response.encoding = 'utf-8'
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Adaptador de requests que hace la llamada real y graba las respuestas correctas."""
+
+    def __init__(self, fixtures_dir, **kwargs):
+        self.fixtures_dir = fixtures_dir
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if request.method == 'GET' and response.status_code == 200:
+            save_fixture(self.fixtures_dir, request_key(request.url), response.content)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Adaptador de requests que responde desde el archivo de fixtures sin tocar la red.
+    Cada respuesta espera 'latency_ms' (+ hasta 'jitter_ms' aleatorios) para simular la API real.
+    Las peticiones que no se grabaron devuelven un 404, que el código trata como un fallo de red.
+    """
+
+    def __init__(self, fixtures_dir, latency_ms=0.0, jitter_ms=0.0, seed=None):
+        super().__init__()
+        self.fixtures_dir = fixtures_dir
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        self.misses = []
+
+    def _delay(self):
+        delay_ms = self.latency_ms
+        if self.jitter_ms:
+            delay_ms += self._random.uniform(0, self.jitter_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        key = request_key(request.url)
+        body = load_fixture(self.fixtures_dir, key)
+        self._delay()
+        if body is None:
+            self.misses.append(key)
+            print(f"--- [API Replay] Sin fixture para {key} ---")
+            return _build_response(request, 404, b'{}', 'Not Recorded')
+        return _build_response(request, 200, body, 'OK')
+
+    def close(self):
+        pass
@@ -1,26 +1,38 @@
 # src/app.py
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session
 from flask_caching import Cache
 from datetime import datetime
-import joblib
+import hashlib
 import os
+import threading
 import time
 
 # --- Importaciones de nuestros módulos ---
-from .api_client import get_games_for_date
-from .prediction_module import make_prediction
-from .ui_manager import prepare_game_data_for_ui
-from .config import TEAM_NAME_MAP, PREDICTION_LIMITS
+from .api_client import get_games_for_date, get_live_games_for_date
+from .prediction_module import make_predictions
+from .ui_manager import prepare_game_data_for_ui, merge_live_state
+from .config import TEAM_NAME_MAP, PREDICTION_LIMITS, PREDICTION_WORKERS, CACHE_DIR
+from .config import SLATE_FRESH_SECONDS, SLATE_KEEP_SECONDS, CACHE_LOCK_DIR, LIVE_STATE_SECONDS
+from .config import GAME_PREDICTION_SECONDS
+from .slate_cache import stale_while_revalidate
 from .status_manager import get_prediction_status
 from . import database_manager as db_manager
 from . import session_manager
+from . import metrics
+from .call_budget import attribute
+from .profiling import profile_block, profiled, should_profile
+from . import tree_model
+
+# Momento de la carga de la aplicación. Con gunicorn --preload ocurre una sola vez, en el
+# maestro, y todos los workers la heredan (junto con el modelo) al hacer fork.
+APP_LOADED_AT = time.time()
 
 # --- Configuración de la App y la Caché ---
 app = Flask(__name__, template_folder='templates', static_folder='static')
 app.secret_key = os.environ.get('SECRET_KEY', 'super_secreto_local_para_desarrollo')
 app.config['CACHE_TYPE'] = 'FileSystemCache'
-app.config['CACHE_DIR'] = os.path.join(os.path.dirname(__file__), 'cache')
+app.config['CACHE_DIR'] = CACHE_DIR
 cache = Cache(app)
 
 # --- Inicialización de la Base de Datos ---
@@ -31,12 +43,31 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # CAMBIO CLAVE: Cargar el nuevo modelo v2
 MODEL_PATH = os.path.join(BASE_DIR, 'ml_model', 'mlb_predictor_model_v2.pkl') 
 
-model = joblib.load(MODEL_PATH) if os.path.exists(MODEL_PATH) else None
-if model:
-    print(f"--- [App] Modelo cargado exitosamente desde: {MODEL_PATH} ---")
+MODEL_VERSION = None
+if os.path.exists(MODEL_PATH):
+    # Huella del archivo del modelo: al reentrenarlo, las predicciones en caché dejan de valer.
+    with open(MODEL_PATH, 'rb') as f:
+        MODEL_VERSION = hashlib.sha256(f.read()).hexdigest()[:12]
 else:
     print(f"--- [App] ERROR CRÍTICO: No se encontró el archivo del modelo en '{MODEL_PATH}'. ---")
 
+# El modelo se carga la primera vez que hace falta, normalmente desde su exportación NumPy
+# (src/tree_model.py), que no importa xgboost. Si hay que recurrir al .pkl, deserializarlo
+# importa joblib, xgboost y scikit-learn (cerca de un segundo), y una cartelera servida desde la
+# caché no lo necesita. Bajo gunicorn, el maestro lo carga antes del fork (ver gunicorn.conf.py).
+_model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """Devuelve el modelo de predicción (None si no existe el archivo), cargándolo una sola vez."""
+    global _model
+    if _model is None and MODEL_VERSION is not None:
+        with _model_lock:
+            if _model is None:
+                _model = tree_model.load_model(MODEL_PATH)
+                print(f"--- [App] Modelo cargado exitosamente desde: {MODEL_PATH} (versión {MODEL_VERSION}) ---")
+    return _model
+
 FEATURE_ORDER = [
     'home_recent_era', 'home_recent_whip', 'home_team_ops', 'home_bullpen_era', 
     'home_park_factor', 'away_recent_era', 'away_recent_whip', 'away_team_ops', 
@@ -49,23 +80,66 @@ def calculate_daily_live_metrics(games_list):
     accuracy = (winners / evaluated_predictions * 100) if evaluated_predictions > 0 else 0
     return accuracy, winners, evaluated_predictions
 
-@cache.memoize(timeout=900)
+def game_prediction_key(game):
+    """Clave de caché de la predicción de un partido: (gamePk, lanzador local, lanzador visitante, modelo)."""
+    teams = game.get('teams', {})
+    home_pitcher_id = teams.get('home', {}).get('probablePitcher', {}).get('id')
+    away_pitcher_id = teams.get('away', {}).get('probablePitcher', {}).get('id')
+    return f"game_prediction:{game.get('gamePk')}:{home_pitcher_id}:{away_pitcher_id}:{MODEL_VERSION}"
+
+def get_game_predictions(partidos):
+    """
+    Devuelve la predicción de cada partido, en orden. Solo se calculan los partidos sin entrada
+    en caché (nuevos, con lanzador distinto o que fallaron antes); el resto se reutiliza.
+    """
+    keys = [game_prediction_key(game) for game in partidos]
+    results = list(cache.get_many(*keys))
+    missing = [i for i, result in enumerate(results) if result is None]
+    metrics.inc('mlb_cache_requests_total', len(partidos) - len(missing), cache='game_prediction', result='hit')
+    metrics.inc('mlb_cache_requests_total', len(missing), cache='game_prediction', result='miss')
+    if missing:
+        computed = make_predictions([partidos[i] for i in missing], get_model(), FEATURE_ORDER, max_workers=PREDICTION_WORKERS)
+        to_cache = {}
+        for i, result in zip(missing, computed):
+            results[i] = result
+            # Los errores no se guardan, para reintentar ese partido en la próxima carga.
+            if result and 'error' not in result:
+                to_cache[keys[i]] = result
+        if to_cache:
+            cache.set_many(to_cache, timeout=GAME_PREDICTION_SECONDS)
+    print(f"--- [App] Predicciones: {len(partidos) - len(missing)} reutilizadas, {len(missing)} calculadas ---")
+    return results
+
+@stale_while_revalidate(cache, SLATE_FRESH_SECONDS, SLATE_KEEP_SECONDS, CACHE_LOCK_DIR)
+@profiled('get_predictions_for_date')
 def get_predictions_for_date(date_str):
     """
-    Esta es la función de trabajo pesado. Ahora es llamada por la app si la caché está vacía.
+    Esta es la función de trabajo pesado. Se llama solo si la caché no tiene la fecha; si la
+    tiene vencida, la página usa la versión anterior y esto se ejecuta en segundo plano.
     """
     print(f"--- [WORKER] La caché para {date_str} está vacía o expirada. Calculando nuevas predicciones... ---")
+    with metrics.timed('slate_compute'), attribute('slate', date_str, log=True):
+        return _compute_slate(date_str)
+
+def _compute_slate(date_str):
+    """Arma la cartelera de la fecha: predicción por partido, datos para la UI y escritura en la BD."""
     partidos = get_games_for_date(date_str)
     games_for_display = []
     if partidos:
-        for i, game in enumerate(partidos):
+        # Cada partido tiene su propia entrada en caché; solo los que cambiaron se recalculan, en
+        # paralelo y con una única evaluación del modelo. El orden de los partidos se conserva, y
+        # la BD se escribe al final en este hilo, que es el que tiene el contexto de la aplicación:
+        # una transacción para todas las predicciones y otra para todos los resultados.
+        prediction_results = get_game_predictions(partidos)
+
+        predictions_to_save = []
+        for i, (game, prediction_result) in enumerate(zip(partidos, prediction_results)):
             print(f"  -> Procesando partido {i+1}/{len(partidos)}...")
             try:
                 game_data = prepare_game_data_for_ui(game, [])
-                prediction_result = make_prediction(game, model, FEATURE_ORDER)
                 if prediction_result: game_data.update(prediction_result)
                 
-                db_manager.save_prediction({
+                predictions_to_save.append({
                     'game_id': game.get('gamePk'), 'prediction_date': date_str,
                     'home_team': game.get('teams', {}).get('home', {}).get('team', {}).get('name', 'N/A'),
                     'away_team': game.get('teams', {}).get('away', {}).get('team', {}).get('name', 'N/A'),
@@ -75,17 +149,65 @@ def get_predictions_for_date(date_str):
                 status, outcome = get_prediction_status(game_data, game_data.get('winner', 'N/A'))
                 game_data.update({'prediction_status': status, 'actual_outcome': outcome})
                 
-                if game_data.get('is_final'): db_manager.update_game_result(game_data)
-                
                 games_for_display.append(game_data)
             except Exception as e:
                 print(f"ERROR CRÍTICO procesando el juego {game.get('gamePk', 'N/A')}: {e}")
+
+        try:
+            db_manager.save_predictions(predictions_to_save)
+            db_manager.settle_games([g for g in games_for_display if g.get('is_final')])
+        except Exception as e:
+            print(f"ERROR CRÍTICO guardando la cartelera {date_str} en la BD: {e}")
     return games_for_display
 
+@cache.memoize(timeout=LIVE_STATE_SECONDS)
+def get_live_state_for_date(date_str):
+    """Estado en vivo de la fecha ({gamePk: partido}), con una sola llamada ligera y vida corta."""
+    return get_live_games_for_date(date_str)
+
+def apply_live_state(base_games_data, date_str):
+    """
+    Combina las predicciones en caché con el estado en vivo más reciente. Las predicciones no
+    se recalculan: solo se rehacen el marcador, el estado del juego y el estado del pronóstico.
+    """
+    # Si todos los partidos ya terminaron, el estado guardado es definitivo.
+    if not base_games_data or all(g.get('is_final') for g in base_games_data):
+        return base_games_data
+
+    live_games = get_live_state_for_date(date_str)
+    updated_games = []
+    newly_final = []
+    for game_data in base_games_data:
+        live_game = live_games.get(game_data.get('game_id'))
+        if live_game is None:
+            updated_games.append(game_data)
+            continue
+        was_final = game_data.get('is_final')
+        game_data = {**game_data, **prepare_game_data_for_ui(merge_live_state(game_data['game'], live_game), [])}
+        status, outcome = get_prediction_status(game_data, game_data.get('winner', 'N/A'))
+        game_data.update({'prediction_status': status, 'actual_outcome': outcome})
+        # El juego terminó después de calcular la cartelera: se registra ya el resultado.
+        if game_data.get('is_final') and not was_final:
+            newly_final.append(game_data)
+        updated_games.append(game_data)
+    if newly_final:
+        db_manager.settle_games(newly_final)
+        # Se guardan como finales en la cartelera en caché para no volver a liquidarlos en cada carga.
+        final_by_id = {g['game_id']: g for g in newly_final}
+        get_predictions_for_date.update_cached(
+            lambda games: [final_by_id.get(g.get('game_id'), g) for g in games], date_str
+        )
+    return updated_games
+
 @app.route('/', methods=['GET', 'POST'])
 def home():
+    with attribute('page', f"{request.method} {request.path}", log=True), \
+            profile_block('home', enabled=should_profile(request.headers)):
+        return _render_home()
+
+def _render_home():
     start_time = time.time()
-    if not model:
+    if MODEL_VERSION is None:
         return "Error: El modelo de predicción no se ha cargado. Revisa los logs del servidor.", 500
 
     user_role = request.form.get('user_role', session.get('user_role', 'Junior'))
@@ -99,7 +221,7 @@ def home():
     
     selected_date = request.form.get('game_date', datetime.now().strftime('%Y-%m-%d'))
     
-    base_games_data = get_predictions_for_date(selected_date)
+    base_games_data = apply_live_state(get_predictions_for_date(selected_date), selected_date)
     
     games_for_display = []
     for game_data in base_games_data:
@@ -115,10 +237,8 @@ def home():
     daily_accuracy, daily_winners, daily_evaluated_predictions = calculate_daily_live_metrics(games_for_display or [])
     overall_accuracy_global, total_winners_global, total_evaluated_predictions_global = db_manager.calculate_historical_accuracy()
 
-    end_time = time.time()
-    print(f"--- [App] Tiempo total de carga de la página: {end_time - start_time:.4f} segundos ---")
-
-    return render_template('index.html', 
+    with metrics.timed('render'):
+        page = render_template('index.html', 
                            games=games_for_display, 
                            selected_date=selected_date,
                            user_role=user_role, 
@@ -131,6 +251,51 @@ def home():
                            total_winners_global=total_winners_global, 
                            total_evaluated_predictions_global=total_evaluated_predictions_global)
 
+    end_time = time.time()
+    metrics.observe('mlb_stage_seconds', end_time - start_time, stage='page')
+    print(f"--- [App] Tiempo total de carga de la página: {end_time - start_time:.4f} segundos ---")
+    return page
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """
+    Métricas en formato de texto de Prometheus: la suma de todos los workers de gunicorn si
+    MLB_METRICS_DIR está definido (gunicorn.conf.py lo define) y, si no, las de este proceso.
+    """
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/ready')
+def readiness():
+    """
+    Chequeo de disponibilidad para el balanceador: 200 si el modelo está cargado y la BD
+    responde, 503 si no. Incluye la memoria del worker que atendió la petición.
+    """
+    checks = {'model': get_model() is not None, 'database': True}
+    try:
+        db_manager.ping()
+    except Exception as e:
+        print(f"--- [App] Chequeo de disponibilidad: la BD no responde: {e} ---")
+        checks['database'] = False
+    ready = all(checks.values())
+    return jsonify({
+        'status': 'ready' if ready else 'not_ready',
+        'checks': checks,
+        'model_version': MODEL_VERSION,
+        'pid': os.getpid(),
+        'seconds_since_load': round(time.time() - APP_LOADED_AT, 1),
+        'memory_mb': metrics.process_memory(),
+    }), 200 if ready else 503
+
+@app.route('/api/accuracy')
+def accuracy_breakdown():
+    """Precisión histórica global y su desglose por mes y por día, en JSON."""
+    accuracy, winners, evaluated = db_manager.calculate_historical_accuracy()
+    return jsonify({
+        'overall': {'accuracy': accuracy, 'winners': winners, 'evaluated': evaluated},
+        'by_month': db_manager.get_accuracy_breakdown('month'),
+        'by_day': db_manager.get_accuracy_breakdown('day'),
+    })
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
     app.run(debug=False, host='0.0.0.0', port=port)
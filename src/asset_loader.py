@@ -1,8 +1,9 @@
 # src/asset_loader.py (VERSIÓN FINAL COMPLETA)
 import joblib
-import pandas as pd
 import os
 
+from .columnar_store import load_csv
+
 def load_all_assets():
     print("--- [Asset Loader] Iniciando la carga de activos... ---")
     try:
@@ -14,9 +15,10 @@ def load_all_assets():
         model = joblib.load(model_path)
         print(f"Modelo cargado desde: {model_path}")
 
-        # 2. Cargamos el historial completo para los cálculos en vivo.
+        # 2. Cargamos el historial completo para los cálculos en vivo (desde el almacén
+        #    columnar si está al día; si no, desde el CSV).
         data_path = os.path.join(BASE_DIR, '..', 'data', 'historical_games_rich.csv')
-        historical_data = pd.read_csv(data_path, parse_dates=['game_date'])
+        historical_data = load_csv(data_path, parse_dates=['game_date'])
         print(f"Datos históricos cargados desde: {data_path}")
 
         print("--- [Asset Loader] Todos los activos cargados exitosamente. ---")
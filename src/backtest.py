@@ -1,175 +1,223 @@
 # src/backtest.py
 
-import data_enrichment as de
-from datetime import datetime, timedelta
-import pandas as pd
-import requests 
-import joblib
+import argparse
+import sys
 import os
-import time
-from config import TEAM_NAME_MAP
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
 
-def load_model(model_path):
-    """
-    Carga el modelo de predicción desde el archivo .pkl.
-    """
-    if not os.path.exists(model_path):
-        print(f"\n[ERROR] No se encontró el archivo del modelo en '{model_path}'.")
-        print("Por favor, ejecuta primero 'src/train_model.py' para crearlo.")
-        return None
-    print(f"--- Cargando modelo desde: {model_path} ---")
-    return joblib.load(model_path)
-
-def get_games_for_date(date):
+# --- Configuración del Path de Python ---
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.profiling import add_profile_argument, profile_block
+from src import feature_store, tree_model
+
+MODEL_PATH = 'src/ml_model/mlb_predictor_model.pkl'
+
+FEATURE_ORDER = [
+    'home_recent_era', 'home_recent_whip', 'home_team_ops', 'home_bullpen_era',
+    'home_park_factor', 'away_recent_era', 'away_recent_whip', 'away_team_ops',
+    'away_bullpen_era'
+]
+
+WINDOW_DAYS = 7
+CALIBRATION_BINS = 10
+# Las probabilidades se recortan a [EPS, 1 - EPS] para que el log-loss sea finito.
+LOG_LOSS_EPS = 1e-15
+
+# ===================================================================
+# BACKTEST WALK-FORWARD (solo datos locales, ventanas en paralelo)
+# ===================================================================
+def walk_forward_windows(start_date, end_date, window_days=WINDOW_DAYS):
+    """Divide [start_date, end_date] en ventanas consecutivas de window_days días (la última puede ser más corta)."""
+    windows = []
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(window_start + timedelta(days=window_days - 1), end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end + timedelta(days=1)
+    return windows
+
+def score_metrics(probabilities, outcomes, bins=CALIBRATION_BINS):
     """
-    Obtiene la lista de partidos programados para una fecha específica.
+    Precisión, log-loss, Brier y calibración de las probabilidades de victoria local frente al
+    resultado real (1 = ganó el local). La calibración agrupa las predicciones en 'bins' tramos
+    iguales de probabilidad; ECE es la diferencia media (ponderada por partidos) entre la
+    probabilidad predicha y la frecuencia observada de cada tramo.
     """
-    print(f"\n--- Obteniendo partidos para la fecha: {date.strftime('%Y-%m-%d')} ---")
-    schedule_url = f"{de.BASE_API_URL}/schedule"
-    schedule_params = {'sportId': 1, 'date': date.strftime('%Y-%m-%d')}
-    try:
-        response = requests.get(schedule_url, params=schedule_params)
-        response.raise_for_status()
-        schedule_data = response.json().get('dates', [])
-        if not schedule_data:
-            return []
-        return [game for game in schedule_data[0].get('games', []) if game['status']['abstractGameState'] == 'Final']
-    except requests.exceptions.RequestException as e:
-        print(f"Error al obtener el calendario: {e}")
-        return []
-
-def get_starting_pitchers(game):
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    outcomes = np.asarray(outcomes, dtype=np.float64)
+    clipped = np.clip(probabilities, LOG_LOSS_EPS, 1 - LOG_LOSS_EPS)
+    bin_indexes = np.minimum((probabilities * bins).astype(int), bins - 1)
+    counts = np.bincount(bin_indexes, minlength=bins)
+    predicted = np.bincount(bin_indexes, weights=probabilities, minlength=bins)
+    observed = np.bincount(bin_indexes, weights=outcomes, minlength=bins)
+    calibration = [
+        {
+            'bin_low': round(b / bins, 4),
+            'bin_high': round((b + 1) / bins, 4),
+            'games': int(counts[b]),
+            'mean_predicted': predicted[b] / counts[b],
+            'observed_rate': observed[b] / counts[b],
+        }
+        for b in range(bins) if counts[b]
+    ]
+    return {
+        'games': len(outcomes),
+        'accuracy': float(np.mean((probabilities > 0.5) == (outcomes == 1))),
+        'log_loss': float(-np.mean(outcomes * np.log(clipped) + (1 - outcomes) * np.log(1 - clipped))),
+        'brier': float(np.mean((probabilities - outcomes) ** 2)),
+        'ece': float(sum(row['games'] * abs(row['mean_predicted'] - row['observed_rate']) for row in calibration) / len(outcomes)),
+        'calibration': calibration,
+    }
+
+# Modelos ya cargados en cada proceso del pool (uno por ruta).
+_worker_models = {}
+
+def _window_model(model_path):
+    if model_path not in _worker_models:
+        _worker_models[model_path] = tree_model.load_model(model_path)
+    return _worker_models[model_path]
+
+def _score_window(task):
     """
-    Obtiene los lanzadores abridores de un juego desde el boxscore.
+    Se ejecuta en un proceso del pool: puntúa una ventana día a día, con un lote por día
+    (como la cartelera en producción), para cada modelo candidato.
+    Devuelve {ruta del modelo: probabilidades de victoria local}.
     """
-    try:
-        game_pk = game['gamePk']
-        boxscore_url = f"{de.BASE_API_URL}/game/{game_pk}/boxscore"
-        boxscore_response = requests.get(boxscore_url)
-        boxscore_data = boxscore_response.json()
-        
-        home_starter_id = boxscore_data['teams']['home']['pitchers'][0]
-        away_starter_id = boxscore_data['teams']['away']['pitchers'][0]
-        
-        return {
-            'home_pitcher_id': home_starter_id,
-            'away_pitcher_id': away_starter_id,
-        }
-    except (KeyError, IndexError, requests.exceptions.RequestException) as e:
-        print(f"No se pudo obtener el abridor del boxscore para el juego {game['gamePk']}: {e}")
-        return {}
-
-def run_backtest(model, feature_order, start_date, end_date):
+    model_paths, days, X = task
+    day_bounds = np.flatnonzero(np.r_[True, days[1:] != days[:-1], True])
+    probabilities = {}
+    for model_path in model_paths:
+        model = _window_model(model_path)
+        probabilities[model_path] = np.concatenate([
+            model.predict_proba(X[start:end])[:, 1] for start, end in zip(day_bounds[:-1], day_bounds[1:])
+        ]).astype(np.float64)
+    return probabilities
+
+def run_walk_forward(model_paths, feature_order, start_date, end_date, window_days=WINDOW_DAYS,
+                     workers=None, sync=False, bins=CALIBRATION_BINS):
     """
-    Ejecuta el backtesting del modelo en un rango de fechas.
+    Backtest walk-forward de uno o varios modelos entre start_date y end_date.
+    Las características salen del almacén local (feature_store, sin lookahead) en una sola
+    pasada; con sync=True antes se completan los almacenes desde la API. Cada ventana de
+    window_days días se puntúa en un proceso del pool y se informa, por modelo y ventana, de
+    precisión, log-loss, Brier y calibración.
+    Devuelve (métricas por ventana, tramos de calibración, predicciones por partido) como DataFrames.
     """
-    all_results = []
-    current_date = start_date
-    
-    while current_date <= end_date:
-        games_on_date = get_games_for_date(current_date)
-        
-        for game in games_on_date:
-            home_team = game['teams']['home']['team']
-            away_team = game['teams']['away']['team']
-            
-            pitchers = get_starting_pitchers(game)
-            if not pitchers:
-                continue
-
-            try:
-                game_date = datetime.strptime(game['gameDate'], '%Y-%m-%dT%H:%M:%SZ')
-                game_season = game_date.year
-
-                # Recopilar características
-                home_pitcher_stats = de.get_recent_pitcher_stats(pitchers['home_pitcher_id'], game_season, game_date - timedelta(days=30), game_date)
-                home_momentum = de.get_team_momentum(home_team['id'], game_season, game_date - timedelta(days=14), game_date)
-                
-                team_details_response = requests.get(f"{de.BASE_API_URL}/teams/{home_team['id']}")
-                venue_name = team_details_response.json()['teams'][0]['venue']['name']
-                home_park = de.get_park_factor(venue_name)
-
-                away_pitcher_stats = de.get_recent_pitcher_stats(pitchers['away_pitcher_id'], game_season, game_date - timedelta(days=30), game_date)
-                away_momentum = de.get_team_momentum(away_team['id'], game_season, game_date - timedelta(days=14), game_date)
-
-                features = {
-                    'home_recent_era': home_pitcher_stats.get('recent_era'),
-                    'home_recent_whip': home_pitcher_stats.get('recent_whip'),
-                    'home_team_ops': float(home_momentum.get('team_ops', 0) if home_momentum.get('team_ops') else 0),
-                    'home_bullpen_era': home_momentum.get('bullpen_era'),
-                    'home_park_factor': home_park.get('park_factor'),
-                    'away_recent_era': away_pitcher_stats.get('recent_era'),
-                    'away_recent_whip': away_pitcher_stats.get('recent_whip'),
-                    'away_team_ops': float(away_momentum.get('team_ops', 0) if away_momentum.get('team_ops') else 0),
-                    'away_bullpen_era': away_momentum.get('bullpen_era'),
-                }
-
-                # Preparar datos para la predicción
-                prediction_df = pd.DataFrame([features])[feature_order]
-                prediction_df.fillna(0, inplace=True) # Rellenar nulos
-
-                # Hacer predicción
-                prediction = model.predict(prediction_df)[0]
-                
-                # Almacenar resultado
-                result = {
-                    'date': game_date.strftime('%Y-%m-%d'),
-                    'home_team': home_team['name'],
-                    'away_team': away_team['name'],
-                    'prediction': 'home' if prediction == 1 else 'away',
-                    'actual_winner': 'home' if game['teams']['home']['isWinner'] else 'away'
-                }
-                result['correct_prediction'] = 1 if result['prediction'] == result['actual_winner'] else 0
-                all_results.append(result)
-                
-                print(f"  - Predicción para {away_team['name']} @ {home_team['name']}: {'Correcta' if result['correct_prediction'] else 'Incorrecta'}")
-
-            except Exception as e:
-                print(f"  - [ERROR] Saltando partido {game['gamePk']}: {e}")
-            
-            time.sleep(1) # Pausa para no sobrecargar la API
-
-        current_date += timedelta(days=1)
-        
-    return pd.DataFrame(all_results)
+    features = feature_store.build_features(start_date, end_date, sync=sync)
+    if features.empty:
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+
+    # Ventanas y lotes diarios van por fecha oficial (load_games ya devuelve ese orden).
+    X = feature_store.feature_matrix(features, feature_order)
+    days = features['official_date'].to_numpy()
+    outcomes = features['home_team_winner'].to_numpy(dtype=np.float64)
+    windows = walk_forward_windows(_as_date(start_date), _as_date(end_date), window_days)
+    bounds = np.searchsorted(days, [window_start.isoformat() for window_start, _ in windows]
+                             + [(windows[-1][1] + timedelta(days=1)).isoformat()])
+    windows = [(w, bounds[i], bounds[i + 1]) for i, w in enumerate(windows) if bounds[i] < bounds[i + 1]]
+    tasks = [(list(model_paths), days[lo:hi], X[lo:hi]) for _, lo, hi in windows]
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    print(f"--- [Backtest] {len(features)} partidos en {len(tasks)} ventanas de {window_days} días; "
+          f"{len(model_paths)} modelo(s), {workers} proceso(s) ---")
+    if workers == 1:
+        scored = [_score_window(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            scored = list(executor.map(_score_window, tasks))
+
+    window_rows, calibration_rows, prediction_frames = [], [], []
+    for model_path in model_paths:
+        for ((window_start, window_end), lo, hi), probabilities in zip(windows, scored):
+            metrics = score_metrics(probabilities[model_path], outcomes[lo:hi], bins)
+            window = {'model': model_path, 'window_start': window_start.isoformat(), 'window_end': window_end.isoformat()}
+            calibration_rows.extend({**window, **row} for row in metrics.pop('calibration'))
+            window_rows.append({**window, **metrics})
+        probabilities = np.concatenate([scores[model_path] for scores in scored])
+        window_labels = np.concatenate([[window_start.isoformat()] * (hi - lo) for (window_start, _), lo, hi in windows])
+        prediction_frames.append(pd.DataFrame({
+            'model': model_path,
+            'window_start': window_labels,
+            'date': days,
+            'home_team': features['home_team'],
+            'away_team': features['away_team'],
+            'home_win_probability': probabilities.round(4),
+            'prediction': np.where(probabilities > 0.5, 'home', 'away'),
+            'actual_winner': np.where(outcomes == 1, 'home', 'away'),
+        }))
+    predictions = pd.concat(prediction_frames, ignore_index=True)
+    predictions['correct_prediction'] = (predictions['prediction'] == predictions['actual_winner']).astype(int)
+    return pd.DataFrame(window_rows), pd.DataFrame(calibration_rows), predictions
+
+def summarize(predictions, bins=CALIBRATION_BINS):
+    """Métricas de todo el periodo por modelo (sin el detalle de calibración)."""
+    rows = []
+    for model_path, group in predictions.groupby('model', sort=False):
+        metrics = score_metrics(group['home_win_probability'], (group['actual_winner'] == 'home').astype(int), bins)
+        metrics.pop('calibration')
+        rows.append({'model': model_path, **metrics})
+    return pd.DataFrame(rows)
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
 
 # ===================================================================
 # BLOQUE PRINCIPAL DE EJECUCIÓN
 # ===================================================================
 if __name__ == "__main__":
-    MODEL_PATH = 'src/ml_model/mlb_predictor_model.pkl'
-    ml_model = load_model(MODEL_PATH)
-
-    if ml_model:
-        FEATURE_ORDER = [
-            'home_recent_era', 'home_recent_whip', 'home_team_ops', 'home_bullpen_era', 
-            'home_park_factor', 'away_recent_era', 'away_recent_whip', 'away_team_ops', 
-            'away_bullpen_era'
-        ]
-
-        # Definimos el rango de fechas para el backtesting
-        backtest_start_date = datetime(2024, 6, 1)
-        backtest_end_date = datetime(2024, 6, 30)
-        
+    # Uso: python src/backtest.py --start 2023-04-01 --end 2023-09-30 --models a.pkl b.pkl [--sync]
+    parser = argparse.ArgumentParser(description="Backtesting walk-forward del modelo de predicción (uno o varios candidatos).")
+    parser.add_argument('--start', type=date.fromisoformat, default=date(2024, 6, 1), help="Primer día (por defecto 2024-06-01).")
+    parser.add_argument('--end', type=date.fromisoformat, default=date(2024, 6, 30), help="Último día (por defecto 2024-06-30).")
+    parser.add_argument('--models', nargs='+', default=[MODEL_PATH], help=f"Modelos a comparar (por defecto {MODEL_PATH}).")
+    parser.add_argument('--window-days', type=int, default=WINDOW_DAYS, help=f"Días por ventana (por defecto {WINDOW_DAYS}).")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos del pool (por defecto, uno por CPU).")
+    parser.add_argument('--bins', type=int, default=CALIBRATION_BINS, help=f"Tramos de calibración (por defecto {CALIBRATION_BINS}).")
+    parser.add_argument('--sync', action='store_true', help="Completa antes los almacenes locales desde la API (si no, solo datos locales).")
+    parser.add_argument('--output', default='backtest_results.csv', help="Predicciones por partido (por defecto backtest_results.csv).")
+    parser.add_argument('--windows-output', default='backtest_windows.csv', help="Métricas por ventana (por defecto backtest_windows.csv).")
+    parser.add_argument('--calibration-output', default='backtest_calibration.csv', help="Calibración por ventana (por defecto backtest_calibration.csv).")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    missing = [path for path in args.models if not os.path.exists(path)]
+    if missing:
+        print(f"\n[ERROR] No se encontraron los modelos: {', '.join(missing)}.")
+        print("Por favor, ejecuta primero 'src/train_model.py' para crearlos.")
+        sys.exit(1)
+
+    print("\n" + "="*50)
+    print("INICIANDO BACKTESTING")
+    print(f"Periodo: {args.start} a {args.end} (ventanas de {args.window_days} días)")
+    print("="*50)
+
+    started = datetime.now()
+    with profile_block('run_backtest', enabled=bool(args.profile), directory=args.profile):
+        windows_df, calibration_df, results_df = run_walk_forward(
+            args.models, FEATURE_ORDER, args.start, args.end, window_days=args.window_days,
+            workers=args.workers, sync=args.sync, bins=args.bins,
+        )
+    elapsed = (datetime.now() - started).total_seconds()
+
+    if not results_df.empty:
         print("\n" + "="*50)
-        print("INICIANDO BACKTESTING")
-        print(f"Periodo: {backtest_start_date.strftime('%Y-%m-%d')} a {backtest_end_date.strftime('%Y-%m-%d')}")
+        print("RESULTADOS POR VENTANA")
         print("="*50)
+        print(windows_df.drop(columns='window_end').to_string(index=False, float_format='%.4f'))
 
-        results_df = run_backtest(ml_model, FEATURE_ORDER, backtest_start_date, backtest_end_date)
-        
-        if not results_df.empty:
-            accuracy = results_df['correct_prediction'].mean()
-            
-            print("\n" + "="*50)
-            print("RESULTADOS DEL BACKTESTING")
-            print("="*50)
-            print(f"Total de partidos predichos: {len(results_df)}")
-            print(f"Total de aciertos: {results_df['correct_prediction'].sum()}")
-            print(f"PRECISIÓN TOTAL: {accuracy:.2%}")
-            
-            output_filename = 'backtest_results.csv'
-            results_df.to_csv(output_filename, index=False)
-            print(f"\nResultados detallados guardados en '{output_filename}'")
-        else:
-            print("\nNo se pudieron generar resultados para el periodo de backtesting.")
+        print("\n" + "="*50)
+        print(f"RESULTADOS DEL BACKTESTING ({elapsed:.1f} s)")
+        print("="*50)
+        print(summarize(results_df, args.bins).to_string(index=False, float_format='%.4f'))
+
+        results_df.to_csv(args.output, index=False)
+        windows_df.to_csv(args.windows_output, index=False)
+        calibration_df.to_csv(args.calibration_output, index=False)
+        print(f"\nResultados guardados en '{args.output}', '{args.windows_output}' y '{args.calibration_output}'")
+    else:
+        print("\nNo hay partidos en los almacenes locales para ese periodo (usa --sync para descargarlos).")
@@ -0,0 +1,150 @@
+# src/boxscore_store.py
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from .config import LOCAL_STORE_DIR
+from .http_client import get_json
+from .metrics import cache_result, timed
+
+# Los boxscores de juegos finalizados nunca cambian, así que se guardan una sola vez en disco:
+#   - objects/<ab>/<sha256>.json.gz  -> contenido comprimido, direccionado por su hash
+#   - index.sqlite                   -> índice gamePk -> hash
+STORE_DIR = os.path.join(LOCAL_STORE_DIR, 'boxscores')
+OBJECTS_DIR = os.path.join(STORE_DIR, 'objects')
+INDEX_PATH = os.path.join(STORE_DIR, 'index.sqlite')
+
+# Caché en memoria (LRU) para no descomprimir el mismo boxscore varias veces dentro de una cartelera.
+MEMORY_CACHE_SIZE = 512
+
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+_init_lock = threading.Lock()
+_initialized = False
+# Candados por juego: si varios hilos piden a la vez un boxscore que no está guardado (p. ej.
+# los libros de los dos equipos del partido), solo uno lo descarga y los demás lo leen del almacén.
+# Es un conjunto fijo (gamePk % GAME_LOCK_STRIPES) para que no crezca durante la vida del worker;
+# dos juegos que caen en el mismo candado solo se descargan uno tras otro.
+GAME_LOCK_STRIPES = 64
+_game_locks = [threading.Lock() for _ in range(GAME_LOCK_STRIPES)]
+
+
+def _connect():
+    global _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                os.makedirs(OBJECTS_DIR, exist_ok=True)
+                with sqlite3.connect(INDEX_PATH, timeout=30) as conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS boxscores ("
+                        " game_pk INTEGER PRIMARY KEY, digest TEXT NOT NULL,"
+                        " size INTEGER NOT NULL, stored_at TEXT NOT NULL)"
+                    )
+                _initialized = True
+    return sqlite3.connect(INDEX_PATH, timeout=30)
+
+
+def _game_lock(game_pk):
+    return _game_locks[game_pk % GAME_LOCK_STRIPES]
+
+
+def _object_path(digest):
+    return os.path.join(OBJECTS_DIR, digest[:2], f"{digest}.json.gz")
+
+
+def _remember(game_pk, data):
+    with _memory_lock:
+        _memory_cache[game_pk] = data
+        _memory_cache.move_to_end(game_pk)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+
+def load_boxscore(game_pk):
+    """Devuelve el boxscore guardado localmente para 'game_pk', o None si no está en el almacén."""
+    game_pk = int(game_pk)
+    with _memory_lock:
+        if game_pk in _memory_cache:
+            _memory_cache.move_to_end(game_pk)
+            return _memory_cache[game_pk]
+
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT digest FROM boxscores WHERE game_pk = ?", (game_pk,)).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+
+    try:
+        with gzip.open(_object_path(row[0]), 'rb') as f:
+            data = json.loads(f.read())
+    except (OSError, ValueError) as e:
+        print(f"--- [Boxscore Store] Objeto dañado o ausente para el juego {game_pk}: {e} ---")
+        return None
+    _remember(game_pk, data)
+    return data
+
+
+def save_boxscore(game_pk, data):
+    """Guarda el boxscore de un juego finalizado y devuelve el hash de su contenido."""
+    game_pk = int(game_pk)
+    payload = json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    digest = hashlib.sha256(payload).hexdigest()
+
+    conn = _connect()
+    try:
+        path = _object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(gzip.compress(payload))
+            os.replace(tmp_path, path)  # Escritura atómica: nunca queda un objeto a medias.
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO boxscores (game_pk, digest, size, stored_at) VALUES (?, ?, ?, ?)",
+                (game_pk, digest, len(payload), datetime.now(timezone.utc).isoformat(timespec='seconds')),
+            )
+    finally:
+        conn.close()
+    _remember(game_pk, data)
+    return digest
+
+
+def get_boxscore(game_pk, is_final=True):
+    """
+    Devuelve el boxscore de un juego. Los juegos finalizados se leen del almacén local y,
+    si no están, se descargan una única vez y se guardan. Los juegos en vivo o sin terminar
+    siempre van a la red y no se guardan.
+    """
+    if is_final:
+        data = load_boxscore(game_pk)
+        if data is not None:
+            cache_result('boxscore', 'hit')
+            return data
+        with _game_lock(int(game_pk)):
+            # Otro hilo pudo descargarlo mientras se esperaba el candado.
+            data = load_boxscore(game_pk)
+            if data is not None:
+                cache_result('boxscore', 'hit')
+                return data
+            cache_result('boxscore', 'miss')
+            with timed('boxscore_fetch'):
+                data = get_json(f"/game/{game_pk}/boxscore")
+            save_boxscore(game_pk, data)
+            return data
+
+    with timed('boxscore_fetch'):
+        return get_json(f"/game/{game_pk}/boxscore")
+
+
+def is_final_game(game):
+    """Indica si un partido del calendario (schedule) ya terminó."""
+    return game.get('status', {}).get('abstractGameState') == 'Final'
@@ -1,11 +1,11 @@
 # src/build_dataset.py
 
+import argparse
+import functools
 import sys
 import os
-from datetime import datetime
+from datetime import date
 import pandas as pd
-import requests
-import time
 import calendar
 
 # --- Configuración del Path de Python ---
@@ -13,8 +13,11 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(project_root)
 
 # Ahora podemos importar desde 'src'
-from src.prediction_module import get_recent_pitcher_stats, get_team_momentum, PARK_FACTORS
-from src.api_client import get_games_for_date
+from src.feature_store import FEATURE_COLUMNS
+from src.boxscore_store import get_boxscore
+from src.call_budget import attribute
+from src.dataset_builder import build
+from src.profiling import add_profile_argument, profile_block
 from src.feature_engineering import get_pitcher_splits # <--- NUEVA IMPORTACIÓN
 
 def get_lineup_composition(boxscore_data, team_side):
@@ -36,112 +39,113 @@ def get_lineup_composition(boxscore_data, team_side):
             
     return {'lefties': lefties, 'righties': righties, 'switch': switch}
 
-def process_game_data(game):
-    """
-    Procesa un solo juego para extraer todas las características, incluyendo las nuevas.
-    """
-    try:
-        game_date = datetime.strptime(game['gameDate'], '%Y-%m-%dT%H:%M:%SZ')
-        game_season = game_date.year
+@functools.lru_cache(maxsize=None)
+def _pitcher_splits(pitcher_id, season):
+    # Los splits son de temporada: se piden una vez por lanzador, no una vez por partido.
+    return get_pitcher_splits(pitcher_id, season)
 
-        game_pk = game['gamePk']
-        boxscore_url = f"https://statsapi.mlb.com/api/v1/game/{game_pk}/boxscore"
-        boxscore_response = requests.get(boxscore_url, timeout=15)
-        boxscore_data = boxscore_response.json()
-        
-        home_team = game['teams']['home']['team']
-        away_team = game['teams']['away']['team']
-        
-        if not boxscore_data['teams']['home'].get('pitchers') or not boxscore_data['teams']['away'].get('pitchers'):
+def _skip_failed(func):
+    # Un partido que falla en cualquier etapa se omite (con su error en el log), como antes.
+    @functools.wraps(func)
+    def stage(item):
+        try:
+            return func(item)
+        except Exception as e:
+            game = item['game'] if isinstance(item, dict) else item
+            print(f"\n[ERROR] No se pudo procesar el partido {game.game_pk}: {e}")
             return None
+    return stage
 
-        home_starter_id = boxscore_data['teams']['home']['pitchers'][0]
-        away_starter_id = boxscore_data['teams']['away']['pitchers'][0]
-        home_pitcher_name = boxscore_data['teams']['home']['players'][f'ID{home_starter_id}']['person']['fullName']
-        away_pitcher_name = boxscore_data['teams']['away']['players'][f'ID{away_starter_id}']['person']['fullName']
-
-        print(f"Procesando: {away_team['name']} @ {home_team['name']}...")
+@_skip_failed
+def fetch_game(game):
+    """
+    Etapa 'fetch' (red): boxscore y splits de los abridores de una fila del almacén de
+    características (feature_store), que ya trae las características del modelo sin lookahead.
+    """
+    with attribute('dataset_row', game.game_pk):
+        # Solo hay partidos finalizados, así que el boxscore sale del almacén local.
+        boxscore_data = get_boxscore(game.game_pk, is_final=True)
+        # --- NUEVAS CARACTERÍSTICAS DE INGENIERÍA ---
+        home_pitcher_splits = _pitcher_splits(game.home_pitcher_id, game.season)
+        away_pitcher_splits = _pitcher_splits(game.away_pitcher_id, game.season)
+    return {'game': game, 'boxscore': boxscore_data,
+            'home_pitcher_splits': home_pitcher_splits, 'away_pitcher_splits': away_pitcher_splits}
 
-        # --- RECOPILACIÓN DE CARACTERÍSTICAS ---
-        home_pitcher_stats = get_recent_pitcher_stats(home_starter_id, game_season, game_date)
-        home_momentum = get_team_momentum(home_team['id'], game_season, game_date)
-        venue_name = game.get('venue', {}).get('name')
-        home_park_factor = PARK_FACTORS.get(venue_name)
+@_skip_failed
+def parse_game(fetched):
+    """Etapa 'parse' (CPU): nombres de los abridores y composición de las alineaciones."""
+    game, boxscore_data = fetched['game'], fetched['boxscore']
+    print(f"Procesando: {game.away_team} @ {game.home_team}...")
+    return {
+        **fetched,
+        'home_pitcher_name': boxscore_data['teams']['home']['players'][f'ID{game.home_pitcher_id}']['person']['fullName'],
+        'away_pitcher_name': boxscore_data['teams']['away']['players'][f'ID{game.away_pitcher_id}']['person']['fullName'],
+        'home_lineup': get_lineup_composition(boxscore_data, 'home'),
+        'away_lineup': get_lineup_composition(boxscore_data, 'away'),
+    }
 
-        away_pitcher_stats = get_recent_pitcher_stats(away_starter_id, game_season, game_date)
-        away_momentum = get_team_momentum(away_team['id'], game_season, game_date)
+@_skip_failed
+def game_features(parsed):
+    """Etapa 'feature': la fila del dataset."""
+    game = parsed['game']
+    home_pitcher_splits, away_pitcher_splits = parsed['home_pitcher_splits'], parsed['away_pitcher_splits']
+    home_lineup, away_lineup = parsed['home_lineup'], parsed['away_lineup']
+    return {
+        'game_date': game.game_date,
+        'home_team': game.home_team, 'away_team': game.away_team,
+        'home_pitcher': parsed['home_pitcher_name'], 'away_pitcher': parsed['away_pitcher_name'],
         
-        # --- NUEVAS CARACTERÍSTICAS DE INGENIERÍA ---
-        home_pitcher_splits = get_pitcher_splits(home_starter_id, game_season)
-        away_pitcher_splits = get_pitcher_splits(away_starter_id, game_season)
+        # Características existentes (del almacén de características)
+        **{col: getattr(game, col) for col in FEATURE_COLUMNS},
         
-        home_lineup = get_lineup_composition(boxscore_data, 'home')
-        away_lineup = get_lineup_composition(boxscore_data, 'away')
-        # -----------------------------------------
-
-        features = {
-            'game_date': game_date.strftime('%Y-%m-%d'),
-            'home_team': home_team['name'], 'away_team': away_team['name'],
-            'home_pitcher': home_pitcher_name, 'away_pitcher': away_pitcher_name,
-            
-            # Características existentes
-            'home_recent_era': home_pitcher_stats.get('recent_era'),
-            'home_recent_whip': home_pitcher_stats.get('recent_whip'),
-            'home_team_ops': float(home_momentum.get('team_ops', 0) if home_momentum.get('team_ops') else 0),
-            'home_bullpen_era': home_momentum.get('bullpen_era'),
-            'home_park_factor': home_park_factor,
-            'away_recent_era': away_pitcher_stats.get('recent_era'),
-            'away_recent_whip': away_pitcher_stats.get('recent_whip'),
-            'away_team_ops': float(away_momentum.get('team_ops', 0) if away_momentum.get('team_ops') else 0),
-            'away_bullpen_era': away_momentum.get('bullpen_era'),
-            
-            # Nuevas características de enfrentamientos
-            'home_pitcher_ops_vs_L': home_pitcher_splits.get('vs_left_ops'),
-            'home_pitcher_ops_vs_R': home_pitcher_splits.get('vs_right_ops'),
-            'away_team_lefty_batters': away_lineup.get('lefties'),
-            'away_team_righty_batters': away_lineup.get('righties'),
-            
-            'away_pitcher_ops_vs_L': away_pitcher_splits.get('vs_left_ops'),
-            'away_pitcher_ops_vs_R': away_pitcher_splits.get('vs_right_ops'),
-            'home_team_lefty_batters': home_lineup.get('lefties'),
-            'home_team_righty_batters': home_lineup.get('righties'),
-
-            'home_team_winner': 1 if game['teams']['home']['isWinner'] else 0
-        }
+        # Nuevas características de enfrentamientos
+        'home_pitcher_ops_vs_L': home_pitcher_splits.get('vs_left_ops'),
+        'home_pitcher_ops_vs_R': home_pitcher_splits.get('vs_right_ops'),
+        'away_team_lefty_batters': away_lineup.get('lefties'),
+        'away_team_righty_batters': away_lineup.get('righties'),
         
-        return features
+        'away_pitcher_ops_vs_L': away_pitcher_splits.get('vs_left_ops'),
+        'away_pitcher_ops_vs_R': away_pitcher_splits.get('vs_right_ops'),
+        'home_team_lefty_batters': home_lineup.get('lefties'),
+        'home_team_righty_batters': home_lineup.get('righties'),
 
-    except Exception as e:
-        print(f"\n[ERROR] No se pudo procesar el partido {game.get('gamePk', 'N/A')}: {e}")
-        return None
+        'home_team_winner': game.home_team_winner
+    }
+
+def process_game_data(game):
+    """
+    Completa una fila del almacén de características con las de enfrentamiento: splits de
+    los abridores y composición de las alineaciones. Es el pipeline fetch -> parse -> feature
+    en serie; el constructor (src/dataset_builder.py) ejecuta esas etapas en paralelo.
+    """
+    fetched = fetch_game(game)
+    parsed = fetched and parse_game(fetched)
+    return parsed and game_features(parsed)
 
 # ===================================================================
 # BLOQUE PRINCIPAL DE EJECUCIÓN
 # ===================================================================
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construye el dataset de la temporada con lanzadores y alineaciones.")
+    parser.add_argument('--rebuild', action='store_true', help="Ignora los checkpoints y reconstruye toda la temporada.")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
     YEAR = 2023
     START_MONTH = 4
     END_MONTH = 9
     
-    all_game_features = []
+    start_date = date(YEAR, START_MONTH, 1)
+    end_date = date(YEAR, END_MONTH, calendar.monthrange(YEAR, END_MONTH)[1])
+    output_filename = f"mlb_dataset_{YEAR}_season_v2.csv"
+    output_path = os.path.join(project_root, output_filename)
+    with profile_block('src_build_dataset', enabled=bool(args.profile), directory=args.profile):
+        # Cada día se guarda en su partición con checkpoint: si el proceso se corta, la
+        # siguiente ejecución continúa desde el último día terminado (ver src/dataset_builder.py).
+        total = build('matchup', start_date, end_date, output_path=output_path, rebuild=args.rebuild)
     
-    for month in range(START_MONTH, END_MONTH + 1):
-        _, num_days = calendar.monthrange(YEAR, month)
-        for day in range(1, num_days + 1):
-            current_date = datetime(YEAR, month, day)
-            games_on_date = get_games_for_date(current_date.strftime('%Y-%m-%d'))
-            for game in games_on_date:
-                game_data = process_game_data(game)
-                if game_data:
-                    all_game_features.append(game_data)
-                time.sleep(1.5) 
-    
-    if all_game_features:
-        dataset = pd.DataFrame(all_game_features)
-        output_filename = f"mlb_dataset_{YEAR}_season_v2.csv"
-        output_path = os.path.join(project_root, output_filename)
-        dataset.to_csv(output_path, index=False)
-        
+    if total:
+        dataset = pd.read_csv(output_path)
         print("\n" + "="*50)
         print("PROCESO COMPLETADO")
         print(f"Se ha creado el dataset '{output_path}' con {len(dataset)} partidos.")
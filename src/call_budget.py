@@ -0,0 +1,90 @@
+# src/call_budget.py
+import contextvars
+import threading
+from contextlib import contextmanager
+
+from . import metrics
+
+# Contabilidad de llamadas a la API de la MLB por "ámbito": la página que se está sirviendo, la
+# cartelera de una fecha, un partido, un día del backtest o una fila del dataset. Los ámbitos se
+# anidan (una página contiene su cartelera y esta sus partidos) y cada llamada cuenta en todos
+# los ámbitos activos. Los ámbitos viajan en un ContextVar; para que lleguen a los hilos de un
+# pool hay que enviar las tareas con context_map().
+
+_active_scopes = contextvars.ContextVar('mlb_call_scopes', default=())
+
+
+class CallScope:
+    """Llamadas hechas dentro de un ámbito, por endpoint."""
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint):
+        with self._lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    @property
+    def total(self):
+        with self._lock:
+            return sum(self.counts.values())
+
+    def summary(self):
+        with self._lock:
+            detail = ", ".join(f"{endpoint}={count}" for endpoint, count in sorted(self.counts.items()))
+        return f"{self.kind} {self.name}: {self.total} llamadas" + (f" ({detail})" if detail else "")
+
+
+@contextmanager
+def attribute(kind, name, log=False):
+    """
+    Atribuye al ámbito (kind, name) todas las llamadas hechas dentro del bloque, p. ej.
+    attribute('backtest_date', '2024-06-01'). Con log=True imprime el resumen al salir.
+    """
+    scope = CallScope(kind, name)
+    token = _active_scopes.set(_active_scopes.get() + (scope,))
+    try:
+        yield scope
+    finally:
+        _active_scopes.reset(token)
+        metrics.observe('mlb_api_calls_per_scope', scope.total, scope=kind)
+        if log:
+            print(f"--- [Call Budget] {scope.summary()} ---")
+
+
+def record_call(endpoint):
+    """Registra una llamada en todos los ámbitos activos (la llama http_client)."""
+    scopes = _active_scopes.get()
+    for scope in scopes:
+        scope.add(endpoint)
+    metrics.inc('mlb_api_calls_attributed_total', endpoint=endpoint, scope=scopes[-1].kind if scopes else 'unattributed')
+
+
+def context_map(executor, fn, items):
+    """Como executor.map, pero cada tarea hereda los ámbitos activos del hilo que la envía."""
+    futures = [executor.submit(contextvars.copy_context().run, fn, item) for item in items]
+    return [future.result() for future in futures]
+
+
+@contextmanager
+def assert_call_budget(max_calls=None, **max_by_endpoint):
+    """
+    Ayuda para pruebas y benchmarks: falla (AssertionError) si el bloque hace más de 'max_calls'
+    llamadas en total, o más de las indicadas para algún endpoint, p. ej.
+        with assert_call_budget(300, boxscore=250):
+            get_predictions_for_date('2024-06-01')
+    """
+    with attribute('budget', 'assert_call_budget') as scope:
+        yield scope
+    problems = []
+    if max_calls is not None and scope.total > max_calls:
+        problems.append(f"total {scope.total} > {max_calls}")
+    for endpoint, limit in max_by_endpoint.items():
+        used = scope.counts.get(endpoint, 0)
+        if used > limit:
+            problems.append(f"{endpoint} {used} > {limit}")
+    if problems:
+        raise AssertionError(f"Presupuesto de llamadas excedido: {'; '.join(problems)} ({scope.summary()})")
@@ -0,0 +1,344 @@
+# src/columnar_store.py
+import glob
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from .config import COLUMNAR_DIR
+
+# Almacén columnar para los datasets históricos (historical_games_*.csv, mlb_dataset_*.csv,
+# backtest_results.csv). Cada dataset se guarda como
+#   <COLUMNAR_DIR>/<dataset>/_dataset.json            esquema, temporadas y CSV de origen
+#   <COLUMNAR_DIR>/<dataset>/season=<YYYY>/<col>.npy   una columna tipada por archivo
+#   <COLUMNAR_DIR>/<dataset>/season=<YYYY>/_day.npy    día de cada fila (días desde 1970-01-01)
+# Dentro de cada temporada las filas están ordenadas por fecha, así que cada día es un tramo
+# contiguo que se localiza con searchsorted sobre _day.npy.
+#
+# Al leer solo se abren las columnas pedidas y las temporadas del rango (pushdown de columnas y
+# fechas), y los .npy se mapean en memoria (np.load con mmap_mode='r'): el sistema operativo
+# carga solo las páginas que se tocan y las comparte entre procesos.
+#
+# Tipos en disco: enteros con el menor ancho que cabe, float64 sin cambios (mismos valores que
+# el CSV), bool, fechas 'YYYY-MM-DD' (datetime64[D]) y el resto del texto como categoría (códigos
+# enteros + lista de valores en _dataset.json). Al leer, cada columna vuelve al dtype que tenía en
+# pandas (se guarda en el manifiesto): los enteros se amplían otra vez a int64, para que la
+# aritmética no desborde, y el texto y las fechas vuelven a ser texto, como con pd.read_csv.
+# Con categorical=True el texto se devuelve como Categorical, sin materializar las cadenas.
+
+FORMAT_VERSION = 2
+# CSV que convierte 'python -m src.columnar_store convert' sin argumentos (relativos a la raíz).
+KNOWN_CSVS = ['data/historical_games_rich.csv', 'data/historical_games_expert.csv', 'mlb_dataset_*.csv', 'backtest_results.csv']
+DATE_COLUMNS = ('official_date', 'game_date', 'date')
+DAY_INDEX = '_day'
+
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def dataset_dir(name):
+    return os.path.join(COLUMNAR_DIR, name)
+
+
+def dataset_name_for(csv_path):
+    """Nombre del dataset columnar de un CSV: el nombre del archivo sin extensión."""
+    return os.path.splitext(os.path.basename(csv_path))[0]
+
+
+def _int_dtype(values):
+    if len(values) == 0:
+        return np.dtype(np.int8)
+    low, high = int(values.min()), int(values.max())
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _matches(values, pattern):
+    return len(values) > 0 and all(isinstance(v, str) and pattern.match(v) for v in values)
+
+
+def _encode(series):
+    """(array tipado, descripción de la columna) para una columna de un DataFrame."""
+    meta = {'pandas_dtype': str(series.dtype)}
+    if pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=bool), {'kind': 'bool', **meta}
+    if pd.api.types.is_integer_dtype(series):
+        values = series.to_numpy()
+        return values.astype(_int_dtype(values)), {'kind': 'int', **meta}
+    if pd.api.types.is_float_dtype(series):
+        return series.to_numpy(dtype=np.float64), {'kind': 'float', **meta}
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        utc = series.dt.tz_convert('UTC').dt.tz_localize(None)
+        return utc.to_numpy(dtype='datetime64[s]'), {'kind': 'datetime', 'tz': 'UTC', **meta}
+    if pd.api.types.is_datetime64_dtype(series):
+        return series.to_numpy(dtype='datetime64[s]'), {'kind': 'datetime', 'tz': None, **meta}
+
+    present = series.dropna().unique()
+    if _matches(present, _DATE_RE):
+        # 'YYYY-MM-DD' se reconstruye exacto al leer; otros formatos de fecha se guardan como texto.
+        return pd.to_datetime(series, format='%Y-%m-%d').to_numpy(dtype='datetime64[D]'), {'kind': 'date', **meta}
+    codes, categories = pd.factorize(series.astype(object), sort=True)
+    return codes.astype(_int_dtype(np.array([-1, len(categories)]))), {
+        'kind': 'category', 'categories': [str(value) for value in categories], **meta,
+    }
+
+
+def _as_text(values, mask, pandas_dtype):
+    """Array de texto con NaN en 'mask', con el dtype de pandas original ('str' u 'object')."""
+    values = np.asarray(values, dtype=object)
+    values[mask] = np.nan
+    return pd.array(values, dtype=pandas_dtype)
+
+
+def _decode(values, column, categorical=False):
+    kind = column['kind']
+    pandas_dtype = column['pandas_dtype']
+    if kind == 'int':
+        return np.asarray(values).astype(pandas_dtype)
+    if kind == 'category':
+        codes = np.asarray(values)
+        if categorical:
+            return pd.Categorical.from_codes(codes, categories=column['categories'])
+        categories = np.array(column['categories'], dtype=object)
+        return _as_text(categories[np.maximum(codes, 0)] if len(categories) else codes.astype(object),
+                        codes < 0, pandas_dtype)
+    if kind == 'date':
+        return _as_text(np.datetime_as_string(values, unit='D'), np.isnat(values), pandas_dtype)
+    if kind == 'datetime' and column.get('tz'):
+        return pd.DatetimeIndex(values).tz_localize(column['tz'])
+    return values
+
+
+def _day_numbers(dates):
+    """Días desde 1970-01-01 (int32) de un array datetime64."""
+    return dates.astype('datetime64[D]').astype(np.int32)
+
+
+def _as_day_number(value):
+    return int(np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int32))
+
+
+def write_table(name, df, date_column=None, source=None):
+    """
+    Guarda 'df' como el dataset columnar 'name', partido por temporada y ordenado por fecha
+    ('date_column'; por defecto, la primera de DATE_COLUMNS que exista). Reemplaza de forma
+    atómica cualquier versión anterior. 'source' es el CSV de origen, para detectar si cambia.
+    """
+    date_column = date_column or next((col for col in DATE_COLUMNS if col in df.columns), None)
+    if date_column is None or date_column not in df.columns:
+        raise ValueError(f"'{name}' no tiene columna de fecha ({', '.join(DATE_COLUMNS)}) para particionar")
+
+    encoded, columns = {}, []
+    for col in df.columns:
+        encoded[col], meta = _encode(df[col])
+        columns.append({'name': col, 'dtype': encoded[col].dtype.str, **meta})
+    dates = encoded[date_column]
+    if not np.issubdtype(dates.dtype, np.datetime64):
+        # Fechas con hora guardadas como texto: el día se calcula en UTC, igual que en load_csv.
+        try:
+            dates = pd.to_datetime(df[date_column], utc=True).dt.tz_localize(None).to_numpy(dtype='datetime64[s]')
+        except (ValueError, TypeError):
+            raise ValueError(f"La columna '{date_column}' de '{name}' no contiene fechas")
+    if np.isnat(dates).any():
+        raise ValueError(f"La columna '{date_column}' de '{name}' tiene filas sin fecha")
+
+    days = _day_numbers(dates)
+    order = np.argsort(days, kind='stable')
+    days = days[order]
+    seasons = days.astype('datetime64[D]').astype('datetime64[Y]').astype(int) + 1970
+
+    final_dir = dataset_dir(name)
+    temp_dir = f"{final_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    season_rows = {}
+    for season in np.unique(seasons):
+        lo, hi = np.searchsorted(seasons, [season, season + 1])
+        rows = order[lo:hi]
+        season_dir = os.path.join(temp_dir, f"season={season}")
+        os.makedirs(season_dir)
+        np.save(os.path.join(season_dir, f"{DAY_INDEX}.npy"), days[lo:hi])
+        for col in df.columns:
+            np.save(os.path.join(season_dir, f"{col}.npy"), encoded[col][rows])
+        season_rows[str(season)] = int(hi - lo)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'name': name,
+        'date_column': date_column,
+        'columns': columns,
+        'seasons': season_rows,
+        'rows': int(len(df)),
+        'source': _source_stamp(source) if source else None,
+        'written_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    os.makedirs(temp_dir, exist_ok=True)
+    with open(os.path.join(temp_dir, '_dataset.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+
+    old_dir = f"{final_dir}.old-{os.getpid()}"
+    if os.path.exists(final_dir):
+        os.replace(final_dir, old_dir)
+    os.replace(temp_dir, final_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    print(f"--- [Columnar Store] '{name}': {len(df)} filas en {len(season_rows)} temporada(s) guardadas en {final_dir} ---")
+    return manifest
+
+
+def read_manifest(name):
+    path = os.path.join(dataset_dir(name), '_dataset.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def read_table(name, columns=None, start=None, end=None, mmap=True, parse_dates=None, categorical=False):
+    """
+    DataFrame del dataset 'name' con solo 'columns' (por defecto, todas) y solo las filas con
+    fecha entre 'start' y 'end' (inclusive; None = sin límite). Solo se abren las temporadas
+    del rango y, con mmap=True, las columnas float y bool de una sola temporada no se copian.
+    Los dtypes son los de pd.read_csv; 'parse_dates' convierte columnas a fecha como en
+    read_csv y categorical=True devuelve el texto como Categorical.
+    """
+    manifest = read_manifest(name)
+    if manifest is None:
+        raise FileNotFoundError(f"No existe el dataset columnar '{name}' en {COLUMNAR_DIR}")
+    by_name = {column['name']: column for column in manifest['columns']}
+    columns = list(columns) if columns is not None else list(by_name)
+    unknown = [col for col in columns if col not in by_name]
+    if unknown:
+        raise KeyError(f"Columnas desconocidas en '{name}': {', '.join(unknown)}")
+
+    start_day = _as_day_number(start) if start is not None else None
+    end_day = _as_day_number(end) if end is not None else None
+    mmap_mode = 'r' if mmap else None
+    parts = {col: [] for col in columns}
+    for season in sorted(manifest['seasons'], key=int):
+        year = int(season)
+        if (start is not None and year < pd.Timestamp(start).year) or (end is not None and year > pd.Timestamp(end).year):
+            continue
+        season_dir = os.path.join(dataset_dir(name), f"season={season}")
+        days = np.load(os.path.join(season_dir, f"{DAY_INDEX}.npy"), mmap_mode=mmap_mode)
+        lo = int(np.searchsorted(days, start_day, side='left')) if start_day is not None else 0
+        hi = int(np.searchsorted(days, end_day, side='right')) if end_day is not None else len(days)
+        if lo >= hi:
+            continue
+        for col in columns:
+            parts[col].append(np.load(os.path.join(season_dir, f"{col}.npy"), mmap_mode=mmap_mode)[lo:hi])
+
+    data = {}
+    for col in columns:
+        chunks = parts[col]
+        if not chunks:
+            values = np.empty(0, dtype=np.dtype(by_name[col]['dtype']))
+        else:
+            values = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+        data[col] = _decode(values, by_name[col], categorical=categorical)
+    df = pd.DataFrame(data, columns=columns, copy=False)
+    for col in parse_dates or []:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    return df
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def is_fresh(csv_path, name=None):
+    """True si existe la versión columnar de 'csv_path' y el CSV no ha cambiado desde la conversión."""
+    manifest = read_manifest(name or dataset_name_for(csv_path))
+    if manifest is None or not manifest.get('source') or not os.path.exists(csv_path):
+        return False
+    stamp = _source_stamp(csv_path)
+    return all(manifest['source'].get(key) == stamp[key] for key in ('size', 'mtime_ns'))
+
+
+def convert_csv(csv_path, name=None, date_column=None):
+    """Convierte un CSV al almacén columnar (lo lee entero una vez). Devuelve el manifiesto."""
+    name = name or dataset_name_for(csv_path)
+    df = pd.read_csv(csv_path)
+    return write_table(name, df, date_column=date_column, source=csv_path)
+
+
+def load_csv(csv_path, columns=None, start=None, end=None, name=None, parse_dates=None, **read_csv_kwargs):
+    """
+    Lee un dataset histórico con los mismos dtypes que pd.read_csv: desde el almacén columnar
+    si su versión está al día (con pushdown de columnas y fechas) y, si no, desde el CSV con
+    pandas, aplicando el mismo filtro. 'read_csv_kwargs' solo se usa en ese segundo caso.
+    """
+    name = name or dataset_name_for(csv_path)
+    if is_fresh(csv_path, name):
+        return read_table(name, columns=columns, start=start, end=end, parse_dates=parse_dates)
+
+    if read_manifest(name) is not None:
+        print(f"--- [Columnar Store] '{csv_path}' cambió desde su conversión; se lee el CSV "
+              f"(python -m src.columnar_store convert {csv_path}) ---")
+    if columns is not None and start is None and end is None:
+        read_csv_kwargs.setdefault('usecols', list(columns))
+    if parse_dates is not None:
+        read_csv_kwargs['parse_dates'] = parse_dates
+    df = pd.read_csv(csv_path, **read_csv_kwargs)
+    if start is not None or end is not None:
+        date_column = next((col for col in DATE_COLUMNS if col in df.columns), None)
+        if date_column is None:
+            raise ValueError(f"'{csv_path}' no tiene columna de fecha para filtrar")
+        days = pd.to_datetime(df[date_column], utc=True).dt.strftime('%Y-%m-%d')
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= days >= pd.Timestamp(start).strftime('%Y-%m-%d')
+        if end is not None:
+            mask &= days <= pd.Timestamp(end).strftime('%Y-%m-%d')
+        df = df[mask].reset_index(drop=True)
+    return df[columns] if columns is not None else df
+
+
+# ===================================================================
+# BLOQUE PRINCIPAL
+# ===================================================================
+if __name__ == '__main__':
+    # Uso: python -m src.columnar_store convert                  (los CSV de KNOWN_CSVS que existan)
+    #      python -m src.columnar_store convert data/historical_games_rich.csv [otro.csv ...]
+    #      python -m src.columnar_store info historical_games_rich
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Almacén columnar de los datasets históricos.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert_parser = subparsers.add_parser('convert', help="Convierte uno o varios CSV.")
+    convert_parser.add_argument('csv_paths', nargs='*', help="CSV a convertir (por defecto, los de KNOWN_CSVS).")
+    convert_parser.add_argument('--date-column', help=f"Columna de fecha (por defecto, la primera de {', '.join(DATE_COLUMNS)}).")
+    info_parser = subparsers.add_parser('info', help="Muestra el esquema y las temporadas de un dataset.")
+    info_parser.add_argument('name')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        csv_paths = args.csv_paths or sorted(
+            path for pattern in KNOWN_CSVS for path in glob.glob(os.path.join(project_root, pattern))
+        )
+        for csv_path in csv_paths:
+            started = time.perf_counter()
+            try:
+                convert_csv(csv_path, date_column=args.date_column)
+            except (ValueError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+                print(f"    [ERROR] {csv_path} no se pudo convertir: {e}")
+                continue
+            print(f"    {csv_path} convertido en {time.perf_counter() - started:.2f} s")
+    else:
+        manifest = read_manifest(args.name)
+        if manifest is None:
+            parser.error(f"No existe el dataset columnar '{args.name}' en {COLUMNAR_DIR}")
+        print(f"{manifest['name']}: {manifest['rows']} filas, partido por '{manifest['date_column']}'")
+        print("Temporadas: " + ', '.join(f"{season} ({rows})" for season, rows in sorted(manifest['seasons'].items())))
+        for column in manifest['columns']:
+            print(f"  {column['name']:<28} {column['kind']:<9} {column['dtype']}")
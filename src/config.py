@@ -1,4 +1,8 @@
 # src/config.py
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 TEAM_NAME_MAP = {
     "Arizona Diamondbacks": "ARI", "Atlanta Braves": "ATL", "Baltimore Orioles": "BAL",
     "Boston Red Sox": "BOS", "Chicago Cubs": "CHN", "Chicago White Sox": "CHA",
@@ -18,4 +22,68 @@ PREDICTION_LIMITS = {
     'Senior': 5,
     'Junior': 2,
     'Administrator': float('inf')
-}
\ No newline at end of file
+}
+
+# Número máximo de partidos cuyas características se calculan en paralelo al armar la cartelera.
+# Cada partido hace varias llamadas de red bloqueantes, así que un pool de hilos acotado
+# reduce el tiempo total sin saturar la API de la MLB. Con 1 se procesa en serie.
+PREDICTION_WORKERS = max(1, int(os.environ.get('PREDICTION_WORKERS', 8)))
+
+# Carpeta de los almacenes locales (boxscores, etc.). Puede moverse a un volumen persistente.
+LOCAL_STORE_DIR = os.environ.get('MLB_LOCAL_STORE_DIR', os.path.join(BASE_DIR, 'data', 'store'))
+
+# Particiones por fecha y checkpoints de los constructores de datasets (src/dataset_builder.py).
+DATASETS_DIR = os.environ.get('MLB_DATASETS_DIR', os.path.join(LOCAL_STORE_DIR, 'datasets'))
+
+# Almacén columnar de los datasets históricos (src/columnar_store.py).
+COLUMNAR_DIR = os.environ.get('MLB_COLUMNAR_DIR', os.path.join(BASE_DIR, 'data', 'columnar'))
+
+# Caché de la cartelera (Flask-Caching) y base de datos de predicciones. Se pueden redirigir
+# para ejecutar benchmarks o pruebas sin tocar los datos reales de la aplicación.
+CACHE_DIR = os.environ.get('MLB_CACHE_DIR', os.path.join(BASE_DIR, 'cache'))
+DATABASE_PATH = os.environ.get('MLB_DATABASE_PATH', os.path.join(BASE_DIR, 'mlb_predictions.db'))
+
+# Cartelera en caché: se considera fresca durante SLATE_FRESH_SECONDS; después se sigue sirviendo
+# (hasta SLATE_KEEP_SECONDS) mientras se recalcula en segundo plano. Los candados entre workers
+# viven fuera de CACHE_DIR para que cache.clear() no tropiece con ellos.
+# El marcador y el estado de los partidos no dependen de esta caché (ver LIVE_STATE_SECONDS),
+# por eso las predicciones pueden vivir bastante más que el antiguo memo de 900 s.
+SLATE_FRESH_SECONDS = int(os.environ.get('SLATE_FRESH_SECONDS', 3600))
+SLATE_KEEP_SECONDS = int(os.environ.get('SLATE_KEEP_SECONDS', 24 * 3600))
+CACHE_LOCK_DIR = os.environ.get('MLB_CACHE_LOCK_DIR', f"{CACHE_DIR}_locks")
+
+# Vida de cada predicción individual en caché. La clave incluye el partido, ambos lanzadores
+# probables y la versión del modelo, así que un cambio de lanzador crea una entrada nueva.
+GAME_PREDICTION_SECONDS = int(os.environ.get('GAME_PREDICTION_SECONDS', 7 * 24 * 3600))
+
+# Vida del estado en vivo (marcador, estado, entrada), que se pide con una llamada ligera aparte.
+LIVE_STATE_SECONDS = int(os.environ.get('LIVE_STATE_SECONDS', 30))
+
+# --- ACCESO A LA API DE LA MLB: EN VIVO, GRABACIÓN O REPRODUCCIÓN ---
+# 'live'   -> llamadas reales a statsapi.mlb.com (por defecto)
+# 'record' -> llamadas reales, guardando cada respuesta en MLB_API_FIXTURES_DIR
+# 'replay' -> sin red: responde desde MLB_API_FIXTURES_DIR con la latencia simulada indicada
+MLB_API_MODE = os.environ.get('MLB_API_MODE', 'live').lower()
+MLB_API_FIXTURES_DIR = os.environ.get('MLB_API_FIXTURES_DIR', os.path.join(BASE_DIR, 'data', 'api_fixtures'))
+MLB_API_REPLAY_LATENCY_MS = float(os.environ.get('MLB_API_REPLAY_LATENCY_MS', 0))
+MLB_API_REPLAY_JITTER_MS = float(os.environ.get('MLB_API_REPLAY_JITTER_MS', 0))
+
+# --- PERFILADO OPCIONAL (cProfile) ---
+# Con MLB_PROFILE=1 se perfilan las peticiones que traen la cabecera X-MLB-Profile y, además,
+# una fracción MLB_PROFILE_SAMPLE_RATE (0-1) del resto. Se guardan los MLB_PROFILE_KEEP más recientes.
+PROFILE_ENABLED = os.environ.get('MLB_PROFILE', '0') == '1'
+PROFILE_SAMPLE_RATE = float(os.environ.get('MLB_PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.environ.get('MLB_PROFILE_DIR', os.path.join(BASE_DIR, 'data', 'profiles'))
+PROFILE_KEEP = int(os.environ.get('MLB_PROFILE_KEEP', 50))
+
+# --- MÉTRICAS CON VARIOS PROCESOS ---
+# Carpeta compartida donde cada proceso (p. ej. cada worker de gunicorn) vuelca sus métricas para
+# que /metrics las sume todas. Vacía = métricas solo del proceso (servidor de desarrollo, scripts).
+# gunicorn.conf.py la define si no viene del entorno.
+METRICS_DIR = os.environ.get('MLB_METRICS_DIR', '')
+
+# --- EVALUACIÓN DEL MODELO ---
+# 'numpy'   -> usa la exportación .npz del modelo (src/tree_model.py) si existe y corresponde al
+#              .pkl; no importa xgboost (por defecto)
+# 'xgboost' -> deserializa siempre el .pkl con joblib
+MODEL_BACKEND = os.environ.get('MLB_MODEL_BACKEND', 'numpy').lower()
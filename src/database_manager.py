@@ -2,7 +2,11 @@
 
 from flask_sqlalchemy import SQLAlchemy
 from flask import Flask
-import os
+from sqlalchemy import event, func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .config import DATABASE_PATH, TEAM_NAME_MAP
+from .metrics import timed
 
 db = SQLAlchemy()
 
@@ -12,7 +16,7 @@ class Prediction(db.Model):
     """
     id = db.Column(db.Integer, primary_key=True)
     game_id = db.Column(db.Integer, unique=True, nullable=False)
-    prediction_date = db.Column(db.String(10), nullable=False)
+    prediction_date = db.Column(db.String(10), nullable=False, index=True)
     home_team = db.Column(db.String(100), nullable=False)
     away_team = db.Column(db.String(100), nullable=False)
     predicted_winner = db.Column(db.String(100), nullable=False)
@@ -20,76 +24,245 @@ class Prediction(db.Model):
     actual_winner = db.Column(db.String(100), nullable=True) # Se llena cuando el juego termina
     is_correct = db.Column(db.Boolean, nullable=True) # Se calcula cuando el juego termina
 
+class AccuracyCounter(db.Model):
+    """
+    Contadores materializados de predicciones evaluadas y acertadas. Se actualizan en la misma
+    transacción en la que se liquida cada juego, así que leer la precisión no recorre el historial.
+    """
+    scope = db.Column(db.String(5), primary_key=True) # 'all', 'month' o 'day'
+    period = db.Column(db.String(10), primary_key=True) # '', 'YYYY-MM' o 'YYYY-MM-DD'
+    evaluated = db.Column(db.Integer, nullable=False, default=0)
+    winners = db.Column(db.Integer, nullable=False, default=0)
+
+ACCURACY_SCOPES = ('all', 'month', 'day')
+
+def _counter_periods(prediction_date):
+    return {'all': '', 'month': prediction_date[:7], 'day': prediction_date}
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL: los lectores no bloquean al escritor ni al revés, así que varios workers de gunicorn
+    # pueden servir páginas mientras otro guarda una cartelera. busy_timeout espera al candado
+    # de escritura en lugar de fallar de inmediato.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+
 def init_app(app):
     """
     Inicializa la base de datos con la aplicación Flask.
     """
-    db_path = os.path.join(os.path.dirname(__file__), 'mlb_predictions.db')
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DATABASE_PATH}'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     db.init_app(app)
     
     with app.app_context():
+        event.listen(db.engine, 'connect', _set_sqlite_pragmas)
         print("--- [DB Manager] Creando todas las tablas de la base de datos si no existen... ---")
         db.create_all()
+        # create_all no añade índices a tablas que ya existían.
+        with db.engine.begin() as conn:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_prediction_prediction_date ON prediction (prediction_date)"))
+        fixed = _normalize_settled_results()
+        if fixed:
+            print(f"--- [DB Manager] {fixed} resultados pasados a la abreviatura del equipo ---")
+        # Bases de datos anteriores a los contadores (o con resultados corregidos): se calculan
+        # una vez desde el historial.
+        if fixed or (db.session.get(AccuracyCounter, ('all', '')) is None and
+                     Prediction.query.filter(Prediction.is_correct.isnot(None)).first() is not None):
+            db.session.close()
+            rebuild_accuracy_counters()
+
+def ping():
+    """Comprueba que la base de datos responde (lanza la excepción de SQLAlchemy si no)."""
+    db.session.execute(text("SELECT 1"))
+
+def release_connections():
+    """
+    Descarta las conexiones abiertas del pool sin cerrarlas. Se llama en cada worker de
+    gunicorn justo después del fork: las conexiones de SQLite no pueden compartirse entre
+    procesos, así que cada worker abre las suyas.
+    """
+    db.engine.dispose(close=False)
+
+@timed('db_write')
+def save_predictions(predictions):
+    """
+    Guarda o actualiza las predicciones de una cartelera completa en una sola transacción,
+    con un INSERT ... ON CONFLICT por lote. Cada elemento tiene el formato de save_prediction.
+    Una predicción existente solo se actualiza si el juego aún no tiene resultado (p. ej. cambió
+    el lanzador probable o el modelo). Los resultados con 'error' se descartan: un recálculo
+    fallido no debe pisar una predicción válida ni guardarse como pronóstico.
+    """
+    rows = [{
+        'game_id': p['game_id'],
+        'prediction_date': p['prediction_date'],
+        'home_team': p['home_team'],
+        'away_team': p['away_team'],
+        'predicted_winner': p['prediction']['winner'],
+        'confidence': float(p['prediction']['confidence']),
+    } for p in predictions if p.get('prediction') and 'error' not in p['prediction']]
+    if not rows:
+        return
+
+    stmt = sqlite_insert(Prediction)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['game_id'],
+        set_={'predicted_winner': stmt.excluded.predicted_winner, 'confidence': stmt.excluded.confidence},
+        where=(Prediction.actual_winner.is_(None)) & (
+            (Prediction.predicted_winner != stmt.excluded.predicted_winner) |
+            (Prediction.confidence != stmt.excluded.confidence)
+        ),
+    )
+    with db.session.begin():
+        db.session.execute(stmt, rows)
+    print(f"--- [DB Manager] {len(rows)} predicciones guardadas o actualizadas en un solo lote ---")
 
 def save_prediction(game_data):
     """
     Guarda o actualiza una predicción en la base de datos.
     """
+    save_predictions([game_data])
+
+def _bump_accuracy_counters(deltas):
+    """Suma {(alcance, periodo): [evaluados, aciertos]} a los contadores, con un upsert por periodo."""
+    for (scope, period), (evaluated, winners) in deltas.items():
+        stmt = sqlite_insert(AccuracyCounter).values(scope=scope, period=period, evaluated=evaluated, winners=winners)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['scope', 'period'],
+            set_={'evaluated': AccuracyCounter.evaluated + evaluated, 'winners': AccuracyCounter.winners + winners},
+        )
+        db.session.execute(stmt)
+
+def _actual_winner(game_data):
+    # Misma representación que predicted_winner (abreviatura de TEAM_NAME_MAP), para que
+    # is_correct compare lo mismo a ambos lados, como en status_manager.
+    home_team_name = game_data.get('game', {}).get('teams', {}).get('home', {}).get('team', {}).get('name', 'N/A')
+    away_team_name = game_data.get('game', {}).get('teams', {}).get('away', {}).get('team', {}).get('name', 'N/A')
+    
+    home_score = game_data.get('home_runs', -1)
+    away_score = game_data.get('away_runs', -1)
+
+    winner_name = home_team_name if home_score > away_score else away_team_name
+    return TEAM_NAME_MAP.get(winner_name, winner_name)
+
+def _normalize_settled_results():
+    """
+    Los resultados liquidados antes de usar la abreviatura guardaban el nombre completo del
+    ganador, así que is_correct siempre quedaba en False. Los pasa a la abreviatura, recalcula
+    is_correct y devuelve cuántas predicciones cambió.
+    """
+    fixed = 0
     with db.session.begin():
-        # Buscamos si ya existe una predicción para este juego
-        existing_prediction = Prediction.query.filter_by(game_id=game_data['game_id']).first()
-        
-        if not existing_prediction:
-            print(f"--- [DB Manager] Guardando nueva predicción para el juego {game_data['game_id']} ---")
-            new_prediction = Prediction(
-                game_id=game_data['game_id'],
-                prediction_date=game_data['prediction_date'],
-                home_team=game_data['home_team'],
-                away_team=game_data['away_team'],
-                predicted_winner=game_data['prediction']['winner'],
-                confidence=game_data['prediction']['confidence']
-            )
-            db.session.add(new_prediction)
-        else:
-            # En el futuro, podríamos actualizar la predicción si cambia el lanzador, por ejemplo.
-            pass
+        if db.session.execute(
+            db.select(Prediction.id).where(Prediction.actual_winner.in_(list(TEAM_NAME_MAP))).limit(1)
+        ).first() is None:
+            return 0
+        for full_name, abbreviation in TEAM_NAME_MAP.items():
+            fixed += db.session.execute(
+                db.update(Prediction)
+                .where(Prediction.actual_winner == full_name)
+                .values(actual_winner=abbreviation, is_correct=(Prediction.predicted_winner == abbreviation))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+    return fixed
+
+@timed('db_write')
+def settle_games(games_data):
+    """
+    Registra el resultado de todos los juegos finalizados de la lista en una sola transacción:
+    una consulta para las predicciones pendientes, una actualización por juego y un upsert por
+    periodo en los contadores de precisión.
+    """
+    games_by_id = {g['game_id']: g for g in games_data}
+    if not games_by_id:
+        return
+
+    with db.session.begin():
+        pending = db.session.execute(
+            db.select(Prediction.id, Prediction.game_id, Prediction.predicted_winner, Prediction.prediction_date)
+            .where(Prediction.game_id.in_(list(games_by_id)), Prediction.actual_winner.is_(None))
+        ).all()
+
+        deltas = {}
+        for prediction_id, game_id, predicted_winner, prediction_date in pending:
+            actual_winner = _actual_winner(games_by_id[game_id])
+            is_correct = (predicted_winner == actual_winner)
+            # Actualización condicional: si otro worker liquidó el juego primero, no se cuenta dos veces.
+            settled = db.session.execute(
+                db.update(Prediction)
+                .where(Prediction.id == prediction_id, Prediction.actual_winner.is_(None))
+                .values(actual_winner=actual_winner, is_correct=is_correct)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if settled:
+                for key in _counter_periods(prediction_date).items():
+                    counter = deltas.setdefault(key, [0, 0])
+                    counter[0] += 1
+                    counter[1] += 1 if is_correct else 0
+                print(f"--- [DB Manager] Actualizando resultado para el juego {game_id}. Ganador: {actual_winner} ---")
+        _bump_accuracy_counters(deltas)
 
 def update_game_result(game_data):
     """
-    Actualiza una predicción con el resultado final del juego.
+    Actualiza una predicción con el resultado final del juego y los contadores de precisión.
+    """
+    settle_games([game_data])
+
+def rebuild_accuracy_counters():
+    """
+    Recalcula todos los contadores de precisión con una sola consulta agregada por día
+    (útil para bases de datos existentes o si se corrigen resultados a mano).
     """
     with db.session.begin():
-        prediction_to_update = Prediction.query.filter_by(game_id=game_data['game_id']).first()
-        
-        if prediction_to_update and prediction_to_update.actual_winner is None:
-            home_team_name = game_data.get('game', {}).get('teams', {}).get('home', {}).get('team', {}).get('name', 'N/A')
-            away_team_name = game_data.get('game', {}).get('teams', {}).get('away', {}).get('team', {}).get('name', 'N/A')
-            
-            home_score = game_data.get('home_runs', -1)
-            away_score = game_data.get('away_runs', -1)
-
-            if home_score > away_score:
-                actual_winner = home_team_name
-            else:
-                actual_winner = away_team_name
-            
-            prediction_to_update.actual_winner = actual_winner
-            prediction_to_update.is_correct = (prediction_to_update.predicted_winner == actual_winner)
-            print(f"--- [DB Manager] Actualizando resultado para el juego {game_data['game_id']}. Ganador: {actual_winner} ---")
+        rows = db.session.execute(
+            db.select(
+                Prediction.prediction_date,
+                func.count(Prediction.id),
+                func.sum(db.case((Prediction.is_correct.is_(True), 1), else_=0)),
+            )
+            .where(Prediction.is_correct.isnot(None))
+            .group_by(Prediction.prediction_date)
+        ).all()
+
+        totals = {}
+        for prediction_date, evaluated, winners in rows:
+            for scope, period in _counter_periods(prediction_date).items():
+                counter = totals.setdefault((scope, period), [0, 0])
+                counter[0] += evaluated
+                counter[1] += winners or 0
+
+        db.session.execute(db.delete(AccuracyCounter))
+        if totals:
+            db.session.execute(db.insert(AccuracyCounter), [
+                {'scope': scope, 'period': period, 'evaluated': evaluated, 'winners': winners}
+                for (scope, period), (evaluated, winners) in totals.items()
+            ])
+    print(f"--- [DB Manager] Contadores de precisión recalculados ({len(rows)} días con resultados) ---")
+
+def _accuracy(evaluated, winners):
+    return (winners / evaluated * 100) if evaluated > 0 else 0
 
 def calculate_historical_accuracy():
     """
-    Calcula la precisión histórica a partir de todos los resultados guardados en la BD.
+    Devuelve la precisión histórica global (precisión, aciertos, evaluados) leyendo el contador
+    materializado: una sola fila, sin importar cuántas temporadas haya guardadas.
     """
-    completed_predictions = Prediction.query.filter(Prediction.is_correct.isnot(None)).all()
-    
-    if not completed_predictions:
+    counter = db.session.get(AccuracyCounter, ('all', ''))
+    if counter is None or counter.evaluated == 0:
         return 0, 0, 0
-        
-    total_evaluated = len(completed_predictions)
-    total_winners = sum(1 for p in completed_predictions if p.is_correct)
-    accuracy = (total_winners / total_evaluated * 100) if total_evaluated > 0 else 0
-    
-    return accuracy, total_winners, total_evaluated
+    return _accuracy(counter.evaluated, counter.winners), counter.winners, counter.evaluated
+
+def get_accuracy_breakdown(scope='day'):
+    """
+    Devuelve la precisión por día ('day') o por mes ('month'), ordenada por periodo:
+    [{'period', 'accuracy', 'winners', 'evaluated'}, ...].
+    """
+    if scope not in ACCURACY_SCOPES:
+        raise ValueError(f"Alcance desconocido: '{scope}' (usa {', '.join(ACCURACY_SCOPES)})")
+    counters = AccuracyCounter.query.filter_by(scope=scope).order_by(AccuracyCounter.period).all()
+    return [
+        {'period': c.period, 'accuracy': _accuracy(c.evaluated, c.winners), 'winners': c.winners, 'evaluated': c.evaluated}
+        for c in counters
+    ]
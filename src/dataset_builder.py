@@ -0,0 +1,490 @@
+# src/dataset_builder.py
+import csv
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+from .config import DATASETS_DIR, PREDICTION_WORKERS
+from .api_client import iter_games_by_date
+from .pipeline import QUEUE_SIZE, Stage, parse_stage_workers, run_pipeline
+
+# Constructor único, incremental y reanudable para todas las variantes de dataset
+# (build_dataset.py, _v2, _v3 y src/build_dataset.py). En lugar de acumular la temporada en
+# memoria y escribir el CSV al final, cada día se escribe en su propia partición
+#   <DATASETS_DIR>/<variante>/<temporada>/<YYYY-MM-DD>.csv
+# y al terminarlo se registra un checkpoint en <DATASETS_DIR>/checkpoints.sqlite. Una ejecución
+# posterior (tras un fallo o la pasada nocturna) solo procesa los días sin checkpoint, así que
+# añadir un día no vuelve a pedir la temporada entera a la API. El CSV final se arma
+# concatenando las particiones del rango pedido.
+#
+# Solo se procesan días cerrados (hasta ayer): un día con partidos aún en juego no se marca.
+# Tampoco se marca un día en el que algún partido finalizado falló (un error de la API): queda
+# pendiente y la siguiente ejecución lo vuelve a pedir. Sin sincronizar (--offline) no se escribe
+# ningún checkpoint, porque la falta de datos locales no significa que el día no tenga partidos.
+
+CHECKPOINT_PATH = os.path.join(DATASETS_DIR, 'checkpoints.sqlite')
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _connect():
+    global _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                os.makedirs(DATASETS_DIR, exist_ok=True)
+                with sqlite3.connect(CHECKPOINT_PATH, timeout=30) as conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS checkpoints ("
+                        " variant TEXT NOT NULL, day TEXT NOT NULL, rows INTEGER NOT NULL,"
+                        " completed_at TEXT NOT NULL, PRIMARY KEY (variant, day))"
+                    )
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS variant_schema ("
+                        " variant TEXT PRIMARY KEY, columns TEXT NOT NULL)"
+                    )
+                _initialized = True
+    return sqlite3.connect(CHECKPOINT_PATH, timeout=30)
+
+
+# ===================================================================
+# VARIANTES: columnas y filas de cada día
+# ===================================================================
+BASIC_COLUMNS = ['h_team_wins_season', 'h_team_losses_season', 'v_team_wins_season', 'v_team_losses_season']
+RICH_COLUMNS = ['game_date', 'h_team_name', 'v_team_name'] + BASIC_COLUMNS
+EXPERT_COLUMNS = RICH_COLUMNS + [
+    'h_pitcher_wins', 'h_pitcher_losses', 'h_pitcher_era',
+    'v_pitcher_wins', 'v_pitcher_losses', 'v_pitcher_era',
+]
+
+
+def _is_final(game):
+    return game.get('status', {}).get('abstractGameState', '') == 'Final'
+
+
+def _game_datetime(game):
+    # Mismo formato que pd.to_datetime(...) al guardar el CSV: '2023-04-01 17:05:00+00:00'.
+    value = game.get('gameDate')
+    return str(datetime.fromisoformat(value.replace('Z', '+00:00'))) if value else None
+
+
+def _basic_row(game):
+    home_team_data = game.get('teams', {}).get('home', {})
+    away_team_data = game.get('teams', {}).get('away', {})
+    return {
+        'h_team_wins_season': home_team_data.get('leagueRecord', {}).get('wins', 0),
+        'h_team_losses_season': home_team_data.get('leagueRecord', {}).get('losses', 0),
+        'v_team_wins_season': away_team_data.get('leagueRecord', {}).get('wins', 0),
+        'v_team_losses_season': away_team_data.get('leagueRecord', {}).get('losses', 0),
+    }
+
+
+def _rich_row(game):
+    home_team_data = game.get('teams', {}).get('home', {})
+    away_team_data = game.get('teams', {}).get('away', {})
+    return {
+        'game_date': _game_datetime(game),
+        'h_team_name': home_team_data.get('team', {}).get('name', 'N/A'),
+        'v_team_name': away_team_data.get('team', {}).get('name', 'N/A'),
+        **_basic_row(game),
+    }
+
+
+def _pitcher_season_stats(pitcher):
+    stats = pitcher.get('stats') or [{}]
+    return stats[0].get('stats', {}) if isinstance(stats, list) else {}
+
+
+def _era(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 99.0
+
+
+def _expert_row(game):
+    row = _rich_row(game)
+    for prefix, side in (('h', 'home'), ('v', 'away')):
+        stats = _pitcher_season_stats(game.get('teams', {}).get(side, {}).get('probablePitcher', {}))
+        row[f'{prefix}_pitcher_wins'] = stats.get('wins', 0)
+        row[f'{prefix}_pitcher_losses'] = stats.get('losses', 0)
+        row[f'{prefix}_pitcher_era'] = _era(stats.get('era', '99.00'))
+    return row
+
+
+# Cada variante se expresa como un pipeline (src/pipeline.py): una fuente que produce
+# (día, partido) en orden de fecha y etapas fetch -> parse -> feature, unidas por colas acotadas
+# y con sus propios hilos. La escritura (partición + checkpoint de cada día) la hace el hilo que
+# consume los resultados, que llegan en el mismo orden en que salieron de la fuente.
+STAGE_WORKERS = {'fetch': PREDICTION_WORKERS, 'parse': 1, 'feature': 1}
+
+# Marca de un partido que falló (en la fuente o en una etapa): pasa por el resto de etapas sin
+# procesarse y deja su día sin checkpoint.
+_FAILED = object()
+
+
+def _schedule_source(start_date, end_date, sync=True):
+    # El calendario se pide mes a mes a medida que el pipeline consume partidos. Estas variantes
+    # salen directamente de la API, así que no admiten sync=False (build lo rechaza antes).
+    for date_str, games_on_date in iter_games_by_date(start_date, end_date):
+        for game in games_on_date:
+            yield date_str, game
+
+
+def _final_game(game):
+    return game if _is_final(game) else None
+
+
+# Etapas que descartan partidos a propósito; en las demás, None significa que el partido falló.
+_FILTERS = {_final_game}
+
+
+def _with_target(row_builder):
+    def feature(game):
+        row = row_builder(game)
+        row['target'] = 1 if game.get('teams', {}).get('home', {}).get('isWinner', False) else 0
+        return row
+    return feature
+
+
+# Días que el almacén de características calcula de una vez: la memoria depende de este tramo y
+# no del rango pedido, porque cada tramo se calcula a medida que el pipeline consume el anterior.
+FEATURE_CHUNK_DAYS = 7
+
+
+def _feature_store_source(start_date, end_date, sync=True):
+    """Filas del almacén de características (sin lookahead), una por partido, y una marca
+    _FAILED por cada partido que no se pudo sincronizar, calculadas por tramos de
+    FEATURE_CHUNK_DAYS días."""
+    from .feature_store import build_features
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=FEATURE_CHUNK_DAYS - 1), end_date)
+        features = build_features(chunk_start, chunk_end, sync=sync)
+        items = [(row.official_date, row) for row in features.itertuples(index=False)]
+        items += [(day, _FAILED) for day in features.attrs.get('failed_days', [])]
+        del features
+        # Orden estable por día: el pipeline mantiene el orden y los días se agrupan al salir.
+        yield from sorted(items, key=lambda item: item[0])
+        chunk_start = chunk_end + timedelta(days=1)
+
+
+def _feature_store_row(game):
+    # NaN -> celda vacía, como en DataFrame.to_csv.
+    return {name: (None if value != value else value) for name, value in game._asdict().items()}
+
+
+def _matchup_stages():
+    from .build_dataset import fetch_game, parse_game, game_features
+    return [('fetch', fetch_game), ('parse', parse_game), ('feature', game_features)]
+
+
+# nombre -> (fuente de (día, partido), etapas [(nombre, función)] o función que las devuelve,
+#           columnas o None si salen de las filas, CSV final por defecto)
+VARIANTS = {
+    'basic': (_schedule_source, [('parse', _final_game), ('feature', _with_target(_basic_row))],
+              BASIC_COLUMNS + ['target'], 'data/historical_game_data_with_features.csv'),
+    'rich': (_schedule_source, [('parse', _final_game), ('feature', _with_target(_rich_row))],
+             RICH_COLUMNS + ['target'], 'data/historical_games_rich.csv'),
+    'expert': (_schedule_source, [('parse', _final_game), ('feature', _with_target(_expert_row))],
+               EXPERT_COLUMNS + ['target'], 'data/historical_games_expert.csv'),
+    'pit': (_feature_store_source, [('feature', _feature_store_row)], None, 'mlb_dataset_{season}_pit.csv'),
+    'matchup': (_feature_store_source, _matchup_stages, None, 'mlb_dataset_{season}_season_v2.csv'),
+}
+
+
+def _on_game(func):
+    """Adapta una función partido -> partido a los elementos (día, partido) del pipeline."""
+    def stage(item):
+        day, game = item
+        if game is _FAILED:
+            return item
+        result = func(game)
+        if result is None:
+            return None if func in _FILTERS else (day, _FAILED)
+        return day, result
+    return stage
+
+
+def _stream_days(variant, start_date, end_date, sync, stage_workers, queue_size):
+    """
+    Produce (día, filas, fallos) en orden de fecha, solo para los días con alguna fila o algún
+    partido fallido.
+    """
+    source, stages, _, _ = VARIANTS[variant]
+    stages = stages() if callable(stages) else stages
+    pipeline = run_pipeline(
+        source(start_date, end_date, sync=sync),
+        [Stage(name, _on_game(func), stage_workers.get(name, 1)) for name, func in stages],
+        queue_size=queue_size, name=f"dataset_{variant}",
+    )
+    current_day, rows, failed = None, [], 0
+    for day, row in pipeline:
+        if day != current_day:
+            if rows or failed:
+                yield current_day, rows, failed
+            current_day, rows, failed = day, [], 0
+        if row is _FAILED:
+            failed += 1
+        else:
+            rows.append(row)
+    if rows or failed:
+        yield current_day, rows, failed
+
+
+# ===================================================================
+# PARTICIONES Y CHECKPOINTS
+# ===================================================================
+def partition_path(variant, day):
+    return os.path.join(DATASETS_DIR, variant, day[:4], f"{day}.csv")
+
+
+def completed_days(variant, start_date, end_date):
+    """{día 'YYYY-MM-DD': filas} de los días con checkpoint en el rango."""
+    conn = _connect()
+    try:
+        return dict(conn.execute(
+            "SELECT day, rows FROM checkpoints WHERE variant = ? AND day BETWEEN ? AND ?",
+            (variant, start_date.isoformat(), end_date.isoformat()),
+        ).fetchall())
+    finally:
+        conn.close()
+
+
+def _check_schema(variant, columns):
+    """Registra las columnas de la variante; si cambian, las particiones antiguas no sirven."""
+    conn = _connect()
+    try:
+        with conn:
+            stored = conn.execute("SELECT columns FROM variant_schema WHERE variant = ?", (variant,)).fetchone()
+            if stored is None:
+                conn.execute("INSERT INTO variant_schema (variant, columns) VALUES (?, ?)", (variant, ','.join(columns)))
+            elif stored[0] != ','.join(columns):
+                raise ValueError(
+                    f"Las columnas de la variante '{variant}' cambiaron desde la última construcción; "
+                    "vuelve a construirla con --rebuild."
+                )
+    finally:
+        conn.close()
+
+
+def reset_variant(variant):
+    """Descarta todos los checkpoints y el esquema de la variante (las particiones se sobrescriben al reconstruir)."""
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM checkpoints WHERE variant = ?", (variant,))
+            conn.execute("DELETE FROM variant_schema WHERE variant = ?", (variant,))
+    finally:
+        conn.close()
+
+
+def _write_partition(variant, day, columns, rows):
+    """Escribe la partición del día de forma atómica (archivo temporal + rename)."""
+    path = partition_path(variant, day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore', lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(temp_path, path)
+
+
+def _mark_completed(variant, days_with_rows):
+    completed_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO checkpoints (variant, day, rows, completed_at) VALUES (?, ?, ?, ?)",
+                [(variant, day, rows, completed_at) for day, rows in days_with_rows],
+            )
+    finally:
+        conn.close()
+
+
+def _pending_spans(start_date, end_date, done):
+    """Tramos consecutivos de días sin checkpoint: [(inicio, fin), ...]."""
+    spans, span_start = [], None
+    day = start_date
+    while day <= end_date:
+        if day.isoformat() in done:
+            if span_start is not None:
+                spans.append((span_start, day - timedelta(days=1)))
+                span_start = None
+        elif span_start is None:
+            span_start = day
+        day += timedelta(days=1)
+    if span_start is not None:
+        spans.append((span_start, end_date))
+    return spans
+
+
+def _days_between(start_date, end_date):
+    return [(start_date + timedelta(days=i)).isoformat() for i in range((end_date - start_date).days + 1)]
+
+
+def _process_span(variant, columns, span_start, span_end, sync, stage_workers, queue_size):
+    """
+    Procesa un tramo sin checkpoint: cada día con partidos se escribe y se marca en cuanto está
+    listo; los días sin partidos se marcan con 0 filas al pasar por ellos. Los días con algún
+    partido fallido no se escriben ni se marcan. Con sync=False no se marca nada: devuelve
+    también los días escritos sin checkpoint, para incluirlos en el CSV de esta ejecución.
+    """
+    pending = _days_between(span_start, span_end)
+    next_index, rows_written, unchecked = 0, 0, []
+    for day, rows, failed in _stream_days(variant, span_start, span_end, sync, stage_workers, queue_size):
+        skipped = []
+        while next_index < len(pending) and pending[next_index] < day:
+            skipped.append((pending[next_index], 0))
+            next_index += 1
+        if next_index < len(pending) and pending[next_index] == day:
+            next_index += 1
+        if failed:
+            if sync:
+                _mark_completed(variant, skipped)
+            print(f"--- [Dataset Builder] {variant}: {day} queda pendiente ({failed} partido(s) fallaron) ---")
+            continue
+        if columns is None:
+            # Variantes sin columnas fijas: el primer día con filas define el esquema.
+            columns = list(rows[0].keys())
+            _check_schema(variant, columns)
+        _write_partition(variant, day, columns, rows)
+        if sync:
+            _mark_completed(variant, skipped + [(day, len(rows))])
+        else:
+            unchecked.append(day)
+        rows_written += len(rows)
+        print(f"--- [Dataset Builder] {variant}: {day} listo ({len(rows)} partidos) ---")
+    if sync:
+        _mark_completed(variant, [(day, 0) for day in pending[next_index:]])
+    return rows_written, columns, unchecked
+
+
+def _stored_columns(variant):
+    conn = _connect()
+    try:
+        stored = conn.execute("SELECT columns FROM variant_schema WHERE variant = ?", (variant,)).fetchone()
+    finally:
+        conn.close()
+    return stored[0].split(',') if stored else None
+
+
+def build(variant, start_date, end_date=None, output_path=None, sync=True, rebuild=False,
+          stage_workers=None, queue_size=QUEUE_SIZE, columnar=False):
+    """
+    Construye (o completa) el dataset 'variant' entre start_date y end_date (por defecto, ayer)
+    y lo escribe en output_path (por defecto, el CSV de siempre de esa variante). Solo se piden
+    a la API los días sin checkpoint; con sync=False las variantes del almacén de
+    características no tocan la red (las demás salen de la API y lo rechazan con ValueError).
+    'stage_workers' ({etapa: hilos}) ajusta STAGE_WORKERS y
+    'queue_size' el tamaño de las colas entre etapas. Con columnar=True también se actualiza la
+    copia del CSV en el almacén columnar (src/columnar_store.py). Devuelve el número de partidos
+    del CSV final.
+    """
+    if variant not in VARIANTS:
+        raise ValueError(f"Variante desconocida '{variant}'. Opciones: {', '.join(VARIANTS)}")
+    source, _, columns, default_output = VARIANTS[variant]
+    if not sync and source is _schedule_source:
+        raise ValueError(f"La variante '{variant}' sale de la API y no puede construirse sin sincronizar (--offline).")
+    stage_workers = {**STAGE_WORKERS, **(stage_workers or {})}
+    start_date = _as_date(start_date)
+    end_date = min(_as_date(end_date) if end_date else date.max, date.today() - timedelta(days=1))
+    output_path = output_path or default_output.format(season=start_date.year)
+    if rebuild:
+        reset_variant(variant)
+    if columns is not None:
+        _check_schema(variant, columns)
+
+    done = completed_days(variant, start_date, end_date)
+    spans = _pending_spans(start_date, end_date, done)
+    pending_days = sum((span_end - span_start).days + 1 for span_start, span_end in spans)
+    print(f"--- [Dataset Builder] {variant}: {start_date} a {end_date}, {len(done)} días con checkpoint, "
+          f"{pending_days} pendientes ---")
+    unchecked = []
+    for span_start, span_end in spans:
+        _, columns, span_unchecked = _process_span(variant, columns, span_start, span_end, sync, stage_workers, queue_size)
+        unchecked += span_unchecked
+
+    total = export(variant, start_date, end_date, output_path, columns or _stored_columns(variant), extra_days=unchecked)
+    if columnar and total:
+        # Para que los lectores (load_csv) no vuelvan a parsear el CSV.
+        from .columnar_store import convert_csv
+        convert_csv(output_path)
+    return total
+
+
+def export(variant, start_date, end_date, output_path, columns=None, extra_days=()):
+    """
+    Concatena en output_path las particiones con filas del rango (más 'extra_days', escritas
+    sin checkpoint en una ejecución sin sincronizar). Devuelve el número de filas.
+    """
+    if columns is None:
+        columns = _stored_columns(variant)
+    days = sorted({day for day, rows in completed_days(variant, start_date, end_date).items() if rows} | set(extra_days))
+    if not days or not columns:
+        print(f"--- [Dataset Builder] {variant}: no hay partidos finalizados entre {start_date} y {end_date} ---")
+        return 0
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    total = 0
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, 'w', newline='') as out:
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(columns)
+        for day in days:
+            with open(partition_path(variant, day), newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for row in reader:
+                    writer.writerow(row)
+                    total += 1
+    os.replace(temp_path, output_path)
+    print(f"--- [Dataset Builder] {variant}: {total} partidos de {len(days)} días guardados en {output_path} ---")
+    return total
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value.date() if isinstance(value, datetime) else value
+
+
+# ===================================================================
+# BLOQUE PRINCIPAL
+# ===================================================================
+if __name__ == '__main__':
+    # Uso: python -m src.dataset_builder rich --start 2023-03-30 --end 2023-10-01
+    #      python -m src.dataset_builder pit --start 2024-03-20          (pasada nocturna: hasta ayer)
+    import argparse
+
+    from .profiling import add_profile_argument, profile_block
+
+    parser = argparse.ArgumentParser(description="Construye o completa un dataset por particiones diarias con checkpoints.")
+    parser.add_argument('variant', choices=sorted(VARIANTS))
+    parser.add_argument('--start', type=date.fromisoformat, required=True, help="Primer día del dataset.")
+    parser.add_argument('--end', type=date.fromisoformat, help="Último día (por defecto, ayer).")
+    parser.add_argument('--output', help="CSV final (por defecto, el de siempre de la variante).")
+    parser.add_argument('--offline', action='store_true', help="Variantes del almacén de características: no sincroniza.")
+    parser.add_argument('--rebuild', action='store_true', help="Ignora los checkpoints y reconstruye todo el rango.")
+    parser.add_argument('--stage-workers', nargs='+', metavar='ETAPA=HILOS',
+                        help=f"Hilos por etapa (por defecto {', '.join(f'{k}={v}' for k, v in STAGE_WORKERS.items())}).")
+    parser.add_argument('--columnar', action='store_true', help="Actualiza también la copia en el almacén columnar.")
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE, help=f"Tamaño de las colas entre etapas (por defecto {QUEUE_SIZE}).")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    try:
+        stage_workers = parse_stage_workers(args.stage_workers, STAGE_WORKERS)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.offline and VARIANTS[args.variant][0] is _schedule_source:
+        parser.error(f"--offline solo sirve para las variantes del almacén de características, no para '{args.variant}'.")
+
+    with profile_block(f'dataset_{args.variant}', enabled=bool(args.profile), directory=args.profile):
+        build(args.variant, args.start, args.end, output_path=args.output, sync=not args.offline, rebuild=args.rebuild,
+              stage_workers=stage_workers, queue_size=args.queue_size, columnar=args.columnar)
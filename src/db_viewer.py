@@ -1,6 +1,5 @@
 # src/db_viewer.py
 
-import pandas as pd
 import sqlite3
 import os
 
@@ -17,6 +16,9 @@ def view_database_contents():
         print("Asegúrate de haber ejecutado la aplicación Flask al menos una vez para que se cree.")
         return
 
+    # pandas se importa aquí y no al cargar el módulo: si la BD no existe no hace falta.
+    import pandas as pd
+
     try:
         # Nos conectamos a la base de datos
         conn = sqlite3.connect(DB_PATH)
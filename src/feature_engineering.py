@@ -1,6 +1,8 @@
 # src/feature_engineering.py (VERSIÓN FINAL COMPLETA)
 import pandas as pd
 
+from .http_client import get_json
+
 def add_pythagorean_expectation(df):
     """
     Calcula la Expectativa Pitagórica para cada equipo y añade la diferencia
@@ -78,4 +80,25 @@ def add_rolling_win_percentage(df):
     df['win_pct_roll_diff'] = df_sorted['win_pct_roll_diff']
 
     print("¡Característica 'win_pct_roll_diff' creada con éxito!")
-    return df
\ No newline at end of file
+    return df
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def get_pitcher_splits(pitcher_id, season):
+    """
+    OPS que permite el lanzador en la temporada contra bateadores zurdos y diestros
+    (stats=statSplits con sitCodes 'vl' y 'vr'). Devuelve {'vs_left_ops', 'vs_right_ops'};
+    un lado sin datos (p. ej. un lanzador que aún no ha enfrentado zurdos) queda en None.
+    """
+    params = {'stats': 'statSplits', 'group': 'pitching', 'season': season, 'sitCodes': 'vl,vr'}
+    splits = get_json(f"/people/{pitcher_id}/stats", params=params).get('stats', [{}])[0].get('splits', [])
+    ops_by_code = {split.get('split', {}).get('code'): split.get('stat', {}).get('ops') for split in splits}
+    return {
+        'vs_left_ops': _as_float(ops_by_code.get('vl')),
+        'vs_right_ops': _as_float(ops_by_code.get('vr')),
+    }
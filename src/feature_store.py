@@ -0,0 +1,370 @@
+# src/feature_store.py
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .config import LOCAL_STORE_DIR, PREDICTION_WORKERS
+from .api_client import iter_games_by_date
+from .boxscore_store import get_boxscore, is_final_game
+from .call_budget import attribute, context_map
+from .prediction_module import PARK_FACTORS
+from . import pitcher_store, team_ledger
+
+# Almacén de características "point-in-time" para entrenamiento y backtests. En lugar de pedir
+# a la API las estadísticas de cada partido histórico, se sincronizan una vez los almacenes
+# locales (calendario y abridores aquí, gameLogs en pitcher_store y el libro de equipos en
+# team_ledger) y las ventanas móviles de TODOS los partidos del rango se calculan de una sola
+# pasada con sumas prefijas en NumPy.
+#
+# Sin lookahead: cada partido solo ve datos de días anteriores a su fecha oficial, igual que al
+# servirlo en vivo (los almacenes solo guardan días cerrados). Dentro de ese límite, las
+# ventanas son las de prediction_module: 30 días para el abridor y 14 para el equipo.
+STORE_PATH = os.path.join(LOCAL_STORE_DIR, 'feature_store.sqlite')
+
+PITCHER_WINDOW_DAYS = 30
+TEAM_WINDOW_DAYS = 14
+
+FEATURE_COLUMNS = [
+    'home_recent_era', 'home_recent_whip', 'home_team_ops', 'home_bullpen_era',
+    'home_park_factor', 'away_recent_era', 'away_recent_whip', 'away_team_ops',
+    'away_bullpen_era'
+]
+
+GAME_COLUMNS = [
+    'game_pk', 'season', 'official_date', 'game_datetime', 'venue',
+    'home_team_id', 'home_team', 'home_pitcher_id', 'away_team_id', 'away_team', 'away_pitcher_id',
+    'home_team_winner',
+]
+
+# Clave combinada (entidad, día) para buscar ventanas con un solo searchsorted: los ordinales
+# de fecha actuales (~740.000) caben de sobra en 20 bits.
+_KEY_STRIDE = 1 << 20
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _connect():
+    global _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                os.makedirs(os.path.dirname(STORE_PATH), exist_ok=True)
+                with sqlite3.connect(STORE_PATH, timeout=30) as conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS games ("
+                        " game_pk INTEGER PRIMARY KEY, season INTEGER NOT NULL, official_date TEXT NOT NULL,"
+                        " game_datetime TEXT NOT NULL, venue TEXT,"
+                        " home_team_id INTEGER NOT NULL, home_team TEXT NOT NULL, home_pitcher_id INTEGER NOT NULL,"
+                        " away_team_id INTEGER NOT NULL, away_team TEXT NOT NULL, away_pitcher_id INTEGER NOT NULL,"
+                        " home_team_winner INTEGER NOT NULL)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS ix_games_official_date ON games (official_date)")
+                _initialized = True
+    return sqlite3.connect(STORE_PATH, timeout=30)
+
+
+# ===================================================================
+# SINCRONIZACIÓN (la única parte que puede tocar la red)
+# ===================================================================
+def _game_row(game, official_date):
+    """Fila del almacén para un partido finalizado, o None si su boxscore no trae abridores."""
+    boxscore_data = get_boxscore(game['gamePk'], is_final=True)
+    home_pitchers = boxscore_data['teams']['home'].get('pitchers')
+    away_pitchers = boxscore_data['teams']['away'].get('pitchers')
+    if not home_pitchers or not away_pitchers:
+        return None
+    game_datetime = datetime.strptime(game['gameDate'], '%Y-%m-%dT%H:%M:%SZ')
+    home, away = game['teams']['home'], game['teams']['away']
+    return {
+        'game_pk': game['gamePk'], 'season': game_datetime.year, 'official_date': official_date,
+        'game_datetime': game_datetime.isoformat(), 'venue': game.get('venue', {}).get('name'),
+        'home_team_id': home['team']['id'], 'home_team': home['team']['name'], 'home_pitcher_id': home_pitchers[0],
+        'away_team_id': away['team']['id'], 'away_team': away['team']['name'], 'away_pitcher_id': away_pitchers[0],
+        'home_team_winner': 1 if home.get('isWinner') else 0,
+    }
+
+
+def sync_games(start_date, end_date):
+    """
+    Guarda los partidos finalizados del rango con sus abridores (del boxscore, que sale del
+    almacén local si ya se descargó). Los partidos ya guardados no se vuelven a procesar.
+    Devuelve el día ('YYYY-MM-DD') de cada partido que no se pudo guardar por un error.
+    """
+    conn = _connect()
+    try:
+        known = {row[0] for row in conn.execute(
+            "SELECT game_pk FROM games WHERE official_date BETWEEN ? AND ?",
+            (start_date.isoformat(), end_date.isoformat()),
+        )}
+    finally:
+        conn.close()
+
+    failed_days = []
+
+    def safe_game_row(item):
+        date_str, game = item
+        try:
+            return _game_row(game, date_str)
+        except Exception as e:
+            print(f"  - [Feature Store] Saltando partido {game['gamePk']}: {e}")
+            failed_days.append(date_str)
+            return None
+
+    with attribute('feature_sync', f"games {start_date}..{end_date}", log=True):
+        pending = [
+            (date_str, game)
+            for date_str, games in iter_games_by_date(start_date, end_date, hydrate=None)
+            for game in games
+            if game['gamePk'] not in known and is_final_game(game)
+        ]
+        # Los boxscores que faltan en el almacén local se descargan en paralelo.
+        with ThreadPoolExecutor(max_workers=PREDICTION_WORKERS) as executor:
+            rows = [row for row in context_map(executor, safe_game_row, pending) if row]
+
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO games ({', '.join(GAME_COLUMNS)}) VALUES ({', '.join('?' for _ in GAME_COLUMNS)})",
+                [[row[col] for col in GAME_COLUMNS] for row in rows],
+            )
+    finally:
+        conn.close()
+    print(f"--- [Feature Store] {len(rows)} partidos nuevos, {len(known)} ya estaban guardados ---")
+    return sorted(failed_days)
+
+
+def sync_sources(games):
+    """
+    Sincroniza, una vez por equipo y por lanzador, el libro de equipos y los gameLogs que
+    cubren las ventanas de 'games' (el DataFrame de load_games), y el OPS de la API de cada
+    ventana de equipo con juegos que aún no esté guardado.
+    """
+    windows = _windows(games)
+    for season in sorted(games['season'].unique()):
+        in_season = (games['season'] == season).to_numpy()
+        team_start = date.fromordinal(int(windows['team_start'][in_season].min()))
+        team_end = date.fromordinal(int(windows['team_end'][in_season].max()))
+        pitcher_end = date.fromordinal(int(windows['pitcher_end'][in_season].max()))
+        season_games = games[in_season]
+        teams = sorted(set(season_games['home_team_id']) | set(season_games['away_team_id']))
+        pitchers = sorted(set(season_games['home_pitcher_id']) | set(season_games['away_pitcher_id']))
+
+        with ThreadPoolExecutor(max_workers=PREDICTION_WORKERS) as executor:
+            if team_end >= team_start:
+                with attribute('feature_sync', f"{season} teams", log=True):
+                    context_map(executor, lambda team_id: team_ledger.ensure_synced(int(team_id), int(season), team_start, team_end), teams)
+                season_windows = {name: values[in_season] for name, values in windows.items()}
+                ops_windows = sorted(set().union(*(_ops_windows(season_games, season_windows, side) for side in ('home', 'away'))))
+                with attribute('feature_sync', f"{season} team ops", log=True):
+                    context_map(executor, lambda window: team_ledger.window_ops(window[0], int(season), window[1], window[2]), ops_windows)
+            with attribute('feature_sync', f"{season} pitchers", log=True):
+                context_map(executor, lambda player_id: pitcher_store.ensure_fresh(int(player_id), int(season), pitcher_end), pitchers)
+        print(f"--- [Feature Store] Temporada {season}: {len(teams)} equipos y {len(pitchers)} lanzadores sincronizados ---")
+
+
+# ===================================================================
+# CÁLCULO VECTORIZADO
+# ===================================================================
+def load_games(start_date, end_date):
+    """Partidos guardados entre start_date y end_date (fechas oficiales), en orden cronológico."""
+    conn = _connect()
+    try:
+        games = pd.read_sql_query(
+            f"SELECT {', '.join(GAME_COLUMNS)} FROM games WHERE official_date BETWEEN ? AND ?"
+            " ORDER BY official_date, game_datetime, game_pk",
+            conn, params=(start_date.isoformat(), end_date.isoformat()),
+        )
+    finally:
+        conn.close()
+    return games
+
+
+def _ordinals(day_values):
+    """Ordinales (date.toordinal) de una serie de fechas/datetimes normalizados a medianoche."""
+    days = pd.to_datetime(day_values).dt.normalize()
+    return ((days - pd.Timestamp('1970-01-01')).dt.days + _EPOCH_ORDINAL).to_numpy(dtype=np.int64)
+
+
+def _windows(games):
+    """
+    Límites (ordinales, inclusivos) de las ventanas de cada partido. Se replican las ventanas de
+    prediction_module sobre la hora UTC del partido, recortadas al día anterior a su fecha oficial.
+    """
+    kickoff = pd.to_datetime(games['game_datetime'])
+    kickoff_day = _ordinals(kickoff)
+    at_midnight = (kickoff == kickoff.dt.normalize()).to_numpy()
+    last_closed_day = _ordinals(games['official_date']) - 1
+    # pitcher_store.window_bounds: [juego - 30 días, antes de la hora del juego]
+    pitcher_start = kickoff_day - PITCHER_WINDOW_DAYS + np.where(at_midnight, 0, 1)
+    pitcher_end = np.minimum(kickoff_day - np.where(at_midnight, 1, 0), last_closed_day)
+    # get_team_momentum: [(juego - 1 día) - 14 días, juego - 1 día], por fecha
+    team_end = np.minimum(kickoff_day - 1, last_closed_day)
+    team_start = kickoff_day - 1 - TEAM_WINDOW_DAYS
+    return {'pitcher_start': pitcher_start, 'pitcher_end': pitcher_end, 'team_start': team_start, 'team_end': team_end}
+
+
+def _window_totals(rows, entities, starts, ends):
+    """
+    Suma de las columnas numéricas de 'rows' (entidad, fecha, valores...) para cada consulta
+    (entidad, [inicio, fin]), todas a la vez. Devuelve (sumas por consulta, partidos por consulta).
+    """
+    n_values = len(rows[0]) - 2 if rows else 0
+    if not rows:
+        return np.zeros((len(entities), n_values), dtype=np.int64), np.zeros(len(entities), dtype=np.int64)
+    row_entities = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    row_days = _ordinals(pd.Series([row[1] for row in rows]))
+    values = np.array([row[2:] for row in rows], dtype=np.int64)
+
+    keys = row_entities * _KEY_STRIDE + row_days
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    prefix = np.vstack([np.zeros((1, n_values), dtype=np.int64), np.cumsum(values[order], axis=0)])
+    entities = np.asarray(entities, dtype=np.int64)
+    lo = np.searchsorted(keys, entities * _KEY_STRIDE + starts, side='left')
+    hi = np.maximum(np.searchsorted(keys, entities * _KEY_STRIDE + ends, side='right'), lo)
+    return prefix[hi] - prefix[lo], hi - lo
+
+
+def _ops_windows(games, windows, prefix_side):
+    """
+    Ventanas de equipo (team_id, desde, hasta) del lado 'prefix_side' con algún juego en el libro:
+    las únicas para las que get_window_stats pide el OPS a la API. 'games' es de una sola temporada.
+    """
+    team_ids = games[f'{prefix_side}_team_id'].to_numpy()
+    _, games_in_window = _window_totals(
+        team_ledger.season_rows(int(games['season'].iloc[0])), team_ids, windows['team_start'], windows['team_end'],
+    )
+    return {
+        (int(team_id), date.fromordinal(int(start)), date.fromordinal(int(end)))
+        for team_id, start, end, count in zip(team_ids, windows['team_start'], windows['team_end'], games_in_window)
+        if count > 0
+    }
+
+
+def _rounded(values, valid, digits):
+    # round() de Python, elemento a elemento, para obtener exactamente los mismos valores que el
+    # cálculo partido a partido (np.round puede diferir en el último decimal).
+    return np.array([round(float(v), digits) if ok else np.nan for v, ok in zip(values, valid)], dtype=np.float64)
+
+
+def _pitcher_features(games, windows, prefix_side):
+    index = {col: i for i, col in enumerate(pitcher_store.STAT_COLUMNS)}
+    seasons = games['season'].to_numpy()
+    era = np.full(len(games), np.nan)
+    whip = np.full(len(games), np.nan)
+    for season in np.unique(seasons):
+        mask = seasons == season
+        totals, _ = _window_totals(
+            pitcher_store.season_rows(int(season)),
+            games.loc[mask, f'{prefix_side}_pitcher_id'].to_numpy(),
+            windows['pitcher_start'][mask], windows['pitcher_end'][mask],
+        )
+        # Misma aritmética que pitcher_store._rates.
+        total_ip = totals[:, index['innings_tenths']] / 10.0
+        valid = total_ip > 0
+        safe_ip = np.where(valid, total_ip, 1.0)
+        era[mask] = _rounded((totals[:, index['earned_runs']] * 9) / safe_ip, valid, 2)
+        whip[mask] = _rounded((totals[:, index['walks']] + totals[:, index['hits']]) / safe_ip, valid, 2)
+    return {f'{prefix_side}_recent_era': era, f'{prefix_side}_recent_whip': whip}
+
+
+def _team_features(games, windows, prefix_side):
+    index = {col: i for i, col in enumerate(team_ledger.LEDGER_COLUMNS)}
+    seasons = games['season'].to_numpy()
+    ops = np.zeros(len(games))
+    bullpen_era = np.full(len(games), np.nan)
+    for season in np.unique(seasons):
+        mask = seasons == season
+        totals, games_in_window = _window_totals(
+            team_ledger.season_rows(int(season)),
+            games.loc[mask, f'{prefix_side}_team_id'].to_numpy(),
+            windows['team_start'][mask], windows['team_end'][mask],
+        )
+        column = lambda name: totals[:, index[name]]
+        # OPS de la API guardado por team_ledger.window_ops (sync_sources); como en
+        # prediction_module, sin OPS (o sin juegos en la ventana) el modelo recibe 0.
+        stored_ops = team_ledger.season_window_ops(int(season))
+        keys = zip(games.loc[mask, f'{prefix_side}_team_id'], windows['team_start'][mask], windows['team_end'][mask])
+        values = [
+            stored_ops.get((int(team_id), date.fromordinal(int(start)).isoformat(), date.fromordinal(int(end)).isoformat()))
+            for team_id, start, end in keys
+        ]
+        ops[mask] = [float(value) if count > 0 and value else 0.0 for value, count in zip(values, games_in_window)]
+
+        has_outs = column('bullpen_outs') > 0
+        bullpen_ip = np.where(has_outs, column('bullpen_outs'), 1) / 3.0
+        bullpen_era[mask] = _rounded((column('bullpen_er') * 9) / bullpen_ip, has_outs, 2)
+    return {f'{prefix_side}_team_ops': ops, f'{prefix_side}_bullpen_era': bullpen_era}
+
+
+def compute_features(games):
+    """Añade a 'games' (de load_games) las características del modelo, en una sola pasada."""
+    windows = _windows(games)
+    features = games.copy()
+    features['game_date'] = pd.to_datetime(games['game_datetime']).dt.strftime('%Y-%m-%d')
+    features['home_park_factor'] = [PARK_FACTORS.get(venue, np.nan) for venue in games['venue']]
+    for side in ('home', 'away'):
+        for name, values in {**_pitcher_features(games, windows, side), **_team_features(games, windows, side)}.items():
+            features[name] = values
+    return features
+
+
+def build_features(start_date, end_date, sync=True):
+    """
+    DataFrame con una fila por partido finalizado entre start_date y end_date: identificación
+    del partido, las características del modelo (FEATURE_COLUMNS) y el resultado. Con
+    sync=False no se toca la red y se usa solo lo que ya está en los almacenes locales.
+    En attrs['failed_days'] queda el día de cada partido que no se pudo sincronizar.
+    """
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    failed_days = sync_games(start_date, end_date) if sync else []
+    games = load_games(start_date, end_date)
+    if games.empty:
+        games.attrs['failed_days'] = failed_days
+        return games
+    if sync:
+        sync_sources(games)
+    features = compute_features(games)
+    features.attrs['failed_days'] = failed_days
+    print(f"--- [Feature Store] Características de {len(features)} partidos calculadas ({start_date} a {end_date}) ---")
+    return features
+
+
+def feature_matrix(features, feature_order):
+    """Matriz float32 para el modelo, con la misma regla que build_feature_matrix (NaN -> 0)."""
+    return np.nan_to_num(features[feature_order].to_numpy(dtype=np.float32), nan=0.0)
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+# ===================================================================
+# BLOQUE PRINCIPAL: matriz de entrenamiento de una temporada
+# ===================================================================
+if __name__ == '__main__':
+    # Uso: python -m src.feature_store 2023 [--output archivo.csv] [--offline]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Construye la matriz de entrenamiento de una temporada desde el almacén de características.")
+    parser.add_argument('season', type=int)
+    parser.add_argument('--start', type=date.fromisoformat, help="Primer día (por defecto, 1 de marzo).")
+    parser.add_argument('--end', type=date.fromisoformat, help="Último día (por defecto, 30 de noviembre).")
+    parser.add_argument('--output', help="Archivo CSV de salida (por defecto mlb_dataset_<temporada>_pit.csv).")
+    parser.add_argument('--offline', action='store_true', help="No sincroniza: usa solo los almacenes locales.")
+    args = parser.parse_args()
+
+    start = args.start or date(args.season, 3, 1)
+    end = args.end or min(date(args.season, 11, 30), date.today() - timedelta(days=1))
+    dataset = build_features(start, end, sync=not args.offline)
+    output_path = args.output or f"mlb_dataset_{args.season}_pit.csv"
+    dataset.to_csv(output_path, index=False)
+    print(f"--- [Feature Store] {len(dataset)} partidos guardados en {output_path} ---")
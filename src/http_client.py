@@ -0,0 +1,187 @@
+# src/http_client.py
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import call_budget, config, metrics
+
+BASE_URL = "https://statsapi.mlb.com/api/v1"
+
+# --- CONFIGURACIÓN DEL POOL Y DE LOS REINTENTOS ---
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 32
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.5  # 0.5s, 1s, 2s entre reintentos
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Timeouts (conexión, lectura) en segundos para cada tipo de endpoint.
+# Los boxscores son las respuestas más pesadas, por eso tienen más margen de lectura.
+ENDPOINT_TIMEOUTS = {
+    'schedule': (3.05, 10),
+    'people_stats': (3.05, 10),
+    'people': (3.05, 10),
+    'team_stats': (3.05, 10),
+    'teams': (3.05, 10),
+    'boxscore': (3.05, 15),
+    'game': (3.05, 15),
+}
+DEFAULT_TIMEOUT = (3.05, 10)
+
+API_MODES = ('live', 'record', 'replay')
+
+_session = None
+_session_lock = threading.Lock()
+
+# Modo de acceso a la API; por defecto el de config.py (variables de entorno MLB_API_*).
+_api_settings = {
+    'mode': config.MLB_API_MODE,
+    'fixtures_dir': config.MLB_API_FIXTURES_DIR,
+    'latency_ms': config.MLB_API_REPLAY_LATENCY_MS,
+    'jitter_ms': config.MLB_API_REPLAY_JITTER_MS,
+}
+
+# Contadores de latencia por endpoint: {endpoint: {'calls', 'errors', 'total_seconds', 'max_seconds'}}
+_call_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _build_session():
+    mode = _api_settings['mode']
+    if mode not in API_MODES:
+        raise ValueError(f"MLB_API_MODE desconocido: '{mode}' (usa {', '.join(API_MODES)})")
+    session = requests.Session()
+    if mode == 'replay':
+        from .api_fixtures import ReplayAdapter
+        adapter = ReplayAdapter(
+            _api_settings['fixtures_dir'],
+            latency_ms=_api_settings['latency_ms'],
+            jitter_ms=_api_settings['jitter_ms'],
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        print(f"--- [API] Modo reproducción desde {_api_settings['fixtures_dir']} ---")
+        return session
+
+    retry = Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False,
+    )
+    pool_args = {'pool_connections': POOL_CONNECTIONS, 'pool_maxsize': POOL_MAXSIZE, 'max_retries': retry}
+    if mode == 'record':
+        from .api_fixtures import RecordingAdapter
+        adapter = RecordingAdapter(_api_settings['fixtures_dir'], **pool_args)
+        print(f"--- [API] Modo grabación en {_api_settings['fixtures_dir']} ---")
+    else:
+        adapter = HTTPAdapter(**pool_args)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """
+    Devuelve la sesión HTTP compartida (una por proceso), creándola la primera vez.
+    Reutiliza las conexiones TCP/TLS entre llamadas gracias al pool de conexiones.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def configure_api(mode=None, fixtures_dir=None, latency_ms=None, jitter_ms=None):
+    """
+    Cambia en tiempo de ejecución el modo de acceso a la API ('live', 'record' o 'replay')
+    y descarta la sesión actual para que la siguiente llamada use la nueva configuración.
+    """
+    global _session
+    updates = {'mode': mode, 'fixtures_dir': fixtures_dir, 'latency_ms': latency_ms, 'jitter_ms': jitter_ms}
+    with _session_lock:
+        _api_settings.update({key: value for key, value in updates.items() if value is not None})
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_api_mode():
+    """Devuelve el modo de acceso a la API en uso: 'live', 'record' o 'replay'."""
+    return _api_settings['mode']
+
+
+def endpoint_name(path):
+    """
+    Clasifica una ruta de la API en un nombre de endpoint corto, p. ej.
+    '/game/745431/boxscore' -> 'boxscore', '/people/123/stats' -> 'people_stats'.
+    """
+    if path.startswith(BASE_URL):
+        path = path[len(BASE_URL):]
+    segments = [s for s in path.split('?')[0].split('/') if s]
+    if not segments:
+        return 'unknown'
+    root = segments[0]
+    if root == 'game':
+        return 'boxscore' if segments[-1] == 'boxscore' else 'game'
+    if root == 'people':
+        return 'people_stats' if segments[-1] == 'stats' else 'people'
+    if root == 'teams':
+        return 'team_stats' if segments[-1] == 'stats' else 'teams'
+    return root
+
+
+def _record_call(endpoint, elapsed, failed):
+    with _stats_lock:
+        stats = _call_stats.setdefault(endpoint, {'calls': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+        stats['calls'] += 1
+        stats['total_seconds'] += elapsed
+        stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+        if failed:
+            stats['errors'] += 1
+    call_budget.record_call(endpoint)
+    metrics.observe('mlb_api_request_seconds', elapsed, endpoint=endpoint)
+    metrics.inc('mlb_api_requests_total', endpoint=endpoint, outcome='error' if failed else 'ok')
+
+
+def get(path, params=None, timeout=None):
+    """
+    Realiza un GET contra la API de estadísticas de la MLB a través de la sesión compartida.
+    Acepta una ruta relativa ('/schedule') o una URL completa. Lanza
+    requests.exceptions.RequestException si la llamada falla tras los reintentos.
+    """
+    url = path if path.startswith('http') else f"{BASE_URL}{path}"
+    endpoint = endpoint_name(path)
+    if timeout is None:
+        timeout = ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+
+    start = time.perf_counter()
+    failed = True
+    try:
+        response = get_session().get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        failed = False
+        return response
+    finally:
+        _record_call(endpoint, time.perf_counter() - start, failed)
+
+
+def get_json(path, params=None, timeout=None):
+    """Igual que get(), pero devuelve directamente el cuerpo JSON decodificado."""
+    return get(path, params=params, timeout=timeout).json()
+
+
+def get_call_stats():
+    """Devuelve una copia de los contadores de latencia por endpoint."""
+    with _stats_lock:
+        return {endpoint: dict(stats) for endpoint, stats in _call_stats.items()}
+
+
+def reset_call_stats():
+    with _stats_lock:
+        _call_stats.clear()
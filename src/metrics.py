@@ -0,0 +1,252 @@
+# src/metrics.py
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import METRICS_DIR
+
+# Registro de métricas en memoria (por proceso) con salida en el formato de texto de Prometheus.
+# Es deliberadamente pequeño: contadores e histogramas con etiquetas, suficiente para saber en
+# qué etapa se fue el tiempo de una página lenta sin añadir dependencias.
+#
+# Con varios procesos (workers de gunicorn), cada uno solo ve sus propias métricas. Si METRICS_DIR
+# está definido, cada proceso vuelca las suyas en <METRICS_DIR>/<pid>.json (un hilo lo hace cada
+# FLUSH_SECONDS si hubo cambios, y también antes de cada fork y al salir) y /metrics suma los
+# archivos de todos, así que los contadores no saltan según el worker que atienda la petición.
+# Los archivos de workers ya terminados se conservan para que los contadores no retrocedan.
+
+# Límites de los buckets de latencia, en segundos.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Buckets para cantidades (p. ej. llamadas a la API por cartelera).
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Nombre -> (tipo, descripción, buckets). Solo las métricas declaradas aquí pueden registrarse.
+METRICS = {
+    'mlb_stage_seconds': ('histogram', "Duración de cada etapa del cálculo de la cartelera y de la página.", DEFAULT_BUCKETS),
+    'mlb_api_request_seconds': ('histogram', "Latencia de las llamadas a la API de la MLB por endpoint.", DEFAULT_BUCKETS),
+    'mlb_api_requests_total': ('counter', "Llamadas a la API de la MLB por endpoint y resultado.", None),
+    'mlb_api_calls_per_scope': ('histogram', "Llamadas a la API de la MLB por ámbito (página, cartelera, partido, día de backtest, fila de dataset).", COUNT_BUCKETS),
+    'mlb_api_calls_attributed_total': ('counter', "Llamadas a la API de la MLB por endpoint y ámbito más interno que las originó.", None),
+    'mlb_cache_requests_total': ('counter', "Consultas a cachés y almacenes locales por resultado (hit, miss, stale).", None),
+}
+
+FLUSH_SECONDS = 1.0
+
+_lock = threading.Lock()
+_counters = {}    # (nombre, etiquetas) -> valor
+_histograms = {}  # (nombre, etiquetas) -> [conteos por bucket..., suma, total]
+_dirty = False
+_flusher = None
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    """Incrementa un contador."""
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+    _mark_dirty()
+
+
+def observe(name, value, **labels):
+    """Registra una observación en un histograma."""
+    buckets = METRICS[name][2]
+    key = (name, _label_key(labels))
+    with _lock:
+        data = _histograms.get(key)
+        if data is None:
+            data = _histograms[key] = [0] * len(buckets) + [0.0, 0]
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                data[i] += 1
+        data[-2] += value
+        data[-1] += 1
+    _mark_dirty()
+
+
+@contextmanager
+def timed(stage):
+    """Mide la duración del bloque y la suma a mlb_stage_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('mlb_stage_seconds', time.perf_counter() - start, stage=stage)
+
+
+def cache_result(cache, result):
+    """Cuenta un acierto/fallo de caché: cache_result('boxscore', 'hit')."""
+    inc('mlb_cache_requests_total', cache=cache, result=result)
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def _snapshot():
+    with _lock:
+        return dict(_counters), {key: list(data) for key, data in _histograms.items()}
+
+
+def _process_path(pid=None):
+    return os.path.join(METRICS_DIR, f"{pid or os.getpid()}.json")
+
+
+def flush():
+    """Vuelca las métricas del proceso en METRICS_DIR (escritura atómica). Sin METRICS_DIR, no hace nada."""
+    global _dirty
+    if not METRICS_DIR:
+        return
+    _dirty = False
+    counters, histograms = _snapshot()
+    payload = {
+        'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+        'histograms': [[name, labels, data] for (name, labels), data in histograms.items()],
+    }
+    path = _process_path()
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(temp_path, path)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        if _dirty:
+            try:
+                flush()
+            except OSError as e:
+                print(f"--- [Metrics] No se pudieron volcar las métricas en {METRICS_DIR}: {e} ---")
+
+
+def _mark_dirty():
+    global _dirty, _flusher
+    if not METRICS_DIR:
+        return
+    _dirty = True
+    if _flusher is None:
+        with _lock:
+            if _flusher is None:
+                _flusher = threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True)
+                _flusher.start()
+
+
+def _aggregate():
+    """Suma las métricas volcadas por todos los procesos (incluido este, recién volcado)."""
+    flush()
+    counters, histograms = {}, {}
+    for path in glob.glob(os.path.join(METRICS_DIR, '*.json')):
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in payload['counters']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, data in payload['histograms']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            total = histograms.setdefault(key, [0] * len(data))
+            for i, value in enumerate(data):
+                total[i] += value
+    return counters, histograms
+
+
+def _after_fork_in_child():
+    # El hijo hereda las métricas del padre, que ya están en el archivo del padre. El hilo que
+    # vuelca no sobrevive al fork: se crea de nuevo con la primera métrica.
+    global _lock, _dirty, _flusher
+    _lock = threading.Lock()
+    _counters.clear()
+    _histograms.clear()
+    _dirty, _flusher = False, None
+
+
+def _flush_at_exit():
+    # Al apagar gunicorn, on_exit puede haber borrado ya la carpeta.
+    try:
+        flush()
+    except OSError:
+        pass
+
+
+if METRICS_DIR:
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    os.register_at_fork(before=flush, after_in_child=_after_fork_in_child)
+    atexit.register(_flush_at_exit)
+
+
+def render_prometheus():
+    """
+    Devuelve las métricas en el formato de texto de Prometheus (0.0.4): las de todos los procesos
+    si METRICS_DIR está definido y, si no, las de este proceso.
+    """
+    counters, histograms = _aggregate() if METRICS_DIR else _snapshot()
+
+    lines = []
+    for name, (metric_type, description, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        if metric_type == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        else:
+            for (metric, labels), data in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(buckets, data[:len(buckets)]):
+                    lines.append(f"{name}_bucket{_format_labels(labels, {'le': _format_bound(bound)})} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {data[-1]}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {data[-2]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {data[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def process_memory(pid=None):
+    """
+    Memoria de un proceso en MB, desde /proc (solo Linux): 'rss' (residente), 'pss' (reparto
+    proporcional de las páginas compartidas) y 'uss' (páginas privadas). Tras el fork de
+    gunicorn, la diferencia entre rss y uss es lo que el worker comparte con el maestro.
+    Devuelve None si /proc no está disponible.
+    """
+    proc_dir = f"/proc/{pid or os.getpid()}"
+    fields = {}
+    try:
+        with open(os.path.join(proc_dir, 'smaps_rollup')) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        return None
+    private = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return {
+        'rss': round(fields.get('Rss', 0) / 1024, 1),
+        'pss': round(fields.get('Pss', 0) / 1024, 1),
+        'uss': round(private / 1024, 1),
+    }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+    if METRICS_DIR:
+        flush()
@@ -0,0 +1,185 @@
+# src/pipeline.py
+import contextvars
+import heapq
+import queue
+import threading
+import time
+from collections import namedtuple
+
+# Pipeline por etapas con colas acotadas, para los constructores de datasets. Cada etapa tiene
+# su propio número de hilos y lee de una cola de tamaño fijo; si una etapa se atasca, su cola
+# se llena y las anteriores se bloquean (contrapresión) en lugar de acumular trabajo en memoria.
+# Además, como mucho 'max_in_flight' elementos pueden estar dentro del pipeline a la vez, así
+# que la memoria no depende de la longitud del rango procesado.
+#
+# Las etapas de red (descargas) se solapan con las de CPU: mientras un hilo espera la API, los
+# demás siguen trabajando. Los resultados salen en el mismo orden que entraron.
+#
+# Una etapa es una función elemento -> elemento; si devuelve None, el elemento se descarta y
+# no pasa por las etapas siguientes. Si lanza una excepción, el pipeline se detiene y la
+# excepción se propaga a quien consume los resultados.
+
+Stage = namedtuple('Stage', ['name', 'func', 'workers'], defaults=(1,))
+
+QUEUE_SIZE = 32
+_POLL_SECONDS = 0.1
+
+_DONE = object()
+_SKIPPED = object()
+
+
+class _StageStats:
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, busy, blocked):
+        with self.lock:
+            self.items += 1
+            self.busy += busy
+            self.blocked += blocked
+
+
+def _put(q, item, stop):
+    """Encola esperando si la cola está llena; devuelve los segundos bloqueado o None si se detuvo."""
+    start = time.perf_counter()
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return time.perf_counter() - start
+        except queue.Full:
+            continue
+    return None
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def run_pipeline(items, stages, queue_size=QUEUE_SIZE, max_in_flight=None, name='pipeline'):
+    """
+    Generador: pasa cada elemento de 'items' por 'stages' (lista de Stage) y produce los
+    resultados en el orden de entrada, omitiendo los descartados. 'items' se consume en un
+    hilo propio y de forma perezosa, así que puede ser a su vez un generador que hace red.
+    Los hilos heredan los ámbitos de call_budget del hilo que llama.
+    """
+    stages = list(stages)
+    max_in_flight = max_in_flight or queue_size * (len(stages) + 1)
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    stop = threading.Event()
+    in_flight = threading.Semaphore(max_in_flight)
+    errors = []
+    stats = [_StageStats(stage.name, max(1, stage.workers)) for stage in stages]
+    remaining = [s.workers for s in stats]
+    remaining_lock = threading.Lock()
+
+    def fail(exc):
+        errors.append(exc)
+        stop.set()
+
+    def source():
+        try:
+            for seq, item in enumerate(items):
+                while not in_flight.acquire(timeout=_POLL_SECONDS):
+                    if stop.is_set():
+                        return
+                if _put(queues[0], (seq, item), stop) is None:
+                    return
+        except BaseException as exc:
+            fail(exc)
+        finally:
+            for _ in range(stats[0].workers if stats else 1):
+                if _put(queues[0], _DONE, stop) is None:
+                    break
+
+    def worker(index):
+        stage, stage_stats = stages[index], stats[index]
+        inbox, outbox = queues[index], queues[index + 1]
+        try:
+            while True:
+                message = _get(inbox, stop)
+                if message is _DONE:
+                    break
+                seq, item = message
+                start = time.perf_counter()
+                if item is not _SKIPPED:
+                    item = stage.func(item)
+                    if item is None:
+                        item = _SKIPPED
+                busy = time.perf_counter() - start
+                blocked = _put(outbox, (seq, item), stop)
+                if blocked is None:
+                    break
+                stage_stats.add(busy, blocked)
+        except BaseException as exc:
+            fail(exc)
+        finally:
+            with remaining_lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last:
+                downstream = stats[index + 1].workers if index + 1 < len(stats) else 1
+                for _ in range(downstream):
+                    if _put(queues[index + 1], _DONE, stop) is None:
+                        break
+
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(source,),
+                                name=f"{name}-source", daemon=True)]
+    for index, stage_stats in enumerate(stats):
+        threads.extend(
+            threading.Thread(target=contextvars.copy_context().run, args=(worker, index),
+                             name=f"{name}-{stage_stats.name}-{n}", daemon=True)
+            for n in range(stage_stats.workers)
+        )
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    # Los resultados pueden llegar desordenados; se reordenan con un montículo, que nunca
+    # supera max_in_flight elementos porque el hueco solo se libera al entregar en orden.
+    pending, next_seq, produced = [], 0, 0
+    try:
+        while True:
+            message = _get(queues[-1], stop)
+            if message is _DONE:
+                break
+            heapq.heappush(pending, message)
+            while pending and pending[0][0] == next_seq:
+                _, item = heapq.heappop(pending)
+                next_seq += 1
+                in_flight.release()
+                if item is not _SKIPPED:
+                    produced += 1
+                    yield item
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+    summary = ', '.join(
+        f"{s.name}×{s.workers}: {s.items} en {s.busy:.1f} s ocupados, {s.blocked:.1f} s esperando cola"
+        for s in stats
+    )
+    print(f"--- [Pipeline] {name}: {produced} resultados en {elapsed:.1f} s ({summary or 'sin etapas'}) ---")
+
+
+def parse_stage_workers(values, defaults):
+    """Convierte ['fetch=8', 'parse=2'] (argumentos de línea de comandos) en {etapa: hilos}."""
+    workers = dict(defaults)
+    for value in values or []:
+        stage, _, count = value.partition('=')
+        if stage not in workers or not count.isdigit() or int(count) < 1:
+            raise ValueError(f"'{value}' no es válido: usa etapa=hilos con etapa en {', '.join(workers)}")
+        workers[stage] = int(count)
+    return workers
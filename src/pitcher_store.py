@@ -0,0 +1,277 @@
+# src/pitcher_store.py
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from .config import LOCAL_STORE_DIR
+from .http_client import get_json
+
+# Almacén de gameLogs de lanzadores, con clave (player_id, season). Cada temporada se descarga
+# una vez y después solo se piden los juegos posteriores al último día sincronizado.
+STORE_PATH = os.path.join(LOCAL_STORE_DIR, 'pitcher_gamelogs.sqlite')
+
+# Columnas acumulables. 'innings_tenths' guarda inningsPitched tal como lo publica la API
+# ('6.1' -> 61), que es la convención con la que se entrenó el modelo.
+STAT_COLUMNS = ['innings_tenths', 'outs', 'earned_runs', 'hits', 'walks', 'strikeouts']
+
+_init_lock = threading.Lock()
+_initialized = False
+_pitcher_locks = {}
+_pitcher_locks_guard = threading.Lock()
+
+# Arrays en memoria por (player_id, season): (ordinales de fecha, sumas prefijas, filas).
+_logs = {}
+# Último día sincronizado conocido por este proceso: (player_id, season) -> date.
+_refreshed = {}
+# Juegos de días aún no cerrados (hoy), que no se guardan en el almacén: se reutilizan durante
+# OPEN_DAY_SECONDS para no pedirlos en cada cálculo de la cartelera del día.
+OPEN_DAY_SECONDS = 300
+# (player_id, season, desde, hasta) -> (momento de la lectura, filas).
+_open_days = {}
+_open_days_lock = threading.Lock()
+
+
+def _connect():
+    global _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                os.makedirs(os.path.dirname(STORE_PATH), exist_ok=True)
+                columns_sql = ", ".join(f"{col} INTEGER NOT NULL DEFAULT 0" for col in STAT_COLUMNS)
+                with sqlite3.connect(STORE_PATH, timeout=30) as conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS pitcher_games ("
+                        " player_id INTEGER NOT NULL, season INTEGER NOT NULL, game_pk INTEGER NOT NULL,"
+                        f" game_date TEXT NOT NULL, {columns_sql},"
+                        " PRIMARY KEY (player_id, season, game_pk))"
+                    )
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS pitcher_sync ("
+                        " player_id INTEGER NOT NULL, season INTEGER NOT NULL, refreshed_through TEXT NOT NULL,"
+                        " PRIMARY KEY (player_id, season))"
+                    )
+                _initialized = True
+    return sqlite3.connect(STORE_PATH, timeout=30)
+
+
+def _pitcher_lock(key):
+    with _pitcher_locks_guard:
+        return _pitcher_locks.setdefault(key, threading.Lock())
+
+
+def _innings_parts(ip_str):
+    parts = str(ip_str or "0.0").split('.')
+    whole, fraction = int(parts[0]), (int(parts[1][:1]) if len(parts) > 1 and parts[1] else 0)
+    return whole * 10 + fraction, whole * 3 + fraction
+
+
+def _parse_split(player_id, season, split):
+    stat = split.get('stat', {})
+    innings_tenths, outs = _innings_parts(stat.get('inningsPitched'))
+    return {
+        'player_id': player_id, 'season': season,
+        'game_pk': split.get('game', {}).get('gamePk') or 0,
+        'game_date': split['date'],
+        'innings_tenths': innings_tenths, 'outs': outs,
+        'earned_runs': int(stat.get('earnedRuns') or 0),
+        'hits': int(stat.get('hits') or 0),
+        'walks': int(stat.get('baseOnBalls') or 0),
+        'strikeouts': int(stat.get('strikeOuts') or 0),
+    }
+
+
+def _cutoff_for(season):
+    """Último día que puede considerarse cerrado: ayer, o el fin de una temporada pasada."""
+    return min(date.today() - timedelta(days=1), date(season, 12, 31))
+
+
+def _read_refreshed(player_id, season):
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT refreshed_through FROM pitcher_sync WHERE player_id = ? AND season = ?",
+            (player_id, season),
+        ).fetchone()
+    finally:
+        conn.close()
+    return date.fromisoformat(row[0]) if row else None
+
+
+def ensure_fresh(player_id, season, through_date):
+    """
+    Garantiza que el almacén tenga el gameLog del lanzador hasta 'through_date'.
+    Si hace falta, descarga solo los juegos posteriores al último día sincronizado.
+    """
+    key = (player_id, season)
+    cutoff = _cutoff_for(season)
+    through_date = min(through_date, cutoff)
+    refreshed = _refreshed.get(key)
+    if refreshed is not None and refreshed >= through_date:
+        return
+
+    with _pitcher_lock(key):
+        stored = _read_refreshed(player_id, season)
+        if stored != _refreshed.get(key):
+            _logs.pop(key, None)
+        if stored is not None and stored >= through_date:
+            _refreshed[key] = stored
+            return
+
+        params = {'stats': 'gameLog', 'group': 'pitching', 'season': season}
+        if stored is not None:
+            params.update({'startDate': (stored + timedelta(days=1)).isoformat(), 'endDate': cutoff.isoformat()})
+        splits = get_json(f"/people/{player_id}/stats", params=params).get('stats', [{}])[0].get('splits', [])
+
+        rows = [_parse_split(player_id, season, split) for split in splits if split.get('date')]
+        # Solo se guardan días cerrados; los juegos de hoy se añadirán en la próxima sincronización.
+        rows = [row for row in rows if (stored is None or row['game_date'] > stored.isoformat()) and row['game_date'] <= cutoff.isoformat()]
+
+        columns = ['player_id', 'season', 'game_pk', 'game_date'] + STAT_COLUMNS
+        conn = _connect()
+        try:
+            with conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO pitcher_games ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                    [[row[col] for col in columns] for row in rows],
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO pitcher_sync (player_id, season, refreshed_through) VALUES (?, ?, ?)",
+                    (player_id, season, cutoff.isoformat()),
+                )
+        finally:
+            conn.close()
+        _refreshed[key] = cutoff
+        _logs.pop(key, None)
+
+
+def _load_logs(player_id, season):
+    key = (player_id, season)
+    logs = _logs.get(key)
+    if logs is not None:
+        return logs
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            f"SELECT game_date, {', '.join(STAT_COLUMNS)} FROM pitcher_games"
+            " WHERE player_id = ? AND season = ? ORDER BY game_date, game_pk",
+            (player_id, season),
+        ).fetchall()
+    finally:
+        conn.close()
+    ordinals = [date.fromisoformat(row[0]).toordinal() for row in rows]
+    prefix = {
+        col: [0] + list(accumulate(row[i + 1] for row in rows))
+        for i, col in enumerate(STAT_COLUMNS)
+    }
+    logs = (ordinals, prefix, rows)
+    _logs[key] = logs
+    return logs
+
+
+def season_rows(season):
+    """
+    Todas las salidas guardadas de la temporada, para cálculos en bloque (feature_store):
+    lista de (player_id, game_date, *STAT_COLUMNS), ordenada por lanzador y fecha.
+    """
+    conn = _connect()
+    try:
+        return conn.execute(
+            f"SELECT player_id, game_date, {', '.join(STAT_COLUMNS)} FROM pitcher_games"
+            " WHERE season = ? ORDER BY player_id, game_date, game_pk",
+            (season,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def _rates(totals):
+    """ERA, WHIP y K/9 con la convención de innings de la API (6.1 -> 6.1)."""
+    total_ip = totals['innings_tenths'] / 10.0
+    if total_ip <= 0:
+        return None
+    return {
+        'era': (totals['earned_runs'] * 9) / total_ip,
+        'whip': (totals['walks'] + totals['hits']) / total_ip,
+        'k_per_9': (totals['strikeouts'] * 9) / total_ip,
+    }
+
+
+def window_stats(player_id, season, start_date, end_date):
+    """
+    Devuelve ERA, WHIP y K/9 del lanzador para los juegos entre 'start_date' y 'end_date'
+    (ambos inclusive), o None si no lanzó en esa ventana.
+    """
+    ensure_fresh(player_id, season, end_date)
+    ordinals, prefix, _ = _load_logs(player_id, season)
+    lo = bisect_left(ordinals, start_date.toordinal())
+    hi = bisect_right(ordinals, end_date.toordinal())
+    totals = {col: prefix[col][hi] - prefix[col][lo] for col in STAT_COLUMNS}
+    games = hi - lo
+
+    # El almacén solo llega hasta ayer. Si la ventana incluye el día de hoy (p. ej. el primer
+    # juego de una doble cartelera), esos juegos se piden a la API sin guardarlos, como antes.
+    cutoff = _cutoff_for(season)
+    if end_date > cutoff:
+        for row in _open_day_rows(player_id, season, max(start_date, cutoff + timedelta(days=1)), end_date):
+            for col in STAT_COLUMNS:
+                totals[col] += row[col]
+            games += 1
+    if games == 0:
+        return None
+    return _rates(totals)
+
+
+def _open_day_rows(player_id, season, start_date, end_date):
+    """
+    Juegos del lanzador entre 'start_date' y 'end_date' (días aún no cerrados), leídos de la API
+    y reutilizados durante OPEN_DAY_SECONDS.
+    """
+    key = (player_id, season, start_date, end_date)
+    with _open_days_lock:
+        cached = _open_days.get(key)
+    if cached is not None and time.monotonic() - cached[0] < OPEN_DAY_SECONDS:
+        return cached[1]
+
+    params = {
+        'stats': 'gameLog', 'group': 'pitching', 'season': season,
+        'startDate': start_date.isoformat(), 'endDate': end_date.isoformat(),
+    }
+    splits = get_json(f"/people/{player_id}/stats", params=params).get('stats', [{}])[0].get('splits', [])
+    rows = [_parse_split(player_id, season, split) for split in splits if split.get('date')]
+    rows = [row for row in rows if start_date.isoformat() <= row['game_date'] <= end_date.isoformat()]
+    now = time.monotonic()
+    with _open_days_lock:
+        # Las entradas vencidas se descartan para que el diccionario no crezca con los días.
+        for old_key in [k for k, (fetched_at, _) in _open_days.items() if now - fetched_at >= OPEN_DAY_SECONDS]:
+            del _open_days[old_key]
+        _open_days[key] = (now, rows)
+    return rows
+
+
+def last_games_stats(player_id, season, limit=5):
+    """Devuelve ERA, WHIP y K/9 de las últimas 'limit' salidas con innings lanzados, o None."""
+    ensure_fresh(player_id, season, _cutoff_for(season))
+    _, _, rows = _load_logs(player_id, season)
+    innings_index = 1 + STAT_COLUMNS.index('innings_tenths')
+    recent = [row for row in rows if row[innings_index] > 0][-limit:]
+    if not recent:
+        return None
+    return _rates({col: sum(row[i + 1] for row in recent) for i, col in enumerate(STAT_COLUMNS)})
+
+
+def window_bounds(game_date, days=30):
+    """
+    Convierte 'los N días previos al juego' en un rango de fechas inclusivo, con la misma
+    semántica que la comparación por datetime usada hasta ahora (fecha >= juego - N días
+    y fecha < hora del juego).
+    """
+    if not isinstance(game_date, datetime):
+        game_date = datetime.combine(game_date, datetime.min.time())
+    start = game_date - timedelta(days=days)
+    start_day = start.date() if start.time() == datetime.min.time() else start.date() + timedelta(days=1)
+    end_day = game_date.date() if game_date.time() != datetime.min.time() else game_date.date() - timedelta(days=1)
+    return start_day, end_day
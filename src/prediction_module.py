@@ -1,14 +1,16 @@
 # src/prediction_module.py
 
-import requests
+import math
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import pandas as pd
+import numpy as np
 from unidecode import unidecode
 from .config import TEAM_NAME_MAP
+from . import pitcher_store, team_ledger
+from .metrics import timed
+from .call_budget import attribute, context_map
 
 # --- CONSTANTES Y CONFIGURACIÓN ---
-BASE_API_URL = "https://statsapi.mlb.com/api/v1"
-
 PARK_FACTORS = {
     "Angel Stadium": 1.019, "Coors Field": 1.359, "Comerica Park": 0.932,
     "Fenway Park": 1.103, "Great American Ball Park": 1.251, "Guaranteed Rate Field": 1.118,
@@ -23,90 +25,38 @@ PARK_FACTORS = {
     "Daikin Park": 0.951
 }
 
+@timed('pitcher_stats')
 def get_recent_pitcher_stats(player_id, season, game_date):
-    """Calcula el ERA y WHIP de un lanzador en los 30 días previos al juego."""
-    start_date = game_date - timedelta(days=30)
-    gamelog_url = f"{BASE_API_URL}/people/{player_id}/stats"
-    gamelog_params = {'stats': 'gameLog', 'group': 'pitching', 'season': season}
-    response = requests.get(gamelog_url, params=gamelog_params)
-    response.raise_for_status()
-    game_logs = response.json().get('stats', [{}])[0].get('splits', [])
-    
-    if not game_logs: return {'recent_era': None, 'recent_whip': None}
-
-    game_logs_df = pd.DataFrame([log['stat'] for log in game_logs])
-    game_logs_df['game_date_dt'] = pd.to_datetime([log['date'] for log in game_logs])
-    
-    recent_games = game_logs_df[(game_logs_df['game_date_dt'] >= start_date) & (game_logs_df['game_date_dt'] < game_date)]
-    if recent_games.empty: return {'recent_era': None, 'recent_whip': None}
-
-    total_ip = pd.to_numeric(recent_games['inningsPitched'], errors='coerce').sum()
-    total_er = pd.to_numeric(recent_games['earnedRuns'], errors='coerce').sum()
-    total_hits = pd.to_numeric(recent_games['hits'], errors='coerce').sum()
-    total_walks = pd.to_numeric(recent_games['baseOnBalls'], errors='coerce').sum()
-    
-    if total_ip > 0:
-        return {
-            'recent_era': round((total_er * 9) / total_ip, 2),
-            'recent_whip': round((total_walks + total_hits) / total_ip, 2)
-        }
-    return {'recent_era': None, 'recent_whip': None}
+    """
+    Calcula el ERA y WHIP de un lanzador en los 30 días previos al juego.
+    Usa el almacén local de gameLogs (pitcher_store), que solo descarga los juegos nuevos.
+    """
+    start_day, end_day = pitcher_store.window_bounds(game_date, days=30)
+    recent_stats = pitcher_store.window_stats(player_id, season, start_day, end_day)
+    if not recent_stats: return {'recent_era': None, 'recent_whip': None}
 
+    return {
+        'recent_era': round(recent_stats['era'], 2),
+        'recent_whip': round(recent_stats['whip'], 2)
+    }
+
+@timed('team_momentum')
 def get_team_momentum(team_id, season, game_date):
-    """Calcula el momentum de un equipo en los 14 días previos al juego."""
+    """
+    Calcula el momentum de un equipo en los 14 días previos al juego.
+    Los datos salen del libro local de equipos (team_ledger), que solo va a la red
+    para añadir los juegos que han finalizado desde la última sincronización.
+    """
     end_date = game_date - timedelta(days=1)
     start_date = end_date - timedelta(days=14)
-    start_str, end_str = start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
-    
-    momentum_params = {'season': season, 'startDate': start_str, 'endDate': end_str}
-    
-    offensive_params = {**momentum_params, 'stats': 'byDateRange', 'group': 'hitting'}
-    offensive_response = requests.get(f"{BASE_API_URL}/teams/{team_id}/stats", params=offensive_params)
-    offensive_stats = offensive_response.json().get('stats', [{}])[0].get('splits', [{}])[0].get('stat', {})
-    
-    pitching_params = {**momentum_params, 'stats': 'byDateRange', 'group': 'pitching'}
-    pitching_response = requests.get(f"{BASE_API_URL}/teams/{team_id}/stats", params=pitching_params)
-    pitching_stats = pitching_response.json().get('stats', [{}])[0].get('splits', [{}])[0].get('stat', {})
-
-    schedule_url = f"{BASE_API_URL}/schedule"
-    schedule_params = {'sportId': 1, 'teamId': team_id, 'startDate': start_str, 'endDate': end_str}
-    schedule_response = requests.get(schedule_url, params=schedule_params)
-    games = schedule_response.json().get('dates', [])
-    
-    total_bullpen_ip_outs, total_bullpen_er, total_bullpen_hits, total_bullpen_walks = 0, 0, 0, 0
-    for date_info in games:
-        for game in date_info.get('games', []):
-            boxscore_response = requests.get(f"{BASE_API_URL}/game/{game['gamePk']}/boxscore")
-            boxscore_data = boxscore_response.json()
-            team_side = 'home' if boxscore_data['teams']['home']['team']['id'] == team_id else 'away'
-            pitchers = boxscore_data['teams'][team_side].get('pitchers', [])
-            for pitcher_id in pitchers[1:]:
-                p_stats = boxscore_data['teams'][team_side]['players'].get(f'ID{pitcher_id}', {}).get('stats', {}).get('pitching', {})
-                if p_stats:
-                    ip_str = p_stats.get('inningsPitched', "0.0")
-                    parts = ip_str.split('.')
-                    total_bullpen_ip_outs += (int(parts[0]) * 3) + (int(parts[1]) if len(parts) > 1 else 0)
-                    total_bullpen_er += p_stats.get('earnedRuns', 0)
-                    total_bullpen_hits += p_stats.get('hits', 0)
-                    total_bullpen_walks += p_stats.get('baseOnBalls', 0)
-
-    bullpen_era, bullpen_whip = None, None
-    if total_bullpen_ip_outs > 0:
-        total_bullpen_ip = total_bullpen_ip_outs / 3.0
-        bullpen_era = round((total_bullpen_er * 9) / total_bullpen_ip, 2)
-        bullpen_whip = round((total_bullpen_walks + total_bullpen_hits) / total_bullpen_ip, 2)
-
-    return {
-        'runs_scored': offensive_stats.get('runs'),
-        'team_ops': offensive_stats.get('ops'),
-        'runs_allowed': pitching_stats.get('runs'),
-        'bullpen_era': bullpen_era,
-        'bullpen_whip': bullpen_whip
-    }
+    return team_ledger.get_window_stats(team_id, season, start_date, end_date)
 
-def make_prediction(game_data, model, feature_order):
+@timed('feature_assembly')
+def build_features(game_data):
     """
-    Orquesta la recolección de datos y hace una predicción para un solo juego.
+    Recolecta las características de un solo juego.
+    Devuelve (features, None) si se pudieron calcular, o (None, resultado) con el
+    resultado que se mostrará para ese juego cuando no es posible predecir.
     """
     try:
         home_team = game_data['teams']['home']['team']
@@ -118,7 +68,7 @@ def make_prediction(game_data, model, feature_order):
         away_pitcher = game_data['teams']['away'].get('probablePitcher')
 
         if not home_pitcher or not away_pitcher:
-            return {'winner': 'N/A', 'confidence': 0, 'error': 'Lanzadores no anunciados'}
+            return None, {'winner': 'N/A', 'confidence': 0, 'error': 'Lanzadores no anunciados'}
 
         # Recopilar características
         home_pitcher_stats = get_recent_pitcher_stats(home_pitcher['id'], game_season, game_date)
@@ -139,26 +89,79 @@ def make_prediction(game_data, model, feature_order):
             'away_team_ops': float(away_momentum.get('team_ops', 0) if away_momentum.get('team_ops') else 0),
             'away_bullpen_era': away_momentum.get('bullpen_era'),
         }
+        return features, None
 
-        # Preparar datos y predecir
-        prediction_df = pd.DataFrame([features])[feature_order]
-        
-        # CORRECCIÓN: Convertimos explícitamente a tipos numéricos antes de rellenar.
-        # Esto elimina el FutureWarning y es una práctica más robusta.
-        for col in prediction_df.columns:
-            prediction_df[col] = pd.to_numeric(prediction_df[col], errors='coerce')
-        
-        prediction_df = prediction_df.fillna(0)
+    except Exception as e:
+        print(f"[ERROR en make_prediction para juego {game_data.get('gamePk')}]: {e}")
+        return None, {'winner': 'Error', 'confidence': 0, 'error': str(e)}
 
-        prediction = model.predict(prediction_df)
-        prediction_proba = model.predict_proba(prediction_df)
+def _build_game_features(game_data):
+    # Las llamadas a la API hechas para este juego se atribuyen a él (ver call_budget).
+    with attribute('game', game_data.get('gamePk')):
+        return build_features(game_data)
 
-        winner_index = prediction[0]
-        winner_name = home_team['name'] if winner_index == 1 else away_team['name']
-        confidence = prediction_proba[0][winner_index]
+def _to_float(value):
+    """Equivale a pd.to_numeric(errors='coerce') seguido de fillna(0) para un solo valor."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(value) else value
+
+def build_feature_matrix(feature_rows, feature_order):
+    """Convierte una lista de diccionarios de características en una matriz float32 (una fila por juego)."""
+    matrix = np.zeros((len(feature_rows), len(feature_order)), dtype=np.float32)
+    for i, features in enumerate(feature_rows):
+        matrix[i] = [_to_float(features.get(col)) for col in feature_order]
+    return matrix
+
+@timed('predict_proba')
+def predict_matrix(model, feature_matrix):
+    """
+    Evalúa el modelo una sola vez para todo el lote.
+    Devuelve (índices del ganador, 1 = local; confianza del ganador) para cada fila.
+    """
+    prediction_proba = model.predict_proba(feature_matrix)
+    # Misma regla que XGBClassifier.predict en clasificación binaria: clase 1 si p > 0.5.
+    winner_indexes = (prediction_proba[:, 1] > 0.5).astype(int)
+    confidences = prediction_proba[np.arange(len(winner_indexes)), winner_indexes]
+    return winner_indexes, confidences
+
+def make_predictions(games, model, feature_order, max_workers=1):
+    """
+    Predice una cartelera completa. Las características de cada juego (limitadas por la red)
+    se recolectan con un pool de hilos acotado, y el modelo se evalúa una sola vez para todo
+    el lote. Devuelve un resultado {'winner', 'confidence'} por juego, en el mismo orden.
+    """
+    if max_workers > 1 and len(games) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(games))) as executor:
+            collected = context_map(executor, _build_game_features, games)
+    else:
+        collected = [_build_game_features(game) for game in games]
 
-        return {'winner': TEAM_NAME_MAP.get(winner_name, winner_name), 'confidence': confidence}
+    results = [error_result for _, error_result in collected]
+    pending = [i for i, (features, _) in enumerate(collected) if features is not None]
+    if not pending:
+        return results
 
+    try:
+        feature_matrix = build_feature_matrix([collected[i][0] for i in pending], feature_order)
+        winner_indexes, confidences = predict_matrix(model, feature_matrix)
     except Exception as e:
-        print(f"[ERROR en make_prediction para juego {game_data.get('gamePk')}]: {e}")
-        return {'winner': 'Error', 'confidence': 0, 'error': str(e)}
+        print(f"[ERROR en make_predictions al evaluar el modelo]: {e}")
+        for i in pending:
+            results[i] = {'winner': 'Error', 'confidence': 0, 'error': str(e)}
+        return results
+
+    for row, i in enumerate(pending):
+        home_team = games[i]['teams']['home']['team']
+        away_team = games[i]['teams']['away']['team']
+        winner_name = home_team['name'] if winner_indexes[row] == 1 else away_team['name']
+        results[i] = {'winner': TEAM_NAME_MAP.get(winner_name, winner_name), 'confidence': confidences[row]}
+    return results
+
+def make_prediction(game_data, model, feature_order):
+    """
+    Orquesta la recolección de datos y hace una predicción para un solo juego.
+    """
+    return make_predictions([game_data], model, feature_order)[0]
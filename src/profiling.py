@@ -0,0 +1,92 @@
+# src/profiling.py
+import cProfile
+import functools
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import PROFILE_ENABLED, PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_KEEP
+
+# Perfilado opcional con cProfile. En la web se activa con MLB_PROFILE=1 y, por petición, con la
+# cabecera PROFILE_HEADER o por muestreo (MLB_PROFILE_SAMPLE_RATE). Los scripts (backtest y
+# constructores de datasets) lo activan con --profile. Cada perfil se guarda como
+#   <PROFILE_DIR>/<fecha-hora>_<nombre>_<pid>-<n>.prof
+# (se abre con `python -m pstats` o snakeviz) y solo se conservan los PROFILE_KEEP más recientes.
+# cProfile mide el hilo que lo activa: el trabajo de los pools de hilos aparece como espera.
+PROFILE_HEADER = 'X-MLB-Profile'
+
+_state = threading.local()
+_rotate_lock = threading.Lock()
+_dump_counter = itertools.count(1)
+
+
+def _rotate(directory, keep):
+    with _rotate_lock:
+        dumps = sorted(
+            (os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.prof')),
+            key=os.path.getmtime,
+        )
+        for path in dumps[:max(0, len(dumps) - keep)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+@contextmanager
+def profile_block(name, enabled=True, directory=None, keep=None):
+    """
+    Perfila el bloque y guarda el resultado si 'enabled'. Si el hilo ya está dentro de otro
+    perfil, no se anida (el perfil exterior ya incluye este bloque).
+    """
+    if not enabled or getattr(_state, 'active', False):
+        yield None
+        return
+
+    directory = directory or PROFILE_DIR
+    profiler = cProfile.Profile()
+    _state.active = True
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        _state.active = False
+        os.makedirs(directory, exist_ok=True)
+        timestamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(directory, f"{timestamp}_{name}_{os.getpid()}-{next(_dump_counter)}.prof")
+        profiler.dump_stats(path)
+        _rotate(directory, keep if keep is not None else PROFILE_KEEP)
+        print(f"--- [Profiler] Perfil de '{name}' ({time.perf_counter() - start:.2f} s) guardado en {path} ---")
+
+
+def should_profile(headers=None):
+    """Decide si perfilar esta ejecución: perfilado activo y (cabecera presente o muestreo)."""
+    if not PROFILE_ENABLED:
+        return False
+    if headers is not None and headers.get(PROFILE_HEADER):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def profiled(name):
+    """Decorador: perfila la función por muestreo cuando el perfilado está activo."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_block(name, enabled=should_profile()):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_profile_argument(parser):
+    """Añade --profile [DIR] a un argparse de script (backtest y constructores de datasets)."""
+    parser.add_argument(
+        '--profile', nargs='?', const=PROFILE_DIR, default=None, metavar='DIR',
+        help=f"Perfila la ejecución con cProfile y guarda el resultado en DIR (por defecto {PROFILE_DIR}).",
+    )
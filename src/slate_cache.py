@@ -0,0 +1,133 @@
+# src/slate_cache.py
+import fcntl
+import functools
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, has_app_context
+
+from .metrics import cache_result
+
+# Caché "stale-while-revalidate" para la cartelera:
+#   - entrada fresca      -> se sirve directamente
+#   - entrada vencida     -> se sirve igual y se recalcula en un hilo de fondo
+#   - entrada inexistente -> se calcula en el momento (única espera posible para el usuario)
+# Un candado de archivo (flock) por clave garantiza que, entre todos los workers de gunicorn,
+# cada fecha se recalcula una sola vez a la vez.
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _lock_path(lock_dir, key):
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(lock_dir, f"{digest}.lock")
+
+
+@contextmanager
+def _file_lock(lock_dir, key, blocking=True):
+    """Candado exclusivo entre procesos. Con blocking=False devuelve False si ya está tomado."""
+    os.makedirs(lock_dir, exist_ok=True)
+    fd = os.open(_lock_path(lock_dir, key), os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def _is_fresh(entry, fresh_for):
+    return entry is not None and time.time() - entry['computed_at'] < fresh_for
+
+
+def stale_while_revalidate(cache, fresh_for, keep_for, lock_dir):
+    """
+    Decorador parecido a cache.memoize: 'fresh_for' es la vida útil de una entrada y
+    'keep_for' el tiempo máximo que se sigue sirviendo vencida mientras se recalcula.
+    """
+    def decorator(func):
+        def cache_key(*args):
+            return f"swr:{func.__module__}.{func.__name__}:" + ":".join(str(arg) for arg in args)
+
+        def compute_and_store(key, args):
+            value = func(*args)
+            cache.set(key, {'value': value, 'computed_at': time.time()}, timeout=keep_for)
+            return value
+
+        def refresh(app, key, args):
+            try:
+                with _file_lock(lock_dir, key, blocking=False) as acquired:
+                    # Si otro worker ya está recalculando, o acaba de hacerlo, no hay nada que hacer.
+                    if not acquired or _is_fresh(cache.get(key), fresh_for):
+                        return
+                    if app is not None:
+                        with app.app_context():
+                            compute_and_store(key, args)
+                    else:
+                        compute_and_store(key, args)
+            except Exception as e:
+                print(f"--- [Slate Cache] Error recalculando '{key}' en segundo plano: {e} ---")
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(key)
+
+        def refresh_in_background(key, args):
+            with _refreshing_lock:
+                if key in _refreshing:
+                    return
+                _refreshing.add(key)
+            app = current_app._get_current_object() if has_app_context() else None
+            threading.Thread(target=refresh, args=(app, key, args), daemon=True).start()
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = cache_key(*args)
+            entry = cache.get(key)
+            if entry is not None:
+                if not _is_fresh(entry, fresh_for):
+                    cache_result(func.__name__, 'stale')
+                    refresh_in_background(key, args)
+                else:
+                    cache_result(func.__name__, 'hit')
+                return entry['value']
+            cache_result(func.__name__, 'miss')
+
+            # Sin nada que servir: se espera al candado, y si otro worker llenó la caché
+            # mientras tanto se usa su resultado en lugar de recalcular.
+            with _file_lock(lock_dir, key):
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry['value']
+                return compute_and_store(key, args)
+
+        def update_cached(transform, *args):
+            """
+            Reemplaza el valor guardado por transform(valor) sin cambiar su antigüedad. Si no hay
+            entrada, o si otro worker la está recalculando en este momento, no hace nada.
+            """
+            key = cache_key(*args)
+            with _file_lock(lock_dir, key, blocking=False) as acquired:
+                entry = cache.get(key) if acquired else None
+                if entry is None:
+                    return False
+                remaining = keep_for - (time.time() - entry['computed_at'])
+                if remaining <= 0:
+                    return False
+                entry['value'] = transform(entry['value'])
+                cache.set(key, entry, timeout=max(1, int(remaining)))
+                return True
+
+        wrapper.cache_key = cache_key
+        wrapper.update_cached = update_cached
+        return wrapper
+    return decorator
@@ -0,0 +1,363 @@
+# src/team_ledger.py
+import os
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from .config import LOCAL_STORE_DIR
+from .http_client import get_json
+from .boxscore_store import get_boxscore, is_final_game
+
+# Libro (ledger) persistente con una fila por equipo y por juego finalizado. Las características
+# de momentum se calculan con sumas sobre una ventana deslizante de estas filas locales, así que
+# una vez sincronizado el equipo no hace falta ninguna llamada de red.
+LEDGER_PATH = os.path.join(LOCAL_STORE_DIR, 'team_ledger.sqlite')
+
+# Columnas numéricas acumulables de cada fila del libro.
+LEDGER_COLUMNS = [
+    'runs_scored', 'runs_allowed',
+    'at_bats', 'hits', 'walks', 'hit_by_pitch', 'sac_flies', 'total_bases',
+    'bullpen_outs', 'bullpen_er', 'bullpen_hits', 'bullpen_walks',
+]
+
+# Juegos que no se juegan (o no terminan) en la fecha del calendario: no se guardan ni impiden
+# dar el día por sincronizado. Un juego suspendido aparece como finalizado en la fecha en que se
+# reanuda, y ahí se guarda. Se comparan como prefijo ('Suspended: Rain', 'Postponed', ...).
+SKIPPED_STATES = ('Postponed', 'Cancelled', 'Suspended')
+
+_init_lock = threading.Lock()
+_initialized = False
+_team_locks = {}
+_team_locks_guard = threading.Lock()
+
+# Ventanas en memoria por (team_id, season): fechas ordenadas + sumas prefijas por columna.
+_windows = {}
+# Cobertura sincronizada conocida por este proceso: (team_id, season) -> (desde, hasta).
+_coverage = {}
+# OPS de ventanas cerradas ya leídas: (team_id, season, desde, hasta) -> valor de la API.
+_window_ops = {}
+
+
+def _connect():
+    global _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                os.makedirs(os.path.dirname(LEDGER_PATH), exist_ok=True)
+                columns_sql = ", ".join(f"{col} INTEGER NOT NULL DEFAULT 0" for col in LEDGER_COLUMNS)
+                with sqlite3.connect(LEDGER_PATH, timeout=30) as conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS team_games ("
+                        " team_id INTEGER NOT NULL, game_pk INTEGER NOT NULL, season INTEGER NOT NULL,"
+                        f" game_date TEXT NOT NULL, {columns_sql},"
+                        " PRIMARY KEY (team_id, game_pk))"
+                    )
+                    conn.execute(
+                        "CREATE INDEX IF NOT EXISTS ix_team_games_team_season_date"
+                        " ON team_games (team_id, season, game_date)"
+                    )
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS team_sync ("
+                        " team_id INTEGER NOT NULL, season INTEGER NOT NULL,"
+                        " synced_from TEXT NOT NULL, synced_through TEXT NOT NULL,"
+                        " PRIMARY KEY (team_id, season))"
+                    )
+                    # OPS de cada ventana tal como lo publica la API (NULL si no lo trae).
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS team_window_ops ("
+                        " team_id INTEGER NOT NULL, season INTEGER NOT NULL,"
+                        " start_date TEXT NOT NULL, end_date TEXT NOT NULL, ops TEXT,"
+                        " PRIMARY KEY (team_id, season, start_date, end_date))"
+                    )
+                _initialized = True
+    return sqlite3.connect(LEDGER_PATH, timeout=30)
+
+
+def _team_lock(key):
+    with _team_locks_guard:
+        return _team_locks.setdefault(key, threading.Lock())
+
+
+def _innings_to_outs(ip_str):
+    parts = str(ip_str or "0.0").split('.')
+    return (int(parts[0]) * 3) + (int(parts[1]) if len(parts) > 1 else 0)
+
+
+def parse_team_line(boxscore_data, team_side):
+    """
+    Extrae la línea de un equipo de un boxscore: bateo, carreras permitidas y el bullpen
+    (todos los lanzadores excepto el abridor).
+    """
+    team = boxscore_data['teams'][team_side]
+    batting = team.get('teamStats', {}).get('batting', {})
+    pitching = team.get('teamStats', {}).get('pitching', {})
+    line = {
+        'runs_scored': batting.get('runs', 0),
+        'runs_allowed': pitching.get('runs', 0),
+        'at_bats': batting.get('atBats', 0),
+        'hits': batting.get('hits', 0),
+        'walks': batting.get('baseOnBalls', 0),
+        'hit_by_pitch': batting.get('hitByPitch', 0),
+        'sac_flies': batting.get('sacFlies', 0),
+        'total_bases': batting.get('totalBases', 0),
+        'bullpen_outs': 0, 'bullpen_er': 0, 'bullpen_hits': 0, 'bullpen_walks': 0,
+    }
+    for pitcher_id in team.get('pitchers', [])[1:]:
+        p_stats = team['players'].get(f'ID{pitcher_id}', {}).get('stats', {}).get('pitching', {})
+        if p_stats:
+            line['bullpen_outs'] += _innings_to_outs(p_stats.get('inningsPitched', "0.0"))
+            line['bullpen_er'] += p_stats.get('earnedRuns', 0)
+            line['bullpen_hits'] += p_stats.get('hits', 0)
+            line['bullpen_walks'] += p_stats.get('baseOnBalls', 0)
+    return line
+
+
+def _insert_rows(conn, rows):
+    columns = ['team_id', 'game_pk', 'season', 'game_date'] + LEDGER_COLUMNS
+    placeholders = ", ".join("?" for _ in columns)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO team_games ({', '.join(columns)}) VALUES ({placeholders})",
+        [[row[col] for col in columns] for row in rows],
+    )
+
+
+def ingest_game(game_pk, game_date_str, season, boxscore_data):
+    """Añade al libro las líneas de ambos equipos de un juego finalizado."""
+    rows = []
+    for side in ('home', 'away'):
+        line = parse_team_line(boxscore_data, side)
+        line.update({
+            'team_id': boxscore_data['teams'][side]['team']['id'],
+            'game_pk': game_pk, 'season': season, 'game_date': game_date_str,
+        })
+        rows.append(line)
+    conn = _connect()
+    try:
+        with conn:
+            _insert_rows(conn, rows)
+    finally:
+        conn.close()
+    for row in rows:
+        _windows.pop((row['team_id'], season), None)
+
+
+def _read_coverage(conn, team_id, season):
+    row = conn.execute(
+        "SELECT synced_from, synced_through FROM team_sync WHERE team_id = ? AND season = ?",
+        (team_id, season),
+    ).fetchone()
+    if not row:
+        return None
+    return date.fromisoformat(row[0]), date.fromisoformat(row[1])
+
+
+def _covers(coverage, start, end):
+    return coverage is not None and coverage[0] <= start and coverage[1] >= end
+
+
+def _sync_range(team_id, season, start, end):
+    """
+    Descarga el calendario del equipo entre 'start' y 'end' y guarda sus juegos finalizados.
+    Devuelve el último día sincronizado por completo (el anterior al primer juego sin terminar).
+    """
+    params = {'sportId': 1, 'teamId': team_id, 'startDate': start.isoformat(), 'endDate': end.isoformat()}
+    dates = get_json("/schedule", params=params).get('dates', [])
+    synced_through = end
+    for date_info in dates:
+        for game in date_info.get('games', []):
+            if (game.get('status', {}).get('detailedState') or '').startswith(SKIPPED_STATES):
+                continue
+            if not is_final_game(game):
+                synced_through = min(synced_through, date.fromisoformat(date_info['date']) - timedelta(days=1))
+                continue
+            boxscore_data = get_boxscore(game['gamePk'], is_final=True)
+            ingest_game(game['gamePk'], date_info['date'], season, boxscore_data)
+    return synced_through
+
+
+def ensure_synced(team_id, season, start, end):
+    """
+    Garantiza que el libro contenga todos los juegos finalizados del equipo entre 'start' y 'end'.
+    Solo descarga los tramos que aún no se han sincronizado; si ya están, no toca la red.
+    """
+    key = (team_id, season)
+    if _covers(_coverage.get(key), start, end):
+        return
+
+    with _team_lock(key):
+        conn = _connect()
+        try:
+            coverage = _read_coverage(conn, team_id, season)
+        finally:
+            conn.close()
+        if coverage != _coverage.get(key):
+            # Otro proceso pudo haber ampliado el libro: se descarta la ventana en memoria.
+            _windows.pop(key, None)
+        if _covers(coverage, start, end):
+            _coverage[key] = coverage
+            return
+
+        if coverage is None:
+            new_from, new_through = start, _sync_range(team_id, season, start, end)
+        else:
+            new_from, new_through = coverage
+            if start < new_from:
+                # La cobertura es un único tramo: solo se amplía hacia atrás si el relleno llegó
+                # completo hasta el inicio anterior (si no, ese tramo se vuelve a pedir).
+                backfilled_through = _sync_range(team_id, season, start, new_from - timedelta(days=1))
+                if backfilled_through >= new_from - timedelta(days=1):
+                    new_from = start
+            if end > new_through:
+                new_through = _sync_range(team_id, season, new_through + timedelta(days=1), end)
+
+        if new_through >= new_from:
+            conn = _connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO team_sync (team_id, season, synced_from, synced_through) VALUES (?, ?, ?, ?)",
+                        (team_id, season, new_from.isoformat(), new_through.isoformat()),
+                    )
+            finally:
+                conn.close()
+            _coverage[key] = (new_from, new_through)
+        _windows.pop(key, None)
+
+
+def _load_window(team_id, season):
+    key = (team_id, season)
+    window = _windows.get(key)
+    if window is not None:
+        return window
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            f"SELECT game_date, {', '.join(LEDGER_COLUMNS)} FROM team_games"
+            " WHERE team_id = ? AND season = ? ORDER BY game_date",
+            (team_id, season),
+        ).fetchall()
+    finally:
+        conn.close()
+    ordinals = [date.fromisoformat(row[0]).toordinal() for row in rows]
+    prefix = {
+        col: [0] + list(accumulate(row[i + 1] for row in rows))
+        for i, col in enumerate(LEDGER_COLUMNS)
+    }
+    window = (ordinals, prefix)
+    _windows[key] = window
+    return window
+
+
+def season_rows(season):
+    """
+    Todas las filas del libro para la temporada, para cálculos en bloque (feature_store):
+    lista de (team_id, game_date, *LEDGER_COLUMNS), ordenada por equipo y fecha.
+    """
+    conn = _connect()
+    try:
+        return conn.execute(
+            f"SELECT team_id, game_date, {', '.join(LEDGER_COLUMNS)} FROM team_games"
+            " WHERE season = ? ORDER BY team_id, game_date",
+            (season,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def window_totals(team_id, season, start, end):
+    """Suma cada columna del libro para los juegos del equipo entre 'start' y 'end' (inclusive)."""
+    ordinals, prefix = _load_window(team_id, season)
+    lo = bisect_left(ordinals, start.toordinal())
+    hi = bisect_right(ordinals, end.toordinal())
+    totals = {col: prefix[col][hi] - prefix[col][lo] for col in LEDGER_COLUMNS}
+    totals['games'] = hi - lo
+    return totals
+
+
+def window_ops(team_id, season, start, end, sync=True):
+    """
+    OPS del equipo entre 'start' y 'end' tal como lo publica la API (stats=byDateRange), que es
+    el valor con el que se entrenó el modelo. Las ventanas cerradas (hasta ayer) no cambian, así
+    que se piden una sola vez y se guardan en el libro. Con sync=False solo se lee lo guardado.
+    """
+    key = (team_id, season, start.isoformat(), end.isoformat())
+    if key in _window_ops:
+        return _window_ops[key]
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT ops FROM team_window_ops WHERE team_id = ? AND season = ? AND start_date = ? AND end_date = ?",
+            key,
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is not None:
+        _window_ops[key] = row[0]
+        return row[0]
+    if not sync:
+        return None
+
+    params = {'season': season, 'startDate': key[2], 'endDate': key[3], 'stats': 'byDateRange', 'group': 'hitting'}
+    stats = get_json(f"/teams/{team_id}/stats", params=params).get('stats', [{}])[0].get('splits', [{}])[0].get('stat', {})
+    ops = stats.get('ops')
+    if end < date.today():
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO team_window_ops (team_id, season, start_date, end_date, ops) VALUES (?, ?, ?, ?, ?)",
+                    (*key, ops),
+                )
+        finally:
+            conn.close()
+        _window_ops[key] = ops
+    return ops
+
+
+def season_window_ops(season):
+    """OPS guardados de la temporada, para cálculos en bloque: {(team_id, desde, hasta): ops}."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT team_id, start_date, end_date, ops FROM team_window_ops WHERE season = ?",
+            (season,),
+        ).fetchall()
+    finally:
+        conn.close()
+    return {(team_id, start, end): ops for team_id, start, end, ops in rows}
+
+
+def get_window_stats(team_id, season, start, end):
+    """
+    Devuelve las características de momentum del equipo (OPS, carreras anotadas y permitidas,
+    ERA y WHIP del bullpen) para la ventana [start, end], sincronizando el libro si hace falta.
+    """
+    if isinstance(start, datetime):
+        start = start.date()
+    if isinstance(end, datetime):
+        end = end.date()
+    ensure_synced(team_id, season, start, end)
+    totals = window_totals(team_id, season, start, end)
+
+    # El OPS no se calcula con el libro: es el de la API (window_ops), el que vio el modelo al
+    # entrenar. Sin juegos en la ventana la API no trae estadísticas, así que no se pide.
+    team_ops, runs_scored, runs_allowed = None, None, None
+    if totals['games'] > 0:
+        runs_scored, runs_allowed = totals['runs_scored'], totals['runs_allowed']
+        team_ops = window_ops(team_id, season, start, end)
+
+    bullpen_era, bullpen_whip = None, None
+    if totals['bullpen_outs'] > 0:
+        total_bullpen_ip = totals['bullpen_outs'] / 3.0
+        bullpen_era = round((totals['bullpen_er'] * 9) / total_bullpen_ip, 2)
+        bullpen_whip = round((totals['bullpen_walks'] + totals['bullpen_hits']) / total_bullpen_ip, 2)
+
+    return {
+        'runs_scored': runs_scored,
+        'team_ops': team_ops,
+        'runs_allowed': runs_allowed,
+        'bullpen_era': bullpen_era,
+        'bullpen_whip': bullpen_whip
+    }
@@ -1,11 +1,18 @@
 # src/train_model.py
 
-import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 from xgboost import XGBClassifier
 import joblib # Para guardar el modelo
 import os # Necesario para construir la ruta del archivo
+import sys
+
+# --- Configuración del Path de Python ---
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.columnar_store import load_csv
+from src.tree_model import export_and_verify
 
 # --- INSTRUCCIONES DE INSTALACIÓN (si es necesario) ---
 # Si ves un error "ModuleNotFoundError", ejecuta estos comandos en tu terminal:
@@ -16,9 +23,19 @@ def train_and_evaluate_model(dataset_path):
     """
     Carga el dataset, entrena un modelo XGBoost y evalúa su precisión.
     """
+    # Seleccionamos las características que usará el modelo
+    features = [
+        'home_recent_era', 'home_recent_whip', 'home_team_ops', 'home_bullpen_era', 
+        'home_park_factor', 'away_recent_era', 'away_recent_whip', 'away_team_ops', 
+        'away_bullpen_era'
+    ]
+    
+    target = 'home_team_winner'
+
     print(f"--- Cargando dataset desde: {dataset_path} ---")
     try:
-        df = pd.read_csv(dataset_path)
+        # Solo se leen las columnas del modelo (del almacén columnar si está al día).
+        df = load_csv(dataset_path, columns=features + [target])
     except FileNotFoundError:
         print(f"\n[ERROR] No se encontró el archivo del dataset en '{dataset_path}'.")
         print("Por favor, ejecuta primero 'src/build_dataset.py' para crearlo.")
@@ -29,15 +46,6 @@ def train_and_evaluate_model(dataset_path):
     # --- 1. PREPROCESAMIENTO DE DATOS ---
     print("\n--- 1. Preparando los datos para el entrenamiento ---")
     
-    # Seleccionamos las características que usará el modelo
-    features = [
-        'home_recent_era', 'home_recent_whip', 'home_team_ops', 'home_bullpen_era', 
-        'home_park_factor', 'away_recent_era', 'away_recent_whip', 'away_team_ops', 
-        'away_bullpen_era'
-    ]
-    
-    target = 'home_team_winner'
-    
     # Nos aseguramos de que solo usamos las columnas necesarias
     df_model = df[features + [target]].copy()
     
@@ -89,6 +97,12 @@ def train_and_evaluate_model(dataset_path):
     print(f"\n--- 5. Guardando el modelo entrenado en '{model_filename}' ---")
     joblib.dump(model, model_filename)
     print("Modelo guardado exitosamente.")
+
+    # --- 6. EXPORTAR EL MODELO PARA SERVIRLO SIN XGBOOST ---
+    # La app y el backtest cargan esta exportación (.npz) en lugar del .pkl. Se verifica contra
+    # predict_proba con el conjunto de prueba y con una matriz de casos límite.
+    print("\n--- 6. Exportando el modelo al evaluador NumPy ---")
+    export_and_verify(model, model_filename, sample=X_test.to_numpy(dtype='float32'))
     
     return model, features
 
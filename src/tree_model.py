@@ -0,0 +1,248 @@
+# src/tree_model.py
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .config import MODEL_BACKEND
+
+# Evaluador de árboles en NumPy puro para el modelo XGBoost (gbtree, binary:logistic).
+# El booster entrenado se exporta a un .npz con todos los nodos de todos los árboles en arreglos
+# planos (feature, umbral, hijo izquierdo/derecho, rama por defecto para NaN y valor de hoja).
+# Servirlo así no necesita importar xgboost ni scikit-learn: cargar el modelo pasa de ~1 s y
+# ~100 MB a unos milisegundos, y una matriz completa se evalúa recorriendo todos los árboles a
+# la vez, un nivel por iteración.
+#
+# Misma regla que XGBoost: se va a la izquierda si x < umbral (en float32); un NaN sigue la
+# rama por defecto. Las hojas apuntan a sí mismas, así que basta con iterar max_depth veces.
+
+EXPORT_FORMAT_VERSION = 1
+# Diferencia máxima admitida entre predict_proba de XGBoost y el evaluador.
+VERIFY_TOLERANCE = 1e-6
+
+
+def export_path_for(model_path):
+    """Ruta del modelo exportado que acompaña a un .pkl: mismo nombre, extensión .npz."""
+    return os.path.splitext(model_path)[0] + '.npz'
+
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _parse_base_score(value):
+    # XGBoost >= 2 lo guarda como '[5.243902E-1]'; las versiones anteriores, como '0.5'.
+    return float(str(value).strip('[]'))
+
+
+def export_booster(model, output_path, source_path=None):
+    """
+    Exporta un XGBClassifier (o un Booster) binario a 'output_path' (.npz). Si se indica
+    'source_path' (el .pkl), se guarda su huella para detectar exportaciones desactualizadas.
+    Devuelve el TreeEnsemble exportado.
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+    objective = learner['objective']['name']
+    gradient_booster = learner['gradient_booster']
+    if gradient_booster['name'] != 'gbtree' or objective != 'binary:logistic':
+        raise ValueError(f"Solo se exportan modelos gbtree binary:logistic (el modelo es {gradient_booster['name']} {objective})")
+
+    trees = gradient_booster['model']['trees']
+    # Con early stopping, predict_proba solo usa los árboles hasta la mejor iteración.
+    best_iteration = booster.attr('best_iteration')
+    if best_iteration is not None:
+        parallel = int(gradient_booster['model']['gbtree_model_param']['num_parallel_tree'])
+        trees = trees[:(int(best_iteration) + 1) * parallel]
+
+    feature, threshold, left, right, default_left, value, roots, depths = [], [], [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        if any(int(t) != 0 for t in tree['split_type']):
+            raise ValueError("El modelo tiene splits categóricos; el evaluador NumPy no los soporta")
+        tree_left = np.asarray(tree['left_children'], dtype=np.int64)
+        tree_right = np.asarray(tree['right_children'], dtype=np.int64)
+        n_nodes = len(tree_left)
+        node_ids = np.arange(n_nodes)
+        is_leaf = tree_left == -1
+        # Las hojas apuntan a sí mismas; los índices pasan a ser globales (todos los árboles).
+        left.append(np.where(is_leaf, node_ids, tree_left) + offset)
+        right.append(np.where(is_leaf, node_ids, tree_right) + offset)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        feature.append(np.where(is_leaf, 0, np.asarray(tree['split_indices'], dtype=np.int64)))
+        threshold.append(np.where(is_leaf, np.float32(0), conditions))
+        # En las hojas, split_conditions guarda el valor de la hoja.
+        value.append(np.where(is_leaf, conditions, np.float32(0)))
+        default_left.append(np.asarray(tree['default_left'], dtype=bool))
+        roots.append(offset)
+        depths.append(_tree_depth(tree_left, tree_right))
+        offset += n_nodes
+
+    base_score = _parse_base_score(learner['learner_model_param']['base_score'])
+    arrays = {
+        'format_version': np.int32(EXPORT_FORMAT_VERSION),
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float32),
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'default_left': np.concatenate(default_left),
+        'value': np.concatenate(value).astype(np.float32),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'max_depth': np.int32(max(depths) if depths else 0),
+        'base_margin': np.float64(np.log(base_score / (1.0 - base_score))),
+        'num_features': np.int32(int(learner['learner_model_param']['num_feature'])),
+        'feature_names': np.asarray(booster.feature_names or [], dtype=str),
+        'source_sha256': np.asarray(file_sha256(source_path) if source_path else ''),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    print(f"--- [Tree Model] {len(trees)} árboles ({offset} nodos, profundidad máxima {arrays['max_depth']}) exportados a {output_path} ---")
+    return TreeEnsemble(arrays)
+
+
+def _tree_depth(left, right):
+    depth, frontier = 0, [0]
+    while True:
+        children = [c for node in frontier for c in (left[node], right[node]) if c != -1]
+        if not children:
+            return depth
+        depth += 1
+        frontier = children
+
+
+class TreeEnsemble:
+    """Modelo exportado. Expone predict_proba como XGBClassifier, así que es intercambiable con él."""
+
+    def __init__(self, arrays):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.default_left = arrays['default_left']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.max_depth = int(arrays['max_depth'])
+        self.base_margin = float(arrays['base_margin'])
+        self.num_features = int(arrays['num_features'])
+        self.feature_names = [str(name) for name in arrays['feature_names']]
+        self.source_sha256 = str(arrays['source_sha256'])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+        if int(arrays['format_version']) != EXPORT_FORMAT_VERSION:
+            raise ValueError(f"Formato de exportación {int(arrays['format_version'])} no soportado en '{path}'")
+        return cls(arrays)
+
+    def predict_margin(self, X):
+        """Suma de las hojas alcanzadas más el margen base, para cada fila de X (n, num_features)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.num_features:
+            raise ValueError(f"Se esperaba una matriz (n, {self.num_features}); se recibió {X.shape}")
+        # Un nodo actual por (fila, árbol); todos los árboles bajan un nivel por iteración. Los
+        # valores se leen de X aplanada con np.take, que es bastante más rápido que el indexado
+        # avanzado en dos dimensiones.
+        flat = np.ascontiguousarray(X).ravel()
+        row_offsets = (np.arange(X.shape[0], dtype=np.int64) * X.shape[1])[:, None]
+        has_missing = bool(np.isnan(flat).any())
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.max_depth):
+            values = np.take(flat, row_offsets + np.take(self.feature, nodes))
+            go_left = values < np.take(self.threshold, nodes)
+            if has_missing:
+                go_left = np.where(np.isnan(values), np.take(self.default_left, nodes), go_left)
+            nodes = np.where(go_left, np.take(self.left, nodes), np.take(self.right, nodes))
+        return np.take(self.value, nodes).sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def predict_proba(self, X):
+        """Probabilidades [clase 0, clase 1] por fila, en float32 como XGBClassifier."""
+        positive = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        return np.column_stack([1.0 - positive, positive]).astype(np.float32)
+
+
+def max_abs_difference(reference_model, ensemble, X):
+    """Mayor diferencia absoluta entre predict_proba del modelo original y del exportado."""
+    X = np.asarray(X, dtype=np.float32)
+    expected = reference_model.predict_proba(X)[:, 1].astype(np.float64)
+    return float(np.max(np.abs(expected - ensemble.predict_proba(X)[:, 1]))) if len(X) else 0.0
+
+
+def verification_matrix(ensemble, rows=2000, seed=42):
+    """
+    Matriz de prueba que ejercita los casos límite de los splits: valores exactamente en el
+    umbral y en el float32 inmediatamente por debajo o por encima, más valores aleatorios y
+    NaN (rama por defecto).
+    """
+    rng = np.random.default_rng(seed)
+    is_split = ensemble.left != np.arange(len(ensemble.left))
+    X = np.empty((rows, ensemble.num_features), dtype=np.float32)
+    for col in range(ensemble.num_features):
+        thresholds = ensemble.threshold[is_split & (ensemble.feature == col)]
+        if len(thresholds) == 0:
+            X[:, col] = rng.normal(size=rows)
+            continue
+        picked = rng.choice(thresholds, size=rows)
+        nudge = rng.integers(-1, 2, size=rows)
+        X[:, col] = np.where(nudge < 0, np.nextafter(picked, np.float32(-np.inf)),
+                             np.where(nudge > 0, np.nextafter(picked, np.float32(np.inf)), picked))
+        spread = rows // 4
+        X[:spread, col] = rng.uniform(thresholds.min() - 1, thresholds.max() + 1, size=spread)
+    X[rng.random(X.shape) < 0.02] = np.nan
+    return X
+
+
+def export_and_verify(model, model_path, sample=None, tolerance=VERIFY_TOLERANCE):
+    """
+    Exporta el modelo guardado en 'model_path' junto a él (.npz) y comprueba que sus
+    probabilidades coinciden con predict_proba en 'sample' y en la matriz de casos límite.
+    Lanza ValueError (y borra la exportación) si la diferencia supera la tolerancia.
+    """
+    output_path = export_path_for(model_path)
+    ensemble = export_booster(model, output_path, source_path=model_path)
+    checks = [verification_matrix(ensemble)]
+    if sample is not None:
+        checks.append(np.asarray(sample, dtype=np.float32))
+    difference = max(max_abs_difference(model, ensemble, X) for X in checks)
+    if difference > tolerance:
+        os.remove(output_path)
+        raise ValueError(f"El modelo exportado difiere de predict_proba en {difference:.3g} (tolerancia {tolerance:g})")
+    print(f"--- [Tree Model] Verificado contra predict_proba: diferencia máxima {difference:.3g} ---")
+    return ensemble
+
+
+def load_model(model_path, backend=None):
+    """
+    Carga el modelo de 'model_path' (.pkl) para predecir. Con el backend 'numpy' (por defecto)
+    usa la exportación .npz que lo acompaña si existe y corresponde a ese .pkl, sin importar
+    xgboost; si no, o con el backend 'xgboost', deserializa el .pkl con joblib.
+    """
+    backend = backend or MODEL_BACKEND
+    export_path = export_path_for(model_path)
+    if backend == 'numpy' and os.path.exists(export_path):
+        ensemble = TreeEnsemble.load(export_path)
+        if ensemble.source_sha256 == file_sha256(model_path):
+            print(f"--- [Tree Model] Usando el modelo exportado {export_path} (sin xgboost) ---")
+            return ensemble
+        print(f"--- [Tree Model] AVISO: {export_path} no corresponde a {model_path}; se usa el .pkl. "
+              f"Vuelve a exportarlo con 'python -m src.tree_model {model_path}'. ---")
+    import joblib
+    return joblib.load(model_path)
+
+
+# ===================================================================
+# BLOQUE PRINCIPAL: exporta y verifica un modelo ya entrenado
+# ===================================================================
+if __name__ == '__main__':
+    # Uso: python -m src.tree_model src/ml_model/mlb_predictor_model_v2.pkl
+    import argparse
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Exporta un modelo XGBoost (.pkl) al evaluador NumPy (.npz).")
+    parser.add_argument('model_paths', nargs='+', help="Modelos .pkl a exportar (el .npz se escribe al lado).")
+    args = parser.parse_args()
+    for path in args.model_paths:
+        export_and_verify(joblib.load(path), path)
@@ -2,6 +2,9 @@
 
 from datetime import datetime, timezone
 
+# Campos de cada equipo que cambian durante el partido y se toman del estado en vivo.
+LIVE_TEAM_FIELDS = ('score', 'isWinner', 'leagueRecord')
+
 def prepare_game_data_for_ui(game, unlocked_game_ids):
     """
     Toma los datos crudos de un partido de la API y los transforma
@@ -62,3 +65,22 @@ def prepare_game_data_for_ui(game, unlocked_game_ids):
     }
     
     return game_data
+
+def merge_live_state(game, live_game):
+    """
+    Devuelve una copia del partido (tal como se guardó con su predicción) con el estado en vivo
+    más reciente: estado, linescore, marcador y récord de cada equipo. El resto (lanzadores
+    probables, horario, etc.) se conserva.
+    """
+    merged = dict(game)
+    merged['status'] = live_game.get('status', game.get('status', {}))
+    if 'linescore' in live_game:
+        merged['linescore'] = live_game['linescore']
+    merged_teams = dict(game.get('teams', {}))
+    for side in ('home', 'away'):
+        live_side = live_game.get('teams', {}).get(side, {})
+        merged_side = dict(merged_teams.get(side, {}))
+        merged_side.update({field: live_side[field] for field in LIVE_TEAM_FIELDS if field in live_side})
+        merged_teams[side] = merged_side
+    merged['teams'] = merged_teams
+    return merged
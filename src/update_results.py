@@ -1,5 +1,4 @@
 # src/update_results.py (Corregido para manejar objetos)
-import pandas as pd
 from datetime import datetime, timedelta
 from data_source import get_games_for_date
 from src.prediction1anager import PREDICTIONS_FILE
@@ -8,6 +7,9 @@ def update_daily_results():
     """
     Actualiza los resultados de las predicciones del día anterior que están pendientes.
     """
+    # pandas se importa aquí y no al cargar el módulo, para no pagar su importación en frío.
+    import pandas as pd
+
     print("--- Iniciando script de actualización de resultados ---")
     
     # 1. Cargar el archivo de predicciones
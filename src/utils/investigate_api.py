@@ -1,10 +1,14 @@
 # investigate_api.py (Versión final usando solo Requests)
 
-import requests # Usaremos la librería estándar para peticiones web.
 import json
 from datetime import datetime, timedelta
 import pandas as pd
 import sys
+import os
+
+# Añade la carpeta raíz del proyecto al path para poder importar desde 'src'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src import http_client # Cliente HTTP compartido (pool de conexiones, reintentos y timeouts).
 
 # --- INSTRUCCIONES DE INSTALACIÓN (si es necesario) ---
 # Si ves un error "ModuleNotFoundError", ejecuta estos comandos en tu terminal:
@@ -56,7 +60,7 @@ season = 2024
 print("1. Buscando ID del jugador vía roster de equipo...")
 try:
     print(f"   - Buscando el ID para el equipo '{player_team_name_to_find}'...")
-    teams_response = requests.get(f"{BASE_API_URL}/teams?sportId=1")
+    teams_response = http_client.get(f"{BASE_API_URL}/teams?sportId=1")
     teams_response.raise_for_status()
     teams_data = teams_response.json().get('teams', [])
     
@@ -75,7 +79,7 @@ try:
 
     print(f"   - Obteniendo roster del equipo y buscando a '{player_name_to_find}'...")
     roster_url = f"{BASE_API_URL}/teams/{team_id}/roster?rosterType=40Man"
-    roster_response = requests.get(roster_url)
+    roster_response = http_client.get(roster_url)
     roster_response.raise_for_status()
     roster_list = roster_response.json().get('roster', [])
 
@@ -103,7 +107,7 @@ except Exception as e:
 print(f"2. Obteniendo datos de la persona para el ID {player_id}...")
 try:
     person_url = f"{BASE_API_URL}/people/{player_id}"
-    response = requests.get(person_url)
+    response = http_client.get(person_url)
     response.raise_for_status()
     person_data = response.json().get('people', [])
     if person_data:
@@ -122,7 +126,7 @@ print(f"\n3. Obteniendo estadísticas de '{group}' de la temporada para el ID {p
 try:
     stats_url = f"{BASE_API_URL}/people/{player_id}/stats"
     stats_params = {'stats': 'season', 'group': group}
-    response = requests.get(stats_url, params=stats_params)
+    response = http_client.get(stats_url, params=stats_params)
     response.raise_for_status()
     stats_data = response.json().get('stats', [])
     if stats_data:
@@ -143,7 +147,7 @@ if position == 'P':
         gamelog_params = {'stats': 'gameLog', 'group': 'pitching', 'season': season}
         
         print(f"   - Consultando registros de juego de la temporada {season}...")
-        response = requests.get(gamelog_url, params=gamelog_params)
+        response = http_client.get(gamelog_url, params=gamelog_params)
         response.raise_for_status()
         
         # La API devuelve una lista de "splits", donde cada split es un juego.
@@ -218,7 +222,7 @@ if team_id:
         # --- OFENSIVA ---
         offensive_params = {**momentum_params, 'stats': 'byDateRange', 'group': 'hitting'}
         offensive_url = f"{BASE_API_URL}/teams/{team_id}/stats"
-        offensive_response = requests.get(offensive_url, params=offensive_params)
+        offensive_response = http_client.get(offensive_url, params=offensive_params)
         offensive_response.raise_for_status()
         offensive_stats = offensive_response.json().get('stats', [{}])[0].get('splits', [{}])[0].get('stat', {})
         
@@ -228,7 +232,7 @@ if team_id:
         # --- DEFENSIVA (PITCHEO TOTAL) ---
         pitching_params = {**momentum_params, 'stats': 'byDateRange', 'group': 'pitching'}
         pitching_url = f"{BASE_API_URL}/teams/{team_id}/stats"
-        pitching_response = requests.get(pitching_url, params=pitching_params)
+        pitching_response = http_client.get(pitching_url, params=pitching_params)
         pitching_response.raise_for_status()
         pitching_stats = pitching_response.json().get('stats', [{}])[0].get('splits', [{}])[0].get('stat', {})
         
@@ -238,7 +242,7 @@ if team_id:
         print("   - Calculando rendimiento del bullpen a partir de registros de juego...")
         schedule_url = f"{BASE_API_URL}/schedule"
         schedule_params = {'sportId': 1, 'teamId': team_id, 'startDate': start_str, 'endDate': end_str}
-        schedule_response = requests.get(schedule_url, params=schedule_params)
+        schedule_response = http_client.get(schedule_url, params=schedule_params)
         schedule_response.raise_for_status()
         
         games = schedule_response.json().get('dates', [])
@@ -252,7 +256,7 @@ if team_id:
             for game in date_info.get('games', []):
                 game_pk = game['gamePk']
                 boxscore_url = f"{BASE_API_URL}/game/{game_pk}/boxscore"
-                boxscore_response = requests.get(boxscore_url)
+                boxscore_response = http_client.get(boxscore_url)
                 boxscore_data = boxscore_response.json()
 
                 team_side = 'home' if boxscore_data['teams']['home']['team']['id'] == team_id else 'away'
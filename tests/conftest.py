@@ -0,0 +1,29 @@
+# tests/conftest.py
+import os
+import shutil
+import sys
+import tempfile
+
+# --- Configuración del Path de Python ---
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# config.py lee estas variables al importarse, así que se fijan antes de importar 'src':
+# almacenes, caché y base de datos temporales, y la API servida desde los fixtures del
+# repositorio (benchmarks/fixtures, sin red).
+_work_dir = tempfile.mkdtemp(prefix='mlb_tests_')
+os.environ.update({
+    'MLB_API_MODE': 'replay',
+    'MLB_API_FIXTURES_DIR': os.path.join(project_root, 'benchmarks', 'fixtures'),
+    'MLB_API_REPLAY_LATENCY_MS': '0',
+    'MLB_API_REPLAY_JITTER_MS': '0',
+    'MLB_LOCAL_STORE_DIR': os.path.join(_work_dir, 'store'),
+    'MLB_CACHE_DIR': os.path.join(_work_dir, 'cache'),
+    'MLB_DATABASE_PATH': os.path.join(_work_dir, 'predictions.db'),
+    'MLB_COLUMNAR_DIR': os.path.join(_work_dir, 'columnar'),
+})
+os.environ.pop('MLB_METRICS_DIR', None)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_work_dir, ignore_errors=True)
@@ -0,0 +1,36 @@
+# tests/test_call_budget.py
+import pytest
+
+from benchmarks.run_benchmarks import CALL_BUDGETS, SLATE_DATE
+from src.call_budget import assert_call_budget
+
+
+@pytest.fixture(scope='module')
+def web_app():
+    from src import app as web_app
+    with web_app.app.app_context():
+        yield web_app
+
+
+def test_replayed_slate_fits_its_budget(web_app):
+    max_calls, max_by_endpoint = CALL_BUDGETS['predictions_cold']
+    web_app.cache.clear()
+    with assert_call_budget(max_calls, **max_by_endpoint) as calls:
+        games = web_app.get_predictions_for_date(SLATE_DATE)
+    assert games
+    assert calls.total > 0
+
+
+def test_exceeding_the_budget_fails(web_app):
+    # Calcular la cartelera siempre pide al menos el calendario del día.
+    web_app.cache.clear()
+    with pytest.raises(AssertionError, match="Presupuesto de llamadas excedido"):
+        with assert_call_budget(0):
+            web_app.get_predictions_for_date(SLATE_DATE)
+
+
+def test_endpoint_limit_is_checked_separately(web_app):
+    web_app.cache.clear()
+    with pytest.raises(AssertionError, match=r"schedule \d+ > 0"):
+        with assert_call_budget(10_000, schedule=0):
+            web_app.get_predictions_for_date(SLATE_DATE)